@@ -1,13 +1,40 @@
 import sys
 import os
+import instance
+
+# 已有实例在运行时把参数转发给它后立即退出，不再加载 Qt
+if __name__ == '__main__' and instance.forward(sys.argv[1:]):
+    sys.exit(0)
+
 import subprocess
+import asyncio
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QStackedWidget, 
                              QMessageBox, QFrame, QScrollArea, QGraphicsDropShadowEffect,
-                             QSizePolicy)
-from PyQt5.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve, QRect
-from PyQt5.QtGui import QIcon, QFont, QColor, QPalette, QCursor
+                             QSizePolicy, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QAbstractItemView, QFileDialog, QListView, QLineEdit,
+                             QStyledItemDelegate, QSystemTrayIcon, QMenu, QAction, QStyle)
+from PyQt5.QtCore import (Qt, QSize, QPropertyAnimation, QEasingCurve, QRect, QThread, pyqtSignal,
+                          QObject, QAbstractListModel, QModelIndex, QSortFilterProxyModel,
+                          QEvent, QPoint, QTimer)
+from PyQt5.QtGui import QIcon, QFont, QColor, QPalette, QCursor, QPainter, QFontMetrics
+import gc
+import ctypes
 import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import commands
+import catalog
+import fleet
+from tracing import tracer
+import tcp_tuning
+import governor
+import maintenance
+import coldstore
+import netprobe
+
+logger = logging.getLogger('winoptimize')
 
 class RoundedFrame(QFrame):
     def __init__(self, parent=None):
@@ -85,38 +112,424 @@ class ActionButton(QPushButton):
         b = max(0, min(255, int(b / factor)))
         return f"#{r:02x}{g:02x}{b:02x}"
 
+def is_admin():
+    try:
+        if os.name == 'nt':
+            return bool(ctypes.windll.shell32.IsUserAnAdmin())
+        return os.geteuid() == 0
+    except Exception:
+        return False
+
+def trim_memory():
+    # 界面销毁后把空闲内存归还给系统，降低常驻内存
+    gc.collect()
+    try:
+        if os.name == 'nt':
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+            kernel32.SetProcessWorkingSetSize.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_size_t]
+            # 两个参数均为 -1 时表示尽可能换出当前工作集
+            kernel32.SetProcessWorkingSetSize(kernel32.GetCurrentProcess(),
+                                              ctypes.c_size_t(-1), ctypes.c_size_t(-1))
+        else:
+            ctypes.CDLL(None).malloc_trim(0)
+    except (AttributeError, OSError):
+        pass
+
+class TweakListModel(QAbstractListModel):
+    # 优化项列表模型；状态（探测结果）与最近一次操作结果按 id 保存
+    TweakRole = Qt.UserRole + 1
+    StateRole = Qt.UserRole + 2
+    StatusRole = Qt.UserRole + 3
+
+    def __init__(self, tweaks, lang='cn', parent=None):
+        super().__init__(parent)
+        self.tweaks = tweaks
+        self.lang = lang
+        self.rows = {t.id: row for row, t in enumerate(tweaks)}
+        self.states = {}
+        self.statuses = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tweaks)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        tweak = self.tweaks[index.row()]
+        if role == Qt.DisplayRole:
+            # 搜索框按标题、描述、分类和 id 过滤
+            return " ".join([tweak.text('title', self.lang), tweak.text('description', self.lang),
+                             tweak.category, tweak.id])
+        if role == self.TweakRole:
+            return tweak
+        if role == self.StateRole:
+            return self.states.get(tweak.id)
+        if role == self.StatusRole:
+            return self.statuses.get(tweak.id)
+        return None
+
+    def tweak(self, tweak_id):
+        return self.tweaks[self.rows[tweak_id]]
+
+    def set_lang(self, lang):
+        self.lang = lang
+        if self.tweaks:
+            self.dataChanged.emit(self.index(0), self.index(len(self.tweaks) - 1))
+
+    def _changed(self, tweak_id):
+        index = self.index(self.rows[tweak_id])
+        self.dataChanged.emit(index, index)
+
+    def set_state(self, tweak_id, state):
+        self.states[tweak_id] = state
+        self._changed(tweak_id)
+
+    def set_status(self, tweak_id, status):
+        # status 为 (类型, 详情)，类型取 running / done / failed
+        self.statuses[tweak_id] = status
+        self._changed(tweak_id)
+
+class TweakDelegate(QStyledItemDelegate):
+    # 直接绘制卡片，不为每个优化项创建控件；只有可见行会被绘制
+    action_clicked = pyqtSignal(str, str)
+    CARD_HEIGHT = 144
+    BUTTON_COLORS = {'apply': '#0078d4', 'revert': '#dc3545'}
+
+    def __init__(self, font_family, parent=None):
+        super().__init__(parent)
+        self.title_font = QFont(font_family, 13, QFont.Bold)
+        self.desc_font = QFont(font_family, 10)
+        self.small_font = QFont(font_family, 9)
+        self.button_font = QFont(font_family, 10)
+        self.dark = False
+        self.lang = 'cn'
+        self.texts = {}
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.CARD_HEIGHT)
+
+    def _card_rect(self, rect):
+        return rect.adjusted(4, 6, -12, -6)
+
+    def _button_rects(self, rect, tweak):
+        card = self._card_rect(rect)
+        metrics = QFontMetrics(self.button_font)
+        rects = {}
+        x = card.left() + 15
+        for action in ('apply', 'revert'):
+            if not tweak.has(action):
+                continue
+            width = metrics.horizontalAdvance(tweak.label(action, self.lang)) + 30
+            rects[action] = QRect(x, card.bottom() - 44, width, 32)
+            x += width + 10
+        return rects
+
+    def paint(self, painter, option, index):
+        tweak = index.data(TweakListModel.TweakRole)
+        state = index.data(TweakListModel.StateRole)
+        status = index.data(TweakListModel.StatusRole)
+        card = self._card_rect(option.rect)
+        text_color = QColor('#ffffff') if self.dark else QColor('#333333')
+        muted_color = QColor('#aaaaaa') if self.dark else QColor('#777777')
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        # 用半透明矩形代替 QGraphicsDropShadowEffect 画阴影
+        painter.setBrush(QColor(0, 0, 0, 25))
+        painter.drawRoundedRect(card.translated(0, 2), 8, 8)
+        painter.setBrush(QColor('#333333') if self.dark else QColor('#f8f9fa'))
+        painter.drawRoundedRect(card, 8, 8)
+
+        inner = card.adjusted(15, 12, -15, -12)
+        # 右上角：分类、需要管理员、当前状态
+        tags = [tweak.category]
+        if tweak.admin:
+            tags.append(self.texts.get('admin', 'admin'))
+        if state is not None:
+            tags.append(self.texts.get('enabled' if state else 'disabled', ''))
+        painter.setFont(self.small_font)
+        metrics = QFontMetrics(self.small_font)
+        x = inner.right()
+        for tag in reversed(tags):
+            width = metrics.horizontalAdvance(tag) + 16
+            x -= width
+            tag_rect = QRect(x, inner.top(), width, 22)
+            color = QColor('#4CAF50') if tag == self.texts.get('enabled') else QColor('#0078d4')
+            color.setAlpha(40)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(color)
+            painter.drawRoundedRect(tag_rect, 11, 11)
+            painter.setPen(text_color)
+            painter.drawText(tag_rect, Qt.AlignCenter, tag)
+            x -= 6
+
+        painter.setFont(self.title_font)
+        painter.setPen(text_color)
+        title_rect = QRect(inner.left(), inner.top(), x - inner.left() - 10, 24)
+        title = QFontMetrics(self.title_font).elidedText(tweak.text('title', self.lang), Qt.ElideRight, title_rect.width())
+        painter.drawText(title_rect, Qt.AlignLeft | Qt.AlignVCenter, title)
+
+        painter.setFont(self.desc_font)
+        desc_rect = QRect(inner.left(), inner.top() + 28, inner.width(), 40)
+        painter.drawText(desc_rect, Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap,
+                         tweak.text('description', self.lang))
+
+        painter.setFont(self.button_font)
+        buttons = self._button_rects(option.rect, tweak)
+        for action, rect in buttons.items():
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(self.BUTTON_COLORS[action]))
+            painter.drawRoundedRect(rect, 5, 5)
+            painter.setPen(QColor('#ffffff'))
+            painter.drawText(rect, Qt.AlignCenter, tweak.label(action, self.lang))
+
+        if status is not None:
+            kind, detail = status
+            text = self.texts.get(kind, kind) + (f" ({detail})" if detail else "")
+            left = max([r.right() for r in buttons.values()] + [inner.left()]) + 15
+            painter.setFont(self.small_font)
+            painter.setPen(QColor('#dc3545') if kind == 'failed' else muted_color)
+            painter.drawText(QRect(left, card.bottom() - 44, inner.right() - left, 32),
+                             Qt.AlignLeft | Qt.AlignVCenter, text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            tweak = index.data(TweakListModel.TweakRole)
+            for action, rect in self._button_rects(option.rect, tweak).items():
+                if rect.contains(event.pos()):
+                    self.action_clicked.emit(tweak.id, action)
+                    return True
+        return False
+
+class TweakRunner(QObject):
+    # 在线程池中执行探测与命令，结果通过信号回到界面线程
+    probed = pyqtSignal(str, object)
+    finished = pyqtSignal(str, str, object)
+
+    def __init__(self, workers=4, parent=None):
+        super().__init__(parent)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = set()
+        self.futures = set()
+
+    def _submit(self, fn, *args):
+        future = self.pool.submit(fn, *args)
+        self.futures.add(future)
+        future.add_done_callback(self.futures.discard)
+
+    def busy(self):
+        return bool(self.futures)
+
+    def probe(self, tweak):
+        if tweak.id in self.pending or tweak.command('probe') is None:
+            return
+        self.pending.add(tweak.id)
+        self._submit(self._probe, tweak)
+
+    def _probe(self, tweak):
+        try:
+            self.probed.emit(tweak.id, catalog.probe(tweak))
+        finally:
+            self.pending.discard(tweak.id)
+
+    def run(self, tweak, action):
+        self._submit(self._run, tweak, action)
+
+    def _run(self, tweak, action):
+        try:
+            result = catalog.run_command(tweak, action)
+        except Exception as e:
+            result = str(e)
+        self.finished.emit(tweak.id, action, result)
+        # 执行后重新探测状态
+        if tweak.command('probe') is not None:
+            self.probed.emit(tweak.id, catalog.probe(tweak))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
+
+class TcpTuneThread(QThread):
+    # 在后台线程中测量并应用 TCP 自动调优级别，避免阻塞界面；
+    # 只有配置了远端测速服务端（tcp_target）时才应用，回环上 RTT 接近 0，各级别的差别只是噪声
+    done = pyqtSignal(object, object)
+
+    def __init__(self, target, net_targets, parent=None):
+        super().__init__(parent)
+        self.target = target
+        self.net_targets = net_targets
+
+    def run(self):
+        server = None
+        try:
+            remote = bool(self.target)
+            if remote:
+                target = tcp_tuning.parse_address(self.target)
+            else:
+                # 未配置测速服务端时在本机回环上测量，只给出建议
+                server = tcp_tuning.ThroughputServer()
+                target = server.start()
+            tuner = tcp_tuning.TcpTuner(target, duration=0.5, repeats=3,
+                                        system_levels=(os.name == 'nt' and remote))
+            # 调优前后各测一次实际网络时延，对比设置变化的效果
+            before = netprobe.measure(self.net_targets)
+            evidence = tuner.tune(apply=remote)
+            if remote:
+                evidence['latency'] = netprobe.compare(before, netprobe.measure(self.net_targets))
+            else:
+                evidence['latency_summary'] = before
+            self.done.emit(evidence, None)
+        except Exception as e:
+            self.done.emit(None, e)
+        finally:
+            if server is not None:
+                server.stop()
+
+class ProfileThread(QThread):
+    # 在本机执行配置方案中的优化项
+    done = pyqtSignal(object, object)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+
+    def run(self):
+        try:
+            name, tweaks = fleet.load_profile(self.path)
+            runner = fleet.FleetRunner(fleet.LocalTransport(), tweaks, concurrency=1, retries=0)
+            self.done.emit(asyncio.run(runner.run(['localhost'], name)), None)
+        except Exception as e:
+            self.done.emit(None, e)
+
+class NetProbeThread(QThread):
+    # 持续探测网络时延，每秒把各目标的统计发给界面；事件循环运行在本线程中，不占用界面线程
+    updated = pyqtSignal(object)
+    done = pyqtSignal(object)
+
+    def __init__(self, targets, interval, parent=None):
+        super().__init__(parent)
+        self.targets = targets
+        self.interval = interval
+        self.stopping = False
+
+    def run(self):
+        try:
+            asyncio.run(self._run())
+            self.done.emit(None)
+        except Exception as e:
+            self.done.emit(e)
+
+    async def _run(self):
+        probe = netprobe.NetProbe(self.targets, self.interval)
+        task = asyncio.get_running_loop().create_task(probe.run(should_stop=lambda: self.stopping))
+        while not task.done():
+            await asyncio.wait({task}, timeout=1.0)
+            self.updated.emit(probe.summary())
+        task.result()
+
+    def stop(self):
+        self.stopping = True
+
+class ColdDataThread(QThread):
+    # 在后台线程中扫描、压缩或恢复冷数据；func 接收进度回调 progress(已处理字节, 总字节)
+    progress = pyqtSignal(object, object)
+    done = pyqtSignal(object, object)
+
+    def __init__(self, func, parent=None):
+        super().__init__(parent)
+        self.func = func
+
+    def run(self):
+        try:
+            self.done.emit(self.func(self.progress.emit), None)
+        except Exception as e:
+            self.done.emit(None, e)
+
 class WinOptimize(QMainWindow):
-    def __init__(self):
+    def __init__(self, core):
         super().__init__()
-        self.config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "winopt_config.json")
+        # 配置与后台线程由 AppCore 持有，窗口本身可随时销毁重建
+        self.core = core
+        self.config = core.config
         self.font_family = "微软雅黑"
-        self.current_lang = 'cn'
-        self.is_dark = False
-        self.load_config()
-        self.initUI()
+        self.current_lang = self.config.get('lang', 'cn')
+        self.is_dark = self.config.get('dark', False)
+        self.tcp_thread = None
+        self.profile_thread = None
+        self.cold_thread = None
+        self.net_thread = None
+        with tracer.span('startup.init_ui', 'startup'):
+            self.initUI()
         
         # 设置窗口样式
         self.setWindowTitle('WinOptimize')
         self.setGeometry(100, 100, 1000, 650)
         self.setMinimumSize(800, 600)
 
-    def load_config(self):
-        try:
-            if os.path.exists(self.config_path):
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    cfg = json.load(f)
-                    self.current_lang = cfg.get('lang', 'cn')
-                    self.is_dark = cfg.get('dark', False)
-        except Exception as e:
-            print("配置读取失败:", e)
-
     def save_config(self):
-        try:
-            cfg = {'lang': self.current_lang, 'dark': self.is_dark}
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(cfg, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print("配置保存失败:", e)
+        self.core.save_config(lang=self.current_lang, dark=self.is_dark)
+
+    def busy(self):
+        # 仍有后台任务时不能销毁窗口，否则任务线程随窗口一起被析构
+        threads = [self.tcp_thread, self.profile_thread, self.cold_thread]
+        return any(t is not None and t.isRunning() for t in threads) or self.tweak_runner.busy()
+
+    def closeEvent(self, event):
+        # 窗口不可见时没有必要继续探测网络
+        self.stop_net_probe(wait=not self.core.tray_mode)
+        if self.core.tray_mode:
+            # 托盘模式下关闭只是隐藏，由 AppCore 在空闲时销毁整个界面
+            event.ignore()
+            self.hide()
+            self.core.schedule_teardown()
+        else:
+            event.accept()
+
+    def shutdown(self):
+        self.probe_timer.stop()
+        self.tweak_runner.shutdown()
+        self.stop_net_probe(wait=True)
+
+    def handle_command(self, message):
+        # 命令行参数：--page 打开页面，--apply 应用优化项，--profile 执行配置方案
+        page = message.get('page')
+        if page in instance.PAGES:
+            self.switch_page(instance.PAGES.index(page))
+        elif page:
+            logger.warning("未知的页面: %s", page)
+        tweak_id = message.get('apply')
+        if tweak_id:
+            if tweak_id in self.tweak_model.rows:
+                self.switch_page(1)
+                self.on_tweak_action(tweak_id, 'apply')
+            elif self.current_lang == 'en':
+                QMessageBox.warning(self, "Error", f"Unknown optimization: {tweak_id}")
+            else:
+                QMessageBox.warning(self, "错误", f"未知的优化项: {tweak_id}")
+        if message.get('profile'):
+            self.run_profile(message['profile'])
+
+    def run_profile(self, path):
+        if self.profile_thread is not None and self.profile_thread.isRunning():
+            return
+        self.profile_thread = ProfileThread(path, self)
+        self.profile_thread.done.connect(self.on_profile_done)
+        self.profile_thread.start()
+
+    def on_profile_done(self, report, error):
+        if error is not None:
+            if self.current_lang == 'en':
+                QMessageBox.warning(self, "Error", f"Failed to run profile: {str(error)}")
+            else:
+                QMessageBox.warning(self, "错误", f"无法执行配置方案: {str(error)}")
+            return
+        lines = "\n".join(f"{t.tweak_id}: {t.status}" for host in report.results for t in host.tweaks)
+        if self.current_lang == 'en':
+            QMessageBox.information(self, "Profile", f"Profile {report.profile_name} finished.\n\n{lines}")
+        else:
+            QMessageBox.information(self, "配置方案", f"配置方案 {report.profile_name} 已执行完毕。\n\n{lines}")
 
     def initUI(self):
         # 设置全局字体
@@ -153,6 +566,7 @@ class WinOptimize(QMainWindow):
         self.optimization_btn = HoverButton("系统优化")
         self.disk_cleanup_btn = HoverButton("磁盘清理")
         self.software_btn = HoverButton("软件管理")
+        self.diagnostics_btn = HoverButton("诊断")
         
         # 设置图标（如果有图标资源）
         # self.settings_btn.setIcon(QIcon("icons/settings.png"))
@@ -165,6 +579,7 @@ class WinOptimize(QMainWindow):
         left_layout.addWidget(self.optimization_btn)
         left_layout.addWidget(self.disk_cleanup_btn)
         left_layout.addWidget(self.software_btn)
+        left_layout.addWidget(self.diagnostics_btn)
         left_layout.addStretch()
         
         # 创建右侧内容区域
@@ -174,17 +589,24 @@ class WinOptimize(QMainWindow):
         # 创建堆叠小部件来管理页面
         self.content_widget = QStackedWidget()
         
-        # 创建四个页面
-        self.settings_page = self.create_settings_page()
-        self.optimization_page = self.create_optimization_page()
-        self.disk_cleanup_page = self.create_disk_cleanup_page()
-        self.software_page = self.create_software_page()
+        # 创建各个页面
+        with tracer.span('startup.create_settings_page', 'startup'):
+            self.settings_page = self.create_settings_page()
+        with tracer.span('startup.create_optimization_page', 'startup'):
+            self.optimization_page = self.create_optimization_page()
+        with tracer.span('startup.create_disk_cleanup_page', 'startup'):
+            self.disk_cleanup_page = self.create_disk_cleanup_page()
+        with tracer.span('startup.create_software_page', 'startup'):
+            self.software_page = self.create_software_page()
+        with tracer.span('startup.create_diagnostics_page', 'startup'):
+            self.diagnostics_page = self.create_diagnostics_page()
         
         # 添加页面到堆叠小部件
         self.content_widget.addWidget(self.settings_page)
         self.content_widget.addWidget(self.optimization_page)
         self.content_widget.addWidget(self.disk_cleanup_page)
         self.content_widget.addWidget(self.software_page)
+        self.content_widget.addWidget(self.diagnostics_page)
         
         # 创建内容区域布局
         content_layout = QVBoxLayout(self.content_area)
@@ -203,15 +625,18 @@ class WinOptimize(QMainWindow):
         self.optimization_btn.clicked.connect(lambda: self.switch_page(1))
         self.disk_cleanup_btn.clicked.connect(lambda: self.switch_page(2))
         self.software_btn.clicked.connect(lambda: self.switch_page(3))
+        self.diagnostics_btn.clicked.connect(lambda: self.switch_page(4))
         
         # 默认显示系统优化页面
         self.switch_page(1)
         
         # 应用主题
-        self.apply_theme()
+        with tracer.span('startup.apply_theme', 'startup'):
+            self.apply_theme()
         
         # 更新UI语言
-        self.update_ui_language()
+        with tracer.span('startup.update_ui_language', 'startup'):
+            self.update_ui_language()
     
     def switch_page(self, index):
         # 重置所有按钮样式
@@ -271,6 +696,20 @@ class WinOptimize(QMainWindow):
                 background-color: #e0e0e0;
             }
         """)
+        self.diagnostics_btn.setStyleSheet("""
+            QPushButton {
+                background-color: transparent;
+                color: #333333;
+                text-align: left;
+                padding: 10px 15px;
+                border: none;
+                border-radius: 5px;
+                font-size: 14px;
+            }
+            QPushButton:hover {
+                background-color: #e0e0e0;
+            }
+        """)
         
         # 设置当前按钮样式
         active_style = """
@@ -292,10 +731,14 @@ class WinOptimize(QMainWindow):
             self.settings_btn.setStyleSheet(active_style)
         elif index == 1:
             self.optimization_btn.setStyleSheet(active_style)
+            self.probe_timer.start()
         elif index == 2:
             self.disk_cleanup_btn.setStyleSheet(active_style)
         elif index == 3:
             self.software_btn.setStyleSheet(active_style)
+        elif index == 4:
+            self.diagnostics_btn.setStyleSheet(active_style)
+            self.refresh_diagnostics()
         
         # 切换页面
         self.content_widget.setCurrentIndex(index)
@@ -402,12 +845,6 @@ class WinOptimize(QMainWindow):
         return scroll_area
     
     def create_optimization_page(self):
-        # 创建滚动区域
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setFrameShape(QFrame.NoFrame)
-        
-        # 创建内容窗口部件
         page = QWidget()
         layout = QVBoxLayout(page)
         layout.setContentsMargins(0, 0, 10, 0)
@@ -419,95 +856,98 @@ class WinOptimize(QMainWindow):
         layout.addWidget(title)
         self.optimization_title = title
         
-        # 卓越性能模式卡片
-        performance_frame = RoundedFrame()
-        performance_layout = QVBoxLayout(performance_frame)
-        
-        performance_title = QLabel()
-        performance_title.setFont(QFont(self.font_family, 16, QFont.Bold))
-        performance_layout.addWidget(performance_title)
-        self.performance_title = performance_title
-        
-        performance_desc = QLabel()
-        performance_desc.setWordWrap(True)
-        performance_desc.setFont(QFont(self.font_family, 12))
-        performance_layout.addWidget(performance_desc)
-        self.performance_desc = performance_desc
-        
-        performance_buttons = QHBoxLayout()
-        self.enable_performance_btn = ActionButton("", "#0078d4")
-        self.enable_performance_btn.clicked.connect(self.enable_ultimate_performance)
-        
-        self.open_power_btn = ActionButton("", "#4CAF50")
-        self.open_power_btn.clicked.connect(self.open_power_options)
-        
-        performance_buttons.addWidget(self.enable_performance_btn)
-        performance_buttons.addWidget(self.open_power_btn)
-        performance_buttons.addStretch()
-        
-        performance_layout.addLayout(performance_buttons)
-        layout.addWidget(performance_frame)
-        
-        # 游戏模式卡片
-        game_mode_frame = RoundedFrame()
-        game_mode_layout = QVBoxLayout(game_mode_frame)
-        
-        game_mode_title = QLabel()
-        game_mode_title.setFont(QFont(self.font_family, 16, QFont.Bold))
-        game_mode_layout.addWidget(game_mode_title)
-        self.game_mode_title = game_mode_title
-        
-        game_mode_desc = QLabel()
-        game_mode_desc.setWordWrap(True)
-        game_mode_desc.setFont(QFont(self.font_family, 12))
-        game_mode_layout.addWidget(game_mode_desc)
-        self.game_mode_desc = game_mode_desc
-        
-        game_mode_buttons = QHBoxLayout()
-        self.enable_game_mode_btn = ActionButton("", "#0078d4")
-        self.enable_game_mode_btn.clicked.connect(self.enable_game_mode)
+        # 搜索框
+        self.tweak_search = QLineEdit()
+        self.tweak_search.setFont(QFont(self.font_family, 11))
+        self.tweak_search.setClearButtonEnabled(True)
+        layout.addWidget(self.tweak_search)
         
-        self.disable_game_mode_btn = ActionButton("", "#dc3545")
-        self.disable_game_mode_btn.clicked.connect(self.disable_game_mode)
-        
-        game_mode_buttons.addWidget(self.enable_game_mode_btn)
-        game_mode_buttons.addWidget(self.disable_game_mode_btn)
-        game_mode_buttons.addStretch()
-        
-        game_mode_layout.addLayout(game_mode_buttons)
-        layout.addWidget(game_mode_frame)
-        
-        # TCP/IP协议栈优化卡片
-        tcp_frame = RoundedFrame()
-        tcp_layout = QVBoxLayout(tcp_frame)
-        
-        tcp_title = QLabel()
-        tcp_title.setFont(QFont(self.font_family, 16, QFont.Bold))
-        tcp_layout.addWidget(tcp_title)
-        self.tcp_title = tcp_title
-        
-        tcp_desc = QLabel()
-        tcp_desc.setWordWrap(True)
-        tcp_desc.setFont(QFont(self.font_family, 12))
-        tcp_layout.addWidget(tcp_desc)
-        self.tcp_desc = tcp_desc
-        
-        tcp_buttons = QHBoxLayout()
-        self.optimize_tcp_btn = ActionButton("", "#ff9800")
-        self.optimize_tcp_btn.clicked.connect(self.optimize_tcp_stack)
-        
-        tcp_buttons.addWidget(self.optimize_tcp_btn)
-        tcp_buttons.addStretch()
-        
-        tcp_layout.addLayout(tcp_buttons)
-        layout.addWidget(tcp_frame)
-        
-        layout.addStretch()
-        
-        # 设置滚动区域的窗口部件
-        scroll_area.setWidget(page)
-        
-        return scroll_area
+        # 优化项由 tweaks 目录下的数据文件定义
+        try:
+            tweaks = catalog.load_catalog()
+        except (OSError, ValueError) as e:
+            tracer.span('load_catalog', 'config').finish(f"{type(e).__name__}: {e}")
+            logger.warning("优化项目录读取失败: %s", e)
+            tweaks = []
+        self.tweak_model = TweakListModel(tweaks, self.current_lang, self)
+        self.tweak_proxy = QSortFilterProxyModel(self)
+        self.tweak_proxy.setSourceModel(self.tweak_model)
+        self.tweak_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.tweak_search.textChanged.connect(self.tweak_proxy.setFilterFixedString)
+        
+        # 虚拟化列表：行高固定，只绘制可见的卡片
+        self.tweak_delegate = TweakDelegate(self.font_family, self)
+        self.tweak_delegate.action_clicked.connect(self.on_tweak_action)
+        self.tweak_view = QListView()
+        self.tweak_view.setModel(self.tweak_proxy)
+        self.tweak_view.setItemDelegate(self.tweak_delegate)
+        self.tweak_view.setUniformItemSizes(True)
+        self.tweak_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.tweak_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.tweak_view.setFrameShape(QFrame.NoFrame)
+        self.tweak_view.setMouseTracking(True)
+        self.tweak_view.setStyleSheet("QListView { background: transparent; }")
+        layout.addWidget(self.tweak_view, 1)
+        
+        self.tweak_runner = TweakRunner(parent=self)
+        self.tweak_runner.probed.connect(self.tweak_model.set_state)
+        self.tweak_runner.finished.connect(self.on_tweak_finished)
+        
+        # 滚动或过滤停止后再探测可见项的状态
+        self.probe_timer = QTimer(self)
+        self.probe_timer.setSingleShot(True)
+        self.probe_timer.setInterval(150)
+        self.probe_timer.timeout.connect(self.probe_visible_tweaks)
+        # 信号参数不能传给 QTimer.start，否则会被当作间隔毫秒数
+        schedule_probe = lambda *args: self.probe_timer.start()
+        self.tweak_view.verticalScrollBar().valueChanged.connect(schedule_probe)
+        self.tweak_view.verticalScrollBar().rangeChanged.connect(schedule_probe)
+        self.tweak_proxy.layoutChanged.connect(schedule_probe)
+        self.tweak_proxy.rowsInserted.connect(schedule_probe)
+        self.tweak_proxy.rowsRemoved.connect(schedule_probe)
+        self.tweak_proxy.modelReset.connect(schedule_probe)
+        
+        return page
+    
+    def probe_visible_tweaks(self):
+        viewport = self.tweak_view.viewport()
+        first = self.tweak_view.indexAt(QPoint(10, 10))
+        if not first.isValid():
+            return
+        for row in range(first.row(), self.tweak_proxy.rowCount()):
+            index = self.tweak_proxy.index(row, 0)
+            if self.tweak_view.visualRect(index).top() > viewport.height():
+                break
+            tweak = index.data(TweakListModel.TweakRole)
+            if tweak.id not in self.tweak_model.states:
+                self.tweak_runner.probe(tweak)
+    
+    # 数据文件中 {"handler": ...} 只能调用以下界面方法
+    TWEAK_HANDLERS = ('open_power_options', 'optimize_tcp_stack', 'revert_tcp_stack')
+    
+    def on_tweak_action(self, tweak_id, action):
+        tweak = self.tweak_model.tweak(tweak_id)
+        handler = tweak.handler(action)
+        if handler is not None:
+            if handler in self.TWEAK_HANDLERS:
+                getattr(self, handler)()
+            else:
+                logger.warning("未知的处理方法: %s", handler)
+            return
+        if tweak.admin and not is_admin():
+            if self.current_lang == 'en':
+                QMessageBox.warning(self, "Error", "This optimization requires administrator privileges.")
+            else:
+                QMessageBox.warning(self, "错误", "该优化项需要管理员权限。")
+            return
+        self.tweak_model.set_status(tweak_id, ('running', None))
+        self.tweak_runner.run(tweak, action)
+    
+    def on_tweak_finished(self, tweak_id, action, result):
+        if result == 0:
+            self.tweak_model.set_status(tweak_id, ('done', None))
+        else:
+            self.tweak_model.set_status(tweak_id, ('failed', result))
     
     def create_disk_cleanup_page(self):
         # 创建滚动区域
@@ -577,6 +1017,40 @@ class WinOptimize(QMainWindow):
         temp_layout.addLayout(temp_buttons)
         layout.addWidget(temp_frame)
         
+        # 冷数据压缩卡片
+        cold_frame = RoundedFrame()
+        cold_layout = QVBoxLayout(cold_frame)
+        
+        cold_title = QLabel()
+        cold_title.setFont(QFont(self.font_family, 16, QFont.Bold))
+        cold_layout.addWidget(cold_title)
+        self.cold_title = cold_title
+        
+        cold_desc = QLabel()
+        cold_desc.setWordWrap(True)
+        cold_desc.setFont(QFont(self.font_family, 12))
+        cold_layout.addWidget(cold_desc)
+        self.cold_desc = cold_desc
+        
+        cold_status = QLabel()
+        cold_status.setFont(QFont(self.font_family, 11))
+        cold_status.hide()
+        cold_layout.addWidget(cold_status)
+        self.cold_status = cold_status
+        
+        cold_buttons = QHBoxLayout()
+        self.compact_cold_btn = ActionButton("", "#0078d4")
+        self.compact_cold_btn.clicked.connect(self.compact_cold_data)
+        self.restore_cold_btn = ActionButton("", "#6c757d")
+        self.restore_cold_btn.clicked.connect(self.restore_cold_data)
+        
+        cold_buttons.addWidget(self.compact_cold_btn)
+        cold_buttons.addWidget(self.restore_cold_btn)
+        cold_buttons.addStretch()
+        
+        cold_layout.addLayout(cold_buttons)
+        layout.addWidget(cold_frame)
+        
         layout.addStretch()
         
         # 设置滚动区域的窗口部件
@@ -620,80 +1094,271 @@ class WinOptimize(QMainWindow):
         
         return scroll_area
     
-    def enable_ultimate_performance(self):
+    def create_diagnostics_page(self):
+        # 创建滚动区域
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setFrameShape(QFrame.NoFrame)
+        
+        # 创建内容窗口部件
+        page = QWidget()
+        layout = QVBoxLayout(page)
+        layout.setContentsMargins(0, 0, 10, 0)
+        layout.setSpacing(15)
+        
+        # 标题
+        title = QLabel()
+        title.setFont(QFont(self.font_family, 22, QFont.Bold))
+        layout.addWidget(title)
+        self.diagnostics_title = title
+        
+        # 网络时延卡片
+        net_frame = RoundedFrame()
+        net_layout = QVBoxLayout(net_frame)
+        
+        net_title = QLabel()
+        net_title.setFont(QFont(self.font_family, 16, QFont.Bold))
+        net_layout.addWidget(net_title)
+        self.net_title = net_title
+        
+        net_desc = QLabel()
+        net_desc.setWordWrap(True)
+        net_desc.setFont(QFont(self.font_family, 12))
+        net_layout.addWidget(net_desc)
+        self.net_desc = net_desc
+        
+        self.net_table = QTableWidget(0, 8)
+        self.net_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.net_table.verticalHeader().setVisible(False)
+        self.net_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.net_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.net_table.setMinimumHeight(180)
+        net_layout.addWidget(self.net_table)
+        
+        net_buttons = QHBoxLayout()
+        self.net_probe_btn = ActionButton("", "#0078d4")
+        self.net_probe_btn.clicked.connect(self.toggle_net_probe)
+        net_buttons.addWidget(self.net_probe_btn)
+        net_buttons.addStretch()
+        
+        net_layout.addLayout(net_buttons)
+        layout.addWidget(net_frame)
+        
+        # 各操作耗时统计卡片
+        stats_frame = RoundedFrame()
+        stats_layout = QVBoxLayout(stats_frame)
+        
+        stats_title = QLabel()
+        stats_title.setFont(QFont(self.font_family, 16, QFont.Bold))
+        stats_layout.addWidget(stats_title)
+        self.stats_title = stats_title
+        
+        self.stats_table = QTableWidget(0, 5)
+        self.stats_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.stats_table.verticalHeader().setVisible(False)
+        self.stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.stats_table.setMinimumHeight(180)
+        stats_layout.addWidget(self.stats_table)
+        layout.addWidget(stats_frame)
+        
+        # 最近记录卡片
+        spans_frame = RoundedFrame()
+        spans_layout = QVBoxLayout(spans_frame)
+        
+        spans_title = QLabel()
+        spans_title.setFont(QFont(self.font_family, 16, QFont.Bold))
+        spans_layout.addWidget(spans_title)
+        self.spans_title = spans_title
+        
+        self.spans_table = QTableWidget(0, 8)
+        self.spans_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.spans_table.verticalHeader().setVisible(False)
+        self.spans_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.spans_table.horizontalHeader().setStretchLastSection(True)
+        self.spans_table.setMinimumHeight(260)
+        spans_layout.addWidget(self.spans_table)
+        
+        diagnostics_buttons = QHBoxLayout()
+        self.refresh_diagnostics_btn = ActionButton("", "#0078d4")
+        self.refresh_diagnostics_btn.clicked.connect(self.refresh_diagnostics)
+        
+        self.export_jsonl_btn = ActionButton("", "#4CAF50")
+        self.export_jsonl_btn.clicked.connect(lambda: self.export_trace('jsonl'))
+        
+        self.export_chrome_btn = ActionButton("", "#4CAF50")
+        self.export_chrome_btn.clicked.connect(lambda: self.export_trace('chrome'))
+        
+        diagnostics_buttons.addWidget(self.refresh_diagnostics_btn)
+        diagnostics_buttons.addWidget(self.export_jsonl_btn)
+        diagnostics_buttons.addWidget(self.export_chrome_btn)
+        diagnostics_buttons.addStretch()
+        
+        spans_layout.addLayout(diagnostics_buttons)
+        layout.addWidget(spans_frame)
+        layout.addStretch()
+        
+        # 设置滚动区域的窗口部件
+        scroll_area.setWidget(page)
+        
+        return scroll_area
+    
+    def refresh_diagnostics(self):
+        def fmt(value):
+            return "" if value is None else f"{value:.1f}"
+        
+        stats = tracer.stats()
+        self.stats_table.setRowCount(len(stats))
+        for row, name in enumerate(sorted(stats)):
+            s = stats[name]
+            for col, value in enumerate([name, str(s['count']), str(s['errors']), fmt(s['p50']), fmt(s['p95'])]):
+                self.stats_table.setItem(row, col, QTableWidgetItem(value))
+        
+        spans = list(reversed(tracer.recent(200)))
+        self.spans_table.setRowCount(len(spans))
+        for row, span in enumerate(spans):
+            d = span.to_dict()
+            values = [
+                time.strftime('%H:%M:%S', time.localtime(d['time'])),
+                d['name'],
+                f"{d['duration_ms']:.1f}",
+                "" if d['exit_code'] is None else str(d['exit_code']),
+                "" if d['output_size'] is None else str(d['output_size']),
+                str(d['retries']),
+                d['cat'],
+                d['error'] or "",
+            ]
+            for col, value in enumerate(values):
+                self.spans_table.setItem(row, col, QTableWidgetItem(value))
+    
+    def net_targets(self):
+        return self.config.get('net_targets') or list(netprobe.DEFAULT_TARGETS)
+
+    def toggle_net_probe(self):
+        if self.net_thread is not None and self.net_thread.isRunning():
+            # 等在途的探测结束后线程才退出
+            self.stop_net_probe()
+            self.net_probe_btn.setEnabled(False)
+            return
+        self.net_thread = NetProbeThread(self.net_targets(), self.config.get('net_interval', 0.5), self)
+        self.net_thread.updated.connect(self.on_net_updated)
+        self.net_thread.done.connect(self.on_net_probe_done)
+        self.net_thread.start()
+        self.net_probe_btn.setText(self.net_probe_texts[1])
+
+    def stop_net_probe(self, wait=False):
+        if self.net_thread is not None and self.net_thread.isRunning():
+            self.net_thread.stop()
+            if wait:
+                self.net_thread.wait()
+
+    def on_net_updated(self, summary):
+        def fmt(value):
+            return "" if value is None else f"{value:.1f}"
+        
+        self.net_table.setRowCount(len(summary))
+        for row, r in enumerate(summary):
+            values = [r['target'], str(r['sent']), fmt(r['loss']), fmt(r['min']), fmt(r['p50']),
+                      fmt(r['p95']), fmt(r['jitter']), fmt(r['last'])]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col == 0 and r['errors']:
+                    item.setToolTip(', '.join(f"{k} x{v}" for k, v in r['errors'].items()))
+                self.net_table.setItem(row, col, item)
+
+    def on_net_probe_done(self, error):
+        self.net_probe_btn.setEnabled(True)
+        self.net_probe_btn.setText(self.net_probe_texts[0])
+        if error is not None:
+            if self.current_lang == 'en':
+                QMessageBox.warning(self, "Error", f"Network probe failed: {str(error)}")
+            else:
+                QMessageBox.warning(self, "错误", f"网络探测失败: {str(error)}")
+    
+    def export_trace(self, fmt):
+        if fmt == 'chrome':
+            path, _ = QFileDialog.getSaveFileName(self, "", "winoptimize_trace.json", "JSON (*.json)")
+        else:
+            path, _ = QFileDialog.getSaveFileName(self, "", "winoptimize_trace.jsonl", "JSON Lines (*.jsonl)")
+        if not path:
+            return
         try:
-            # 使用管理员权限运行PowerShell命令
-            command = "powershell -Command \"Start-Process powershell -ArgumentList '-NoProfile -ExecutionPolicy Bypass -Command \\\"powercfg -duplicatescheme e9a42b02-d5df-448d-aa00-03f14749eb61\\\"' -Verb RunAs\""
-            subprocess.Popen(command, shell=True)
+            if fmt == 'chrome':
+                tracer.export_chrome(path)
+            else:
+                tracer.export_jsonl(path)
             if self.current_lang == 'en':
-                QMessageBox.information(self, "Success", "Ultimate Performance mode has been enabled. Please check your power options.")
+                QMessageBox.information(self, "Success", f"Trace exported to {path}")
             else:
-                QMessageBox.information(self, "成功", "已尝试开启卓越性能模式，请检查电源选项中是否已添加。")
+                QMessageBox.information(self, "成功", f"追踪记录已导出到 {path}")
         except Exception as e:
             if self.current_lang == 'en':
-                QMessageBox.warning(self, "Error", f"Failed to enable Ultimate Performance mode: {str(e)}")
+                QMessageBox.warning(self, "Error", f"Failed to export trace: {str(e)}")
             else:
-                QMessageBox.warning(self, "错误", f"无法开启卓越性能模式: {str(e)}")
+                QMessageBox.warning(self, "错误", f"无法导出追踪记录: {str(e)}")
     
     def open_power_options(self):
         try:
             # 打开控制面板中的电源选项
-            os.system("control.exe powercfg.cpl")
+            with tracer.span('open_power_options') as span:
+                span.exit_code = os.system("control.exe powercfg.cpl")
         except Exception as e:
             if self.current_lang == 'en':
                 QMessageBox.warning(self, "Error", f"Failed to open power options: {str(e)}")
             else:
                 QMessageBox.warning(self, "错误", f"无法打开电源选项: {str(e)}")
     
-    def enable_game_mode(self):
-        try:
-            # 使用PowerShell命令开启游戏模式
-            command = "powershell -Command \"Set-ItemProperty -Path 'HKCU:\\Software\\Microsoft\\GameBar' -Name 'AutoGameModeEnabled' -Value 1\""
-            subprocess.Popen(command, shell=True)
-            if self.current_lang == 'en':
-                QMessageBox.information(self, "Success", "Windows Game Mode has been enabled.")
-            else:
-                QMessageBox.information(self, "成功", "已开启Windows游戏模式。")
-        except Exception as e:
-            if self.current_lang == 'en':
-                QMessageBox.warning(self, "Error", f"Failed to enable Game Mode: {str(e)}")
-            else:
-                QMessageBox.warning(self, "错误", f"无法开启游戏模式: {str(e)}")
-                
-    def disable_game_mode(self):
-        try:
-            # 使用PowerShell命令关闭游戏模式
-            command = "powershell -Command \"Set-ItemProperty -Path 'HKCU:\\Software\\Microsoft\\GameBar' -Name 'AutoGameModeEnabled' -Value 0\""
-            subprocess.Popen(command, shell=True)
+    def optimize_tcp_stack(self):
+        # 先实测吞吐量再选择自动调优级别，测量在后台线程中进行
+        if self.tcp_thread is not None and self.tcp_thread.isRunning():
+            return
+        self.tweak_model.set_status('tcp_autotuning', ('running', None))
+        self.tcp_thread = TcpTuneThread(self.config.get('tcp_target'), self.net_targets(), self)
+        self.tcp_thread.done.connect(self.on_tcp_tuned)
+        self.tcp_thread.start()
+
+    def on_tcp_tuned(self, evidence, error):
+        if error is not None:
+            self.tweak_model.set_status('tcp_autotuning', ('failed', None))
             if self.current_lang == 'en':
-                QMessageBox.information(self, "Success", "Windows Game Mode has been disabled.")
+                QMessageBox.warning(self, "Error", f"Failed to optimize TCP/IP stack: {str(error)}")
             else:
-                QMessageBox.information(self, "成功", "已关闭Windows游戏模式。")
-        except Exception as e:
+                QMessageBox.warning(self, "错误", f"无法优化TCP/IP协议栈: {str(error)}")
+            return
+        level = evidence['recommended_level']
+        if not evidence['applied']:
+            self.tweak_model.set_status('tcp_autotuning', ('done', None))
+            latency = netprobe.format_summary(evidence['latency_summary'])
             if self.current_lang == 'en':
-                QMessageBox.warning(self, "Error", f"Failed to disable Game Mode: {str(e)}")
+                QMessageBox.information(self, "TCP/IP Stack", f"No remote throughput server (tcp_target) is configured. Measurements on loopback cannot tell the levels apart, so nothing was changed.\n\nLoopback measurements suggest {level}.\n\n{tcp_tuning.format_evidence(evidence)}\n\nCurrent latency:\n{latency}")
             else:
-                QMessageBox.warning(self, "错误", f"无法关闭游戏模式: {str(e)}")
+                QMessageBox.information(self, "TCP/IP 协议栈", f"未配置远端测速服务端（tcp_target）。回环上的测量无法区分各级别，因此没有修改任何设置。\n\n回环测量建议的级别为 {level}。\n\n{tcp_tuning.format_evidence(evidence)}\n\n当前网络时延：\n{latency}")
+            return
+        self.tweak_model.set_status('tcp_autotuning', ('done', level))
+        latency = netprobe.format_comparison(evidence['latency'])
+        if self.current_lang == 'en':
+            QMessageBox.information(self, "Success", f"Based on the measurements, TCP auto-tuning level has been set to {level}.\n\n{tcp_tuning.format_evidence(evidence)}\n\nLatency before > after:\n{latency}")
+        else:
+            QMessageBox.information(self, "成功", f"已根据实测结果将 TCP 自动调优级别设置为 {level}。\n\n{tcp_tuning.format_evidence(evidence)}\n\n调优前后的网络时延：\n{latency}")
 
-    def optimize_tcp_stack(self):
+    def revert_tcp_stack(self):
         try:
-            command = "netsh int tcp set global autotuninglevel=disabled"
-            subprocess.Popen(command, shell=True)
+            with tracer.span('revert_tcp_stack'):
+                level = tcp_tuning.revert()
             if self.current_lang == 'en':
-                QMessageBox.information(self, "Success", "TCP/IP stack optimization command executed. Please restart your computer for changes to take effect.")
+                QMessageBox.information(self, "Success", f"TCP auto-tuning level has been restored to {level}.")
             else:
-                QMessageBox.information(self, "成功", "已执行TCP/IP协议栈优化命令，重启电脑后生效。")
+                QMessageBox.information(self, "成功", f"已将 TCP 自动调优级别恢复为 {level}。")
         except Exception as e:
             if self.current_lang == 'en':
-                QMessageBox.warning(self, "Error", f"Failed to optimize TCP/IP stack: {str(e)}")
+                QMessageBox.warning(self, "Error", f"Failed to revert TCP settings: {str(e)}")
             else:
-                QMessageBox.warning(self, "错误", f"无法优化TCP/IP协议栈: {str(e)}")
+                QMessageBox.warning(self, "错误", f"无法恢复 TCP 设置: {str(e)}")
     
     def run_disk_cleanup(self):
         try:
             # 使用cleanmgr命令运行磁盘清理
-            command = "cleanmgr"
-            subprocess.Popen(command, shell=True)
+            command = commands.DISK_CLEANUP_CMD
+            tracer.popen('run_disk_cleanup', command)
             if self.current_lang == 'en':
                 QMessageBox.information(self, "Success", "Disk Cleanup utility has been launched.")
             else:
@@ -713,8 +1378,8 @@ class WinOptimize(QMainWindow):
             ]
             
             # 使用PowerShell命令清理临时文件
-            command = "powershell -Command \"Start-Process powershell -ArgumentList '-NoProfile -ExecutionPolicy Bypass -Command \\\"Remove-Item -Path $env:TEMP\\* -Recurse -Force -ErrorAction SilentlyContinue\\\"' -Verb RunAs\""
-            subprocess.Popen(command, shell=True)
+            command = commands.elevated(commands.CLEAN_TEMP_PS)
+            tracer.popen('clean_temp_files', command)
             
             if self.current_lang == 'en':
                 QMessageBox.information(self, "Success", "Temporary files cleanup process has been initiated.")
@@ -726,6 +1391,111 @@ class WinOptimize(QMainWindow):
             else:
                 QMessageBox.warning(self, "错误", f"无法清理临时文件: {str(e)}")
     
+    def start_cold_job(self, func, on_done):
+        if self.cold_thread is not None and self.cold_thread.isRunning():
+            return False
+        self.compact_cold_btn.setEnabled(False)
+        self.restore_cold_btn.setEnabled(False)
+        self.cold_thread = ColdDataThread(func, self)
+        self.cold_thread.progress.connect(self.on_cold_progress)
+        self.cold_thread.done.connect(on_done)
+        self.cold_thread.start()
+        return True
+
+    def finish_cold_job(self):
+        self.compact_cold_btn.setEnabled(True)
+        self.restore_cold_btn.setEnabled(True)
+        self.cold_status.hide()
+
+    def on_cold_progress(self, done, total):
+        percent = done * 100 // total if total else 100
+        if self.current_lang == 'en':
+            self.cold_status.setText(f"Compressing... {percent}% ({done // 1048576} / {total // 1048576} MB)")
+        else:
+            self.cold_status.setText(f"正在压缩… {percent}%（{done // 1048576} / {total // 1048576} MB）")
+
+    def compact_cold_data(self):
+        root = QFileDialog.getExistingDirectory(self)
+        if not root:
+            return
+        days = self.config.get('cold_days', coldstore.COLD_DAYS)
+        min_size = self.config.get('cold_min_mb', coldstore.MIN_SIZE // 1048576) * 1048576
+        if self.start_cold_job(lambda progress: coldstore.find_cold_files(root, days, min_size),
+                               lambda files, error: self.on_cold_scanned(root, days, files, error)):
+            self.cold_status.setText("Scanning..." if self.current_lang == 'en' else "正在扫描…")
+            self.cold_status.show()
+
+    def on_cold_scanned(self, root, days, files, error):
+        self.finish_cold_job()
+        if error is not None:
+            if self.current_lang == 'en':
+                QMessageBox.warning(self, "Error", f"Failed to scan folder: {str(error)}")
+            else:
+                QMessageBox.warning(self, "错误", f"无法扫描文件夹: {str(error)}")
+            return
+        if not files:
+            if self.current_lang == 'en':
+                QMessageBox.information(self, "Compact Cold Data", f"No large files unused for more than {days} days were found.")
+            else:
+                QMessageBox.information(self, "压缩冷数据", f"没有找到超过 {days} 天未使用的大文件。")
+            return
+        size_mb = sum(st.st_size for _, st in files) / 1048576
+        if self.current_lang == 'en':
+            answer = QMessageBox.question(self, "Compact Cold Data", f"Found {len(files)} files ({size_mb:.0f} MB) unused for more than {days} days.\n\nCompress them into an archive in this folder? The originals are deleted only after the archive has been verified.")
+        else:
+            answer = QMessageBox.question(self, "压缩冷数据", f"找到 {len(files)} 个超过 {days} 天未使用的文件（{size_mb:.0f} MB）。\n\n是否压缩到该文件夹下的归档中？归档校验无误后才会删除原文件。")
+        if answer != QMessageBox.Yes:
+            return
+        codec = self.config.get('cold_codec', 'lzma')
+        if self.start_cold_job(lambda progress: coldstore.archive(root, files, codec=codec, remove=True, progress=progress),
+                               self.on_cold_archived):
+            self.on_cold_progress(0, sum(st.st_size for _, st in files))
+            self.cold_status.show()
+
+    def on_cold_archived(self, result, error):
+        self.finish_cold_job()
+        if error is not None:
+            if self.current_lang == 'en':
+                QMessageBox.warning(self, "Error", f"Failed to compact cold data: {str(error)}")
+            else:
+                QMessageBox.warning(self, "错误", f"无法压缩冷数据: {str(error)}")
+            return
+        saved_mb = max(0, result.freed_bytes) / 1048576
+        if self.current_lang == 'en':
+            message = f"{len(result.removed)} files compressed into {result.path}, freeing {saved_mb:.0f} MB."
+            if result.kept:
+                message += f"\n\n{len(result.kept)} files were kept because they failed verification or changed during compression."
+            QMessageBox.information(self, "Success", message)
+        else:
+            message = f"已将 {len(result.removed)} 个文件压缩到 {result.path}，释放 {saved_mb:.0f} MB。"
+            if result.kept:
+                message += f"\n\n{len(result.kept)} 个文件校验未通过或在压缩期间被修改，已保留原文件。"
+            QMessageBox.information(self, "成功", message)
+
+    def restore_cold_data(self):
+        path, _ = QFileDialog.getOpenFileName(self, "", "", f"WinOptimize (*{coldstore.SUFFIX})")
+        if not path:
+            return
+        root = os.path.dirname(path)
+        if self.start_cold_job(lambda progress: coldstore.ColdArchive(path).extract_all(root), self.on_cold_restored):
+            self.cold_status.setText("Restoring..." if self.current_lang == 'en' else "正在恢复…")
+            self.cold_status.show()
+
+    def on_cold_restored(self, counts, error):
+        self.finish_cold_job()
+        if error is not None:
+            if self.current_lang == 'en':
+                QMessageBox.warning(self, "Error", f"Failed to restore archive: {str(error)}")
+            else:
+                QMessageBox.warning(self, "错误", f"无法恢复归档: {str(error)}")
+            return
+        extracted, skipped = counts
+        if self.current_lang == 'en':
+            QMessageBox.information(self, "Success", f"{extracted} files restored, {skipped} existing files skipped.")
+        else:
+            QMessageBox.information(self, "成功", f"已恢复 {extracted} 个文件，跳过 {skipped} 个已存在的文件。")
+    
+    @tracer.traced()
     def switch_theme(self, dark_mode):
         self.is_dark = dark_mode
         self.apply_theme()
@@ -761,6 +1531,10 @@ class WinOptimize(QMainWindow):
             # 更新内容区域样式
             self.content_area.setStyleSheet("background-color: #202020;")
             
+            # 更新优化项卡片
+            self.tweak_delegate.dark = True
+            self.tweak_view.viewport().update()
+            
             # 更新按钮样式
             self.dark_theme_btn.setChecked(True)
             self.light_theme_btn.setChecked(False)
@@ -788,10 +1562,15 @@ class WinOptimize(QMainWindow):
             # 更新内容区域样式
             self.content_area.setStyleSheet("background-color: white;")
             
+            # 更新优化项卡片
+            self.tweak_delegate.dark = False
+            self.tweak_view.viewport().update()
+            
             # 更新按钮样式
             self.dark_theme_btn.setChecked(False)
             self.light_theme_btn.setChecked(True)
     
+    @tracer.traced()
     def switch_language(self, lang):
         self.current_lang = lang
         if lang == 'cn':
@@ -819,17 +1598,9 @@ class WinOptimize(QMainWindow):
                 'dark': '深色',
                 'about': '关于',
                 'about_text': 'WinOptimize 是一款功能强大的 Windows 系统优化工具，提供系统优化、磁盘清理等功能，帮助您提升系统性能。',
-                'performance': '卓越性能模式',
-                'performance_desc': '启用 Windows 隐藏的卓越性能电源计划，提高系统响应速度和性能。',
-                'enable_performance': '开启卓越性能',
-                'open_power': '打开电源管理',
-                'game_mode': '游戏模式',
-                'game_mode_desc': '开启或关闭 Windows 游戏模式，优化游戏性能，提供更好的游戏体验。',
-                'enable_game': '开启游戏模式',
-                'disable_game': '关闭游戏模式',
-                'tcp': '优化 TCP/IP 协议栈',
-                'tcp_desc': '通过优化 TCP/IP 协议栈提升网络性能。',
-                'optimize_tcp': '优化 TCP/IP 协议栈',
+                'search': '搜索优化项…',
+                'tweak': {'admin': '需要管理员', 'enabled': '已启用', 'disabled': '未启用',
+                          'running': '正在执行…', 'done': '已完成', 'failed': '失败'},
                 'disk_cleanup_title': '磁盘清理',
                 'cleanup': 'Windows 磁盘清理',
                 'cleanup_desc': '使用 Windows 内置的磁盘清理工具清理系统垃圾文件，释放磁盘空间。',
@@ -837,7 +1608,24 @@ class WinOptimize(QMainWindow):
                 'temp': '清理临时文件',
                 'temp_desc': '清理系统临时文件夹中的文件，释放磁盘空间并提高系统性能。',
                 'clean_temp': '清理临时文件',
-                'software_desc': '这里是软件管理页面，可以添加软件安装、卸载和管理功能。'
+                'cold': '压缩冷数据',
+                'cold_desc': '把文件夹中长期未使用的大文件压缩成分块归档，校验无误后删除原文件；需要时可随时恢复单个或全部文件。',
+                'compact_cold': '选择文件夹并压缩',
+                'restore_cold': '恢复归档',
+                'software_desc': '这里是软件管理页面，可以添加软件安装、卸载和管理功能。',
+                'diagnostics': '诊断',
+                'net': '网络时延',
+                'net_desc': '并发测量 TCP 建连与 DNS 解析时延，统计最近样本的丢包率与抖动。目标可在配置文件的 net_targets 中修改。',
+                'net_headers': ['目标', '已发送', '丢包 (%)', '最小 (ms)', 'p50 (ms)', 'p95 (ms)', '抖动 (ms)', '最近 (ms)'],
+                'net_start': '开始探测',
+                'net_stop': '停止探测',
+                'stats': '操作耗时统计',
+                'stats_headers': ['名称', '次数', '失败', 'p50 (ms)', 'p95 (ms)'],
+                'spans': '最近记录',
+                'spans_headers': ['时间', '名称', '耗时 (ms)', '退出码', '输出字节', '重试', '类别', '错误'],
+                'refresh': '刷新',
+                'export_jsonl': '导出 JSON Lines',
+                'export_chrome': '导出 Chrome Trace'
             },
             'en': {
                 'settings': 'Settings',
@@ -852,17 +1640,9 @@ class WinOptimize(QMainWindow):
                 'dark': 'Dark',
                 'about': 'About',
                 'about_text': 'WinOptimize is a powerful Windows system optimization tool that provides system optimization, disk cleanup and other features to help you improve system performance.',
-                'performance': 'Ultimate Performance Mode',
-                'performance_desc': 'Enable Windows hidden Ultimate Performance power plan to improve system responsiveness and performance.',
-                'enable_performance': 'Enable Ultimate Performance',
-                'open_power': 'Open Power Options',
-                'game_mode': 'Game Mode',
-                'game_mode_desc': 'Enable or disable Windows Game Mode for better gaming experience.',
-                'enable_game': 'Enable Game Mode',
-                'disable_game': 'Disable Game Mode',
-                'tcp': 'Optimize TCP/IP Stack',
-                'tcp_desc': 'Optimize the TCP/IP stack to improve network performance.',
-                'optimize_tcp': 'Optimize TCP/IP Stack',
+                'search': 'Search optimizations...',
+                'tweak': {'admin': 'Admin', 'enabled': 'Enabled', 'disabled': 'Disabled',
+                          'running': 'Running...', 'done': 'Done', 'failed': 'Failed'},
                 'disk_cleanup_title': 'Disk Cleanup',
                 'cleanup': 'Windows Disk Cleanup',
                 'cleanup_desc': 'Use Windows built-in disk cleanup tool to clean up system junk files and free up disk space.',
@@ -870,7 +1650,24 @@ class WinOptimize(QMainWindow):
                 'temp': 'Clean Temporary Files',
                 'temp_desc': 'Clean files in system temporary folders to free up disk space and improve system performance.',
                 'clean_temp': 'Clean Temp Files',
-                'software_desc': 'This is the software management page. You can add software install, uninstall, and management features.'
+                'cold': 'Compact Cold Data',
+                'cold_desc': 'Compress large files that have not been used for a long time into a chunked archive, deleting the originals only after verification. Single files or the whole archive can be restored at any time.',
+                'compact_cold': 'Choose Folder and Compact',
+                'restore_cold': 'Restore Archive',
+                'software_desc': 'This is the software management page. You can add software install, uninstall, and management features.',
+                'diagnostics': 'Diagnostics',
+                'net': 'Network Latency',
+                'net_desc': 'Measure TCP connect and DNS resolution latency concurrently, with loss and jitter over the most recent samples. Targets can be changed in net_targets in the config file.',
+                'net_headers': ['Target', 'Sent', 'Loss (%)', 'Min (ms)', 'p50 (ms)', 'p95 (ms)', 'Jitter (ms)', 'Last (ms)'],
+                'net_start': 'Start Probing',
+                'net_stop': 'Stop Probing',
+                'stats': 'Latency by Action',
+                'stats_headers': ['Name', 'Count', 'Errors', 'p50 (ms)', 'p95 (ms)'],
+                'spans': 'Recent Spans',
+                'spans_headers': ['Time', 'Name', 'Duration (ms)', 'Exit Code', 'Output Bytes', 'Retries', 'Category', 'Error'],
+                'refresh': 'Refresh',
+                'export_jsonl': 'Export JSON Lines',
+                'export_chrome': 'Export Chrome Trace'
             }
         }
         
@@ -881,6 +1678,7 @@ class WinOptimize(QMainWindow):
         self.optimization_btn.setText(t['optimization'])
         self.disk_cleanup_btn.setText(t['disk_cleanup'])
         self.software_btn.setText(t['software'])
+        self.diagnostics_btn.setText(t['diagnostics'])
         
         # 更新设置页面
         self.settings_title.setText(t['settings'])
@@ -895,17 +1693,10 @@ class WinOptimize(QMainWindow):
         
         # 更新优化页面
         self.optimization_title.setText(t['optimization'])
-        self.performance_title.setText(t['performance'])
-        self.performance_desc.setText(t['performance_desc'])
-        self.enable_performance_btn.setText(t['enable_performance'])
-        self.open_power_btn.setText(t['open_power'])
-        self.game_mode_title.setText(t['game_mode'])
-        self.game_mode_desc.setText(t['game_mode_desc'])
-        self.enable_game_mode_btn.setText(t['enable_game'])
-        self.disable_game_mode_btn.setText(t['disable_game'])
-        self.tcp_title.setText(t['tcp'])
-        self.tcp_desc.setText(t['tcp_desc'])
-        self.optimize_tcp_btn.setText(t['optimize_tcp'])
+        self.tweak_search.setPlaceholderText(t['search'])
+        self.tweak_delegate.lang = lang
+        self.tweak_delegate.texts = t['tweak']
+        self.tweak_model.set_lang(lang)
         
         # 更新磁盘清理页面
         self.disk_cleanup_title.setText(t['disk_cleanup_title'])
@@ -915,25 +1706,210 @@ class WinOptimize(QMainWindow):
         self.temp_title.setText(t['temp'])
         self.temp_desc.setText(t['temp_desc'])
         self.clean_temp_btn.setText(t['clean_temp'])
+        self.cold_title.setText(t['cold'])
+        self.cold_desc.setText(t['cold_desc'])
+        self.compact_cold_btn.setText(t['compact_cold'])
+        self.restore_cold_btn.setText(t['restore_cold'])
         
         # 更新软件管理页面
         self.software_title.setText(t['software'])
         self.software_desc.setText(t['software_desc'])
+        
+        # 更新诊断页面
+        self.diagnostics_title.setText(t['diagnostics'])
+        self.net_title.setText(t['net'])
+        self.net_desc.setText(t['net_desc'])
+        self.net_table.setHorizontalHeaderLabels(t['net_headers'])
+        self.net_probe_texts = (t['net_start'], t['net_stop'])
+        running = self.net_thread is not None and self.net_thread.isRunning()
+        self.net_probe_btn.setText(self.net_probe_texts[1 if running else 0])
+        self.stats_title.setText(t['stats'])
+        self.stats_table.setHorizontalHeaderLabels(t['stats_headers'])
+        self.spans_title.setText(t['spans'])
+        self.spans_table.setHorizontalHeaderLabels(t['spans_headers'])
+        self.refresh_diagnostics_btn.setText(t['refresh'])
+        self.export_jsonl_btn.setText(t['export_jsonl'])
+        self.export_chrome_btn.setText(t['export_chrome'])
+
+class AppCore(QObject):
+    # 常驻部分：配置、后台调度与采样线程、托盘图标。窗口按需创建，
+    # 托盘模式下关闭窗口会销毁全部页面控件，再次打开时重建
+
+    # 其他启动实例转发来的命令，由监听线程发出，在界面线程处理
+    remote_command = pyqtSignal(object)
+
+    def __init__(self, tray=False, require_tray=True):
+        super().__init__()
+        self.config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "winopt_config.json")
+        self.config = {}
+        self.window = None
+        self.tray = None
+        self.governor_thread = None
+        self.maintenance_thread = None
+        self.remote_command.connect(self.handle_command)
+        # 启动各阶段分别记录耗时
+        with tracer.span('startup.load_config', 'startup'):
+            self.load_config()
+        self.tray_mode = tray or bool(self.config.get('tray'))
+        # 为 False 时即使没有系统托盘也保持托盘模式（关闭窗口即销毁界面），供内存测量等无桌面环境使用
+        self.require_tray = require_tray
+        with tracer.span('startup.start_governor', 'startup'):
+            self.start_governor()
+        with tracer.span('startup.start_maintenance', 'startup'):
+            self.start_maintenance()
+        # 窗口隐藏后稍等片刻再销毁，期间重新打开则不必重建
+        self.teardown_timer = QTimer(self)
+        self.teardown_timer.setSingleShot(True)
+        self.teardown_timer.setInterval(self.config.get('teardown_delay', 2000))
+        self.teardown_timer.timeout.connect(self.teardown_window)
+        if self.tray_mode:
+            self.create_tray()
+
+    def load_config(self):
+        try:
+            if os.path.exists(self.config_path):
+                with open(self.config_path, 'r', encoding='utf-8') as f:
+                    self.config = json.load(f)
+        except Exception as e:
+            tracer.span('load_config', 'config').finish(f"{type(e).__name__}: {e}")
+            logger.warning("配置读取失败: %s", e)
+
+    def save_config(self, **values):
+        try:
+            # 保留配置文件中由其他功能使用的项（如 tcp_target、governor）
+            self.config.update(values)
+            with tracer.span('save_config', 'config'):
+                with open(self.config_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.config, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning("配置保存失败: %s", e)
+
+    def start_governor(self):
+        # 配置文件中 governor.enabled 为 true 时在后台按规则自动切换电源计划与游戏模式
+        cfg = self.config.get('governor') or {}
+        if not cfg.get('enabled'):
+            return
+        rules = [governor.Rule.from_dict(d) for d in cfg.get('rules', [])]
+        gov = governor.Governor(rules, governor.SystemActuator(),
+                                cfg.get('default', governor.DEFAULT_PROFILE),
+                                cfg.get('enter_time', 10.0), cfg.get('min_dwell', 60.0),
+                                cfg.get('band', 10.0))
+        self.governor_thread = governor.GovernorThread(gov, interval=cfg.get('interval', 5.0))
+        self.governor_thread.start()
+
+    def start_maintenance(self):
+        # 配置文件中 maintenance.enabled 为 true 时在空闲时段自动清理临时文件
+        cfg = self.config.get('maintenance') or {}
+        if not cfg.get('enabled'):
+            return
+        monitor = maintenance.IdleMonitor(cfg.get('idle_seconds', 300), cfg.get('cpu_max', 20.0),
+                                          cfg.get('disk_max', 20.0))
+        scheduler = maintenance.MaintenanceScheduler(monitor, ops_per_sec=cfg.get('ops_per_sec', 200))
+        scheduler.register(maintenance.TempCleanupJob(cfg.get('roots'), cfg.get('min_age_hours', 24)))
+        self.maintenance_thread = maintenance.MaintenanceThread(scheduler)
+        self.maintenance_thread.start()
+
+    def create_tray(self):
+        # 系统托盘不可用时退回普通模式：关闭窗口即退出，避免进程隐藏后无从找回
+        if not QSystemTrayIcon.isSystemTrayAvailable():
+            if self.require_tray:
+                logger.warning("系统托盘不可用，已关闭托盘模式")
+                self.tray_mode = False
+            return
+        en = self.config.get('lang') == 'en'
+        self.tray = QSystemTrayIcon(QApplication.style().standardIcon(QStyle.SP_ComputerIcon), self)
+        self.tray.setToolTip('WinOptimize')
+        menu = QMenu()
+        open_action = QAction("Open WinOptimize" if en else "打开 WinOptimize", menu)
+        open_action.triggered.connect(self.show_window)
+        quit_action = QAction("Exit" if en else "退出", menu)
+        quit_action.triggered.connect(self.quit)
+        menu.addAction(open_action)
+        menu.addAction(quit_action)
+        self.tray_menu = menu
+        self.tray.setContextMenu(menu)
+        self.tray.activated.connect(self.on_tray_activated)
+        self.tray.show()
+
+    def on_tray_activated(self, reason):
+        if reason in (QSystemTrayIcon.Trigger, QSystemTrayIcon.DoubleClick):
+            self.show_window()
+
+    def show_window(self):
+        self.teardown_timer.stop()
+        if self.window is None:
+            with tracer.span('ui.build', 'startup'):
+                self.window = WinOptimize(self)
+        window = self.window
+        if window.isMinimized():
+            window.showNormal()
+        window.show()
+        window.raise_()
+        window.activateWindow()
+        return window
+
+    def handle_command(self, message):
+        message = dict(message)
+        # 再次以 --tray 启动时已有实例在运行，无需处理
+        if message.pop('tray', None) and not message:
+            return
+        self.show_window().handle_command(message)
+
+    def schedule_teardown(self):
+        self.teardown_timer.start()
+
+    def teardown_window(self):
+        window = self.window
+        if window is None or window.isVisible():
+            return
+        if window.busy():
+            self.teardown_timer.start()
+            return
+        with tracer.span('ui.teardown', 'startup'):
+            window.shutdown()
+            self.window = None
+            # 等窗口真正析构后再回收内存
+            window.destroyed.connect(lambda *args: QTimer.singleShot(0, trim_memory))
+            window.deleteLater()
+
+    def quit(self):
+        if self.window is not None:
+            self.window.shutdown()
+        if self.tray is not None:
+            self.tray.hide()
+        QApplication.quit()
 
 if __name__ == '__main__':
     # 检查是否以管理员权限运行
-    try:
-        is_admin = ctypes.windll.shell32.IsUserAnAdmin()
-    except:
-        is_admin = False
-    if not is_admin:
-        # 重新以管理员权限启动
-        ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, '"' + os.path.abspath(__file__) + '"', None, 1)
+    if not is_admin():
+        # 重新以管理员权限启动，并带上命令行参数
+        params = subprocess.list2cmdline([os.path.abspath(__file__)] + sys.argv[1:])
+        ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, params, None, 1)
         sys.exit(0)
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    app.setStyle('Fusion')  # 使用Fusion风格，看起来更现代
-    window = WinOptimize()
-    window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    # 在创建界面之前开始监听，启动期间的后续启动也会被转发过来排队
+    options = instance.parse_args(sys.argv[1:])
+    tray = options.pop('tray', False)
+    server = instance.InstanceServer()
+    try:
+        server.start()
+    except instance.AlreadyRunning:
+        # 与另一个实例同时启动且晚了一步
+        sys.exit(0 if instance.forward(sys.argv[1:]) else 1)
+    with tracer.span('startup.qapplication', 'startup'):
+        app = QApplication(sys.argv)
+        app.setStyle('Fusion')  # 使用Fusion风格，看起来更现代
+    with tracer.span('startup.core', 'startup'):
+        core = AppCore(tray)
+    if core.tray_mode:
+        # 窗口关闭后继续在托盘中运行
+        app.setQuitOnLastWindowClosed(False)
+    # 以 --tray 启动时只创建常驻部分，不构建界面；托盘不可用时照常打开窗口
+    if not core.tray_mode or options:
+        with tracer.span('startup.window', 'startup'):
+            core.handle_command(options)
+    server.set_handler(core.remote_command.emit)
+    code = app.exec_()
+    server.close()
+    sys.exit(code)
\ No newline at end of file
@@ -0,0 +1,422 @@
+# 性能基准：应用优化项前后各跑一遍同样的测试，比较差异是否有统计意义
+import sys
+import os
+import json
+import time
+import math
+import random
+import socket
+import hashlib
+import platform
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from datetime import datetime
+from multiprocessing import Pool
+
+import fleet
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+
+class Metric:
+    def __init__(self, name, unit, higher_is_better, samples=None):
+        self.name = name
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+        self.samples = samples if samples is not None else []
+
+    def to_dict(self):
+        return {'unit': self.unit, 'higher_is_better': self.higher_is_better, 'samples': self.samples}
+
+    @classmethod
+    def from_dict(cls, name, d):
+        return cls(name, d['unit'], d['higher_is_better'], list(d['samples']))
+
+
+# ---------- CPU ----------
+
+def _cpu_work(rounds):
+    # 固定计算量：整数运算加哈希，返回耗时
+    start = time.perf_counter()
+    acc = 0
+    data = b'winoptimize' * 64
+    for i in range(rounds):
+        acc = (acc * 31 + i) & 0xffffffff
+        if i % 64 == 0:
+            data = hashlib.sha256(data).digest() * 22
+    return time.perf_counter() - start
+
+
+def bench_cpu(repeats, rounds=200000):
+    single = Metric('cpu_single', 'Mops/s', True)
+    multi = Metric('cpu_all_cores', 'Mops/s', True)
+    cores = os.cpu_count() or 1
+    _cpu_work(rounds)  # 预热，排除首轮的缓存与频率爬升影响
+    for _ in range(repeats):
+        single.samples.append(rounds / _cpu_work(rounds) / 1e6)
+    with Pool(cores) as pool:
+        pool.map(_cpu_work, [rounds] * cores)  # 预热工作进程
+        for _ in range(repeats):
+            start = time.perf_counter()
+            pool.map(_cpu_work, [rounds] * cores)
+            multi.samples.append(rounds * cores / (time.perf_counter() - start) / 1e6)
+    return [single, multi]
+
+
+# ---------- 计时器与调度 ----------
+
+def bench_timer(repeats, sleeps=200):
+    resolution = Metric('timer_resolution', 'us', False)
+    latency = Metric('sleep_overshoot_mean', 'us', False)
+    jitter = Metric('sleep_overshoot_p99', 'us', False)
+    for _ in range(repeats):
+        # 连续读取时钟时观察到的最小非零增量
+        deltas = []
+        last = time.perf_counter()
+        while len(deltas) < 1000:
+            now = time.perf_counter()
+            if now != last:
+                deltas.append(now - last)
+                last = now
+        resolution.samples.append(min(deltas) * 1e6)
+        # 请求睡眠 1ms，统计实际唤醒延迟超出部分
+        overshoot = []
+        for _ in range(sleeps):
+            start = time.perf_counter()
+            time.sleep(0.001)
+            overshoot.append((time.perf_counter() - start - 0.001) * 1e6)
+        overshoot.sort()
+        latency.samples.append(statistics.fmean(overshoot))
+        jitter.samples.append(overshoot[int(len(overshoot) * 0.99) - 1])
+    return [resolution, latency, jitter]
+
+
+# ---------- 磁盘 ----------
+
+def _drop_cache(fd):
+    # 尽量绕过页缓存，Windows 上无对应接口则只能测到缓存性能
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def bench_disk(repeats, size_mb=64, block=1024 * 1024, random_block=4096, random_reads=2000):
+    seq_write = Metric('disk_seq_write', 'MB/s', True)
+    seq_read = Metric('disk_seq_read', 'MB/s', True)
+    rand_read = Metric('disk_rand_read_4k', 'IOPS', True)
+    buf = os.urandom(block)
+    fd, path = tempfile.mkstemp(prefix='winopt_bench_')
+    os.close(fd)
+    try:
+        for _ in range(repeats):
+            with open(path, 'wb', buffering=0) as f:
+                start = time.perf_counter()
+                for _ in range(size_mb * 1024 * 1024 // block):
+                    f.write(buf)
+                os.fsync(f.fileno())
+                seq_write.samples.append(size_mb / (time.perf_counter() - start))
+            with open(path, 'rb', buffering=0) as f:
+                _drop_cache(f.fileno())
+                start = time.perf_counter()
+                while f.read(block):
+                    pass
+                seq_read.samples.append(size_mb / (time.perf_counter() - start))
+            with open(path, 'rb', buffering=0) as f:
+                _drop_cache(f.fileno())
+                blocks = size_mb * 1024 * 1024 // random_block
+                offsets = [random.randrange(blocks) * random_block for _ in range(random_reads)]
+                start = time.perf_counter()
+                for off in offsets:
+                    f.seek(off)
+                    f.read(random_block)
+                rand_read.samples.append(random_reads / (time.perf_counter() - start))
+    finally:
+        os.remove(path)
+    return [seq_write, seq_read, rand_read]
+
+
+# ---------- 回环 TCP ----------
+
+def _serve(listener, mode):
+    conn, _ = listener.accept()
+    with conn:
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            data = conn.recv(65536)
+            if not data:
+                break
+            if mode == 'echo':
+                conn.sendall(data)
+
+
+def _connect(mode):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    server = threading.Thread(target=_serve, args=(listener, mode), daemon=True)
+    server.start()
+    client = socket.create_connection(listener.getsockname())
+    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return listener, server, client
+
+
+def bench_tcp(repeats, total_mb=64, pings=500):
+    throughput = Metric('tcp_loopback_throughput', 'MB/s', True)
+    rtt = Metric('tcp_loopback_rtt', 'us', False)
+    chunk = b'\0' * 65536
+    for _ in range(repeats):
+        listener, server, client = _connect('sink')
+        start = time.perf_counter()
+        for _ in range(total_mb * 16):
+            client.sendall(chunk)
+        client.shutdown(socket.SHUT_WR)
+        server.join()
+        throughput.samples.append(total_mb / (time.perf_counter() - start))
+        client.close()
+        listener.close()
+
+        listener, server, client = _connect('echo')
+        times = []
+        for _ in range(pings):
+            start = time.perf_counter()
+            client.sendall(b'x')
+            client.recv(1)
+            times.append(time.perf_counter() - start)
+        rtt.samples.append(statistics.median(times) * 1e6)
+        client.close()
+        server.join()
+        listener.close()
+    return [throughput, rtt]
+
+
+SUITES = {
+    'cpu': bench_cpu,
+    'timer': bench_timer,
+    'disk': bench_disk,
+    'tcp': bench_tcp,
+}
+
+
+def run_suite(suites=None, repeats=5, quick=False):
+    metrics = {}
+    for name in (suites or list(SUITES)):
+        func = SUITES[name]
+        kwargs = {}
+        if quick:
+            kwargs = {'cpu': {'rounds': 50000}, 'timer': {'sleeps': 50},
+                      'disk': {'size_mb': 8, 'random_reads': 500},
+                      'tcp': {'total_mb': 16, 'pings': 100}}[name]
+        for metric in func(repeats, **kwargs):
+            metrics[metric.name] = metric
+    return metrics
+
+
+def environment():
+    return {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def save_results(metrics, tweak, phase, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    record = {
+        'tweak': tweak,
+        'phase': phase,
+        'environment': environment(),
+        'metrics': {name: m.to_dict() for name, m in metrics.items()},
+    }
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(results_dir, f"{tweak}_{phase}_{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        record = json.load(f)
+    return record, {name: Metric.from_dict(name, d) for name, d in record['metrics'].items()}
+
+
+# ---------- 统计比较 ----------
+
+def _betainc(a, b, x):
+    # 正则化不完全 beta 函数 I_x(a, b)，连分式展开（Lentz 算法）
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - _betainc(b, a, 1.0 - x)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log(1.0 - x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    f = d
+    for m in range(1, 300):
+        for num in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                    -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + num * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + num / c
+            c = c if abs(c) > tiny else tiny
+            f *= c * d
+        if abs(c * d - 1.0) < 1e-15:
+            break
+    return front * f
+
+
+def _t_cdf(t, df):
+    tail = 0.5 * _betainc(df / 2, 0.5, df / (df + t * t))
+    return 1.0 - tail if t > 0 else tail
+
+
+def _t_quantile(p, df):
+    # 学生 t 分布分位数：对累积分布函数二分求解，df 可为 Welch 公式给出的非整数
+    if p < 0.5:
+        return -_t_quantile(1 - p, df)
+    lo, hi = 0.0, 1.0
+    while _t_cdf(hi, df) < p:
+        lo, hi = hi, hi * 2
+    for _ in range(200):
+        mid = (lo + hi) / 2
+        if _t_cdf(mid, df) < p:
+            lo = mid
+        else:
+            hi = mid
+        if hi - lo < 1e-12 * hi:
+            break
+    return (lo + hi) / 2
+
+
+class Delta:
+    def __init__(self, name, unit, higher_is_better, before, after, diff, ci_low, ci_high):
+        self.name = name
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+        self.before = before
+        self.after = after
+        self.diff = diff
+        self.ci_low = ci_low
+        self.ci_high = ci_high
+
+    @property
+    def percent(self):
+        return self.diff / self.before * 100 if self.before else float('nan')
+
+    @property
+    def sufficient(self):
+        # 样本不足或两组都没有波动时无法估计置信区间，区间记为无穷
+        return math.isfinite(self.ci_low) and math.isfinite(self.ci_high)
+
+    @property
+    def significant(self):
+        # 置信区间不跨 0 即认为差异显著
+        return self.sufficient and (self.ci_low > 0 or self.ci_high < 0)
+
+    @property
+    def verdict(self):
+        if not self.sufficient:
+            return 'insufficient samples'
+        if not self.significant:
+            return 'no change'
+        improved = (self.diff > 0) == self.higher_is_better
+        return 'better' if improved else 'worse'
+
+
+def compare_metric(before, after, confidence=0.95):
+    # Welch t 检验：两组方差不等时均值差的置信区间
+    a, b = before.samples, after.samples
+    ma, mb = statistics.fmean(a), statistics.fmean(b)
+    va = statistics.variance(a) if len(a) > 1 else 0.0
+    vb = statistics.variance(b) if len(b) > 1 else 0.0
+    se2 = va / len(a) + vb / len(b)
+    diff = mb - ma
+    if se2 == 0 or len(a) < 2 or len(b) < 2:
+        return Delta(before.name, before.unit, before.higher_is_better, ma, mb, diff, -math.inf, math.inf)
+    df = se2 ** 2 / ((va / len(a)) ** 2 / (len(a) - 1) + (vb / len(b)) ** 2 / (len(b) - 1))
+    half = _t_quantile(1 - (1 - confidence) / 2, df) * math.sqrt(se2)
+    return Delta(before.name, before.unit, before.higher_is_better, ma, mb, diff, diff - half, diff + half)
+
+
+def compare(before, after, confidence=0.95):
+    return [compare_metric(before[name], after[name], confidence)
+            for name in before if name in after]
+
+
+def format_deltas(deltas, confidence=0.95):
+    pct = int(confidence * 100)
+    lines = [f"{'metric':<26}{'before':>12}{'after':>12}{'delta %':>10}   {pct}% CI of delta{'':<8}verdict"]
+    for d in deltas:
+        ci = f"[{d.ci_low:+.4g}, {d.ci_high:+.4g}] {d.unit}"
+        lines.append(f"{d.name:<26}{d.before:>12.4g}{d.after:>12.4g}{d.percent:>+9.1f}%   {ci:<28}{d.verdict}")
+    return '\n'.join(lines)
+
+
+def benchmark_tweak(tweak, apply, suites=None, repeats=5, quick=False, results_dir=RESULTS_DIR):
+    # 先测基线，再应用优化项，然后复测并返回比较结果
+    before = run_suite(suites, repeats, quick)
+    before_path = save_results(before, tweak, 'before', results_dir)
+    apply()
+    after = run_suite(suites, repeats, quick)
+    after_path = save_results(after, tweak, 'after', results_dir)
+    return before_path, after_path, compare(before, after)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WinOptimize 性能基准')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    run_p = sub.add_parser('run', help='运行基准并保存结果')
+    run_p.add_argument('--tweak', default='manual')
+    run_p.add_argument('--phase', default='before', choices=['before', 'after'])
+
+    cmp_p = sub.add_parser('compare', help='比较两次结果')
+    cmp_p.add_argument('before')
+    cmp_p.add_argument('after')
+
+    tweak_p = sub.add_parser('tweak', help='测基线、应用优化项、复测并比较')
+    tweak_p.add_argument('tweak', help='优化项 id：' + ', '.join(fleet.TWEAKS) + '，或 tweaks 目录中以命令定义的项')
+    tweak_p.add_argument('--command', help='覆盖实际执行的命令')
+
+    for p in (run_p, tweak_p):
+        p.add_argument('--suite', action='append', choices=list(SUITES))
+        p.add_argument('--repeats', type=int, default=5)
+        p.add_argument('--quick', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'run':
+        metrics = run_suite(args.suite, args.repeats, args.quick)
+        print(save_results(metrics, args.tweak, args.phase))
+    elif args.cmd == 'compare':
+        _, before = load_results(args.before)
+        _, after = load_results(args.after)
+        print(format_deltas(compare(before, after)))
+    else:
+        command = args.command
+        if not command:
+            # 给出 --command 时 tweak 只作为结果文件名；否则按批量执行的规则查找命令
+            try:
+                command = fleet.TWEAKS.get(args.tweak) or fleet.catalog_command(args.tweak)
+            except (OSError, ValueError) as e:
+                parser.error(f"{e}（可用 --command 指定命令）")
+        apply = lambda: subprocess.run(command, shell=True, check=True)
+        before_path, after_path, deltas = benchmark_tweak(
+            args.tweak, apply, args.suite, args.repeats, args.quick)
+        print(before_path)
+        print(after_path)
+        print(format_deltas(deltas))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
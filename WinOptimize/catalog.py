@@ -0,0 +1,110 @@
+# 优化项目录：从 tweaks 目录下的 JSON 数据文件加载优化项定义
+import os
+import json
+import glob
+import subprocess
+
+from tracing import tracer
+
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tweaks")
+
+ACTIONS = ('probe', 'apply', 'revert')
+
+DEFAULT_LABELS = {
+    'apply': {'cn': '应用', 'en': 'Apply'},
+    'revert': {'cn': '恢复', 'en': 'Revert'},
+}
+
+
+class Tweak:
+    # 每个动作可以是一条命令字符串，也可以是 {"handler": "方法名"}，由界面调用对应方法
+    def __init__(self, id, category, title, description=None, probe=None, apply=None,
+                 revert=None, admin=False, labels=None):
+        self.id = id
+        self.category = category
+        self.title = title
+        self.description = description or {}
+        self.probe = probe
+        self.apply = apply
+        self.revert = revert
+        self.admin = admin
+        self.labels = labels or {}
+
+    @classmethod
+    def from_dict(cls, d):
+        for key in ('id', 'category', 'title'):
+            if key not in d:
+                raise ValueError(f"优化项缺少字段 {key}: {d}")
+        for action in ACTIONS:
+            value = d.get(action)
+            if value is not None and not isinstance(value, str) and 'handler' not in value:
+                raise ValueError(f"优化项 {d['id']} 的 {action} 格式无效")
+        title = d['title'] if isinstance(d['title'], dict) else {'cn': d['title'], 'en': d['title']}
+        return cls(d['id'], d['category'], title, d.get('description'), d.get('probe'),
+                   d.get('apply'), d.get('revert'), bool(d.get('admin', False)), d.get('labels'))
+
+    def text(self, field, lang):
+        values = getattr(self, field)
+        return values.get(lang) or values.get('cn') or values.get('en') or ''
+
+    def label(self, action, lang):
+        labels = self.labels.get(action) or DEFAULT_LABELS[action]
+        return labels.get(lang) or labels.get('cn', '')
+
+    def command(self, action):
+        value = getattr(self, action)
+        return value if isinstance(value, str) else None
+
+    def handler(self, action):
+        value = getattr(self, action)
+        return value.get('handler') if isinstance(value, dict) else None
+
+    def has(self, action):
+        return getattr(self, action) is not None
+
+
+def load_file(path):
+    # 文件内容为优化项列表，或 {"tweaks": [...]}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('tweaks', [])
+    try:
+        return [Tweak.from_dict(d) for d in data]
+    except ValueError as e:
+        raise ValueError(f"{os.path.basename(path)}: {e}")
+
+
+def load_catalog(directory=None):
+    # 缺省读取 CATALOG_DIR；测量脚本会把它指向生成的大目录
+    directory = directory or CATALOG_DIR
+    tweaks = []
+    seen = set()
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        for tweak in load_file(path):
+            if tweak.id in seen:
+                raise ValueError(f"{os.path.basename(path)}: 重复的优化项 id {tweak.id}")
+            seen.add(tweak.id)
+            tweaks.append(tweak)
+    return tweaks
+
+
+def run_command(tweak, action):
+    # 同步执行优化项的命令动作并记录追踪信息，返回退出码
+    command = tweak.command(action)
+    with tracer.span(f"tweak.{tweak.id}.{action}", 'probe' if action == 'probe' else 'action',
+                     command=command) as span:
+        result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        span.exit_code = result.returncode
+        span.output_size = len(result.stdout or b'')
+        return result.returncode
+
+
+def probe(tweak):
+    # 探测当前是否已启用：退出码 0 为已启用，非 0 为未启用，无探测命令时返回 None
+    if tweak.command('probe') is None:
+        return None
+    try:
+        return run_command(tweak, 'probe') == 0
+    except OSError:
+        return None
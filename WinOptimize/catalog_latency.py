@@ -0,0 +1,150 @@
+# 优化页响应测量：生成一个 500 项的目录，测量构建页面、逐字过滤与滚动的耗时，以及滚动期间发起的探测次数
+# 在独立子进程中测量，生成的目录放在临时目录中，不影响 tweaks 目录
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+from tracing import percentile
+from ui_measure import load_app, wait, add_arguments, run_child, report
+
+# 滚动一步（含重绘）的 p95 不超过一帧；逐字过滤每次不超过 50 ms；
+# 快速滚到底后只探测停下时可见的项，探测次数不超过可见行数的两倍（起始位置加停止位置）
+TARGETS = {'scroll_p95_ms': 16.0, 'filter_max_ms': 50.0, 'probe_factor': 2}
+
+CATEGORIES = ('power', 'network', 'system', 'privacy', 'visual')
+
+
+def make_catalog(directory, count=500):
+    # 探测命令在 cmd 与 sh 下都能执行，奇偶项分别返回已启用、未启用
+    tweaks = []
+    for i in range(count):
+        tweaks.append({
+            'id': f"tweak_{i:03d}",
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'title': {'cn': f"测试优化项 {i}", 'en': f"Test tweak {i}"},
+            'description': {'cn': f"第 {i} 个生成的优化项，用于测量列表在大目录下的响应。",
+                            'en': f"Generated tweak number {i}, used to measure the list with a large catalog."},
+            'probe': f"exit {i % 2}",
+            'apply': "exit 0",
+            'revert': "exit 0",
+        })
+    with open(os.path.join(directory, 'generated.json'), 'w', encoding='utf-8') as f:
+        json.dump({'tweaks': tweaks}, f, ensure_ascii=False)
+
+
+def measure(count, query):
+    app_module = load_app()
+    from PyQt5.QtWidgets import QApplication
+
+    directory = tempfile.mkdtemp(prefix='winopt-catalog-')
+    try:
+        make_catalog(directory, count)
+        catalog = app_module.catalog
+        catalog.CATALOG_DIR = directory
+        # 统计探测命令的执行次数
+        probes = []
+        run_command = catalog.run_command
+
+        def counting_run_command(tweak, action):
+            if action == 'probe':
+                probes.append(tweak.id)
+            return run_command(tweak, action)
+
+        catalog.run_command = counting_run_command
+
+        app = QApplication(sys.argv)
+        app.setStyle('Fusion')
+        result = {'count': count}
+        started = time.perf_counter()
+        core = app_module.AppCore()
+        window = core.show_window()
+        window.resize(1000, 700)
+        window.switch_page(1)
+        app.processEvents()
+        result['build_ms'] = (time.perf_counter() - started) * 1000
+        view = window.tweak_view
+        result['rows'] = window.tweak_proxy.rowCount()
+        result['visible_rows'] = view.viewport().height() // window.tweak_delegate.CARD_HEIGHT + 1
+        wait(0.5)
+        result['initial_probes'] = len(probes)
+
+        # 每一步都同步重绘视口，计入绘制可见卡片的时间
+        scroll_bar = view.verticalScrollBar()
+        scroll = []
+        steps = 100
+        for i in range(1, steps + 1):
+            started = time.perf_counter()
+            scroll_bar.setValue(scroll_bar.maximum() * i // steps)
+            view.viewport().repaint()
+            app.processEvents()
+            scroll.append((time.perf_counter() - started) * 1000)
+        wait(0.5)
+        result['scroll_ms'] = {'p50': percentile(scroll, 50), 'p95': percentile(scroll, 95), 'max': max(scroll)}
+        result['scroll_probes'] = len(probes) - result['initial_probes']
+
+        # 逐字输入搜索词，再逐字删除
+        search = window.tweak_search
+        filtering = []
+        texts = [query[:i] for i in range(1, len(query) + 1)]
+        for text in texts + texts[-2::-1] + ['']:
+            started = time.perf_counter()
+            search.setText(text)
+            view.viewport().repaint()
+            app.processEvents()
+            filtering.append((time.perf_counter() - started) * 1000)
+        result['filter_ms'] = {'p50': percentile(filtering, 50), 'max': max(filtering)}
+        wait(0.5)
+        result['total_probes'] = len(probes)
+        window.close()
+        core.quit()
+        return result
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def check_targets(result):
+    failures = []
+    if result['scroll_ms']['p95'] > TARGETS['scroll_p95_ms']:
+        failures.append(f"scroll p95 {result['scroll_ms']['p95']:.1f} ms > {TARGETS['scroll_p95_ms']} ms")
+    if result['filter_ms']['max'] > TARGETS['filter_max_ms']:
+        failures.append(f"filter max {result['filter_ms']['max']:.1f} ms > {TARGETS['filter_max_ms']} ms")
+    limit = result['visible_rows'] * TARGETS['probe_factor']
+    if result['initial_probes'] + result['scroll_probes'] > limit:
+        failures.append(f"{result['initial_probes'] + result['scroll_probes']} probes while scrolling > {limit}")
+    return failures
+
+
+def format_result(result):
+    return '\n'.join([
+        f"rows           {result['rows']} (visible {result['visible_rows']})",
+        f"build          {result['build_ms']:.0f} ms",
+        "scroll step    p50 {p50:.1f} ms  p95 {p95:.1f} ms  max {max:.1f} ms".format(**result['scroll_ms']),
+        "filter key     p50 {p50:.1f} ms  max {max:.1f} ms".format(**result['filter_ms']),
+        f"probes         {result['initial_probes']} at start, {result['scroll_probes']} after scrolling, "
+        f"{result['total_probes']} in total",
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WinOptimize 优化页响应测量')
+    parser.add_argument('--count', type=int, default=500, help='生成的优化项数量')
+    parser.add_argument('--query', default='tweak 4', help='逐字输入的搜索词')
+    add_arguments(parser)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.count, args.query)))
+        return 0
+
+    result = run_child(__file__, ['--child', '--count', args.count, '--query', args.query], args.offscreen)
+    print(format_result(result))
+    return report('result', result, TARGETS, check_targets(result), args.json)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,509 @@
+# 冷数据压缩：把长期未使用的大文件压缩进分块归档，校验无误后再删除原文件，可按文件随机解压
+# 归档格式：文件头 | 压缩块 ... | 索引（zlib 压缩的 JSON）| 文件尾（索引偏移、索引长度、魔数）
+# 每个文件独立切块，块大小固定，读取任意文件或文件中的任意区间只需解压涉及的块
+import sys
+import os
+import json
+import lzma
+import zlib
+import time
+import random
+import shutil
+import struct
+import argparse
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from tracing import tracer
+
+MAGIC = b'WOARC1\n\0'
+FOOTER = struct.Struct('<QQ8s')
+SUFFIX = '.woarc'
+
+CHUNK_SIZE = 4 * 1024 * 1024
+COLD_DAYS = 180
+MIN_SIZE = 16 * 1024 * 1024
+CODECS = ('lzma', 'zlib')
+
+# 块标记：0 为压缩，1 为原样存储（压缩后没有变小）
+COMPRESSED, STORED = 0, 1
+
+MB = 1024 * 1024
+
+
+# ---------- 选择冷文件 ----------
+
+def find_cold_files(root, days=COLD_DAYS, min_size=MIN_SIZE, now=None):
+    # 返回 [(路径, stat)]；最后修改与最后访问都早于 days 天、且不小于 min_size 的普通文件
+    cutoff = (now or time.time()) - days * 86400
+    found = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                if not entry.is_file(follow_symlinks=False) or entry.name.endswith((SUFFIX, SUFFIX + '.tmp')):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if st.st_size >= min_size and max(st.st_mtime, st.st_atime) < cutoff:
+                found.append((entry.path, st))
+    found.sort()
+    return found
+
+
+# ---------- 进程池中执行的函数 ----------
+
+def _compress(codec, level, data):
+    if codec == 'lzma':
+        return lzma.compress(data, preset=level)
+    return zlib.compress(data, level)
+
+
+def _decompress(codec, data):
+    if codec == 'lzma':
+        return lzma.decompress(data)
+    return zlib.decompress(data)
+
+
+def _compress_chunk(path, offset, length, codec, level):
+    # 由工作进程自己读取原文件，主进程只负责按顺序写出，不经手未压缩的数据
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    if len(data) != length:
+        raise OSError(f"文件在压缩过程中被截断: {path}")
+    crc = zlib.crc32(data)
+    packed = _compress(codec, level, data)
+    if len(packed) >= length:
+        return data, crc, STORED
+    return packed, crc, COMPRESSED
+
+
+def _read_chunk(f, codec, chunk):
+    offset, size, raw_size, crc, flag = chunk
+    f.seek(offset)
+    data = f.read(size)
+    if flag == COMPRESSED:
+        try:
+            data = _decompress(codec, data)
+        except (lzma.LZMAError, zlib.error):
+            data = b''
+    if len(data) != raw_size or zlib.crc32(data) != crc:
+        raise ValueError(f"归档块损坏（偏移 {offset}）")
+    return data
+
+
+def _verify_chunk(archive_path, codec, chunk, original, offset):
+    # 解压归档中的块，并与原文件对应区间逐字节比较
+    try:
+        with open(archive_path, 'rb') as f:
+            data = _read_chunk(f, codec, chunk)
+        with open(original, 'rb') as f:
+            f.seek(offset)
+            return f.read(len(data)) == data
+    except (OSError, ValueError):
+        return False
+
+
+def _bounded_map(pool, func, tasks, max_inflight, on_result):
+    # 按提交顺序取结果，同时在途的任务不超过 max_inflight 个，内存占用有上限
+    pending = deque()
+    tasks = iter(tasks)
+    while True:
+        while len(pending) < max_inflight:
+            task = next(tasks, None)
+            if task is None:
+                break
+            pending.append((task, pool.submit(func, *task[1])))
+        if not pending:
+            return
+        task, future = pending.popleft()
+        on_result(task[0], future.result())
+
+
+# ---------- 写入 ----------
+
+class ArchiveResult:
+    def __init__(self, path):
+        self.path = path
+        self.files = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.seconds = 0.0
+        self.verified = 0
+        self.removed = []
+        self.freed_bytes = 0     # 删除的原文件大小减去归档大小
+        self.kept = []           # [(路径, 原因)]：未删除的原文件
+        self.skipped = []        # [(路径, 原因)]：不在 root 下或文件名无法安全恢复而未归档的文件
+        self.peak_inflight = 0   # 同时在途的未压缩数据量峰值（字节）
+
+    def ratio(self):
+        return self.stored_bytes / self.raw_bytes if self.raw_bytes else 1.0
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'files': self.files,
+            'raw_bytes': self.raw_bytes,
+            'stored_bytes': self.stored_bytes,
+            'seconds': round(self.seconds, 3),
+            'verified': self.verified,
+            'removed': len(self.removed),
+            'freed_bytes': self.freed_bytes,
+            'kept': self.kept,
+            'skipped': self.skipped,
+            'peak_inflight': self.peak_inflight,
+        }
+
+
+def default_archive_path(root):
+    return os.path.join(root, time.strftime('cold-%Y%m%d-%H%M%S') + SUFFIX)
+
+
+def archive(root, files, dest=None, codec='lzma', level=None, workers=None, chunk_size=CHUNK_SIZE,
+            max_inflight=None, remove=False, progress=None):
+    # files 为 find_cold_files 的结果；remove=True 时只删除校验通过且归档后未被改动的原文件
+    # progress(已处理字节, 总字节) 在主进程中调用
+    if codec not in CODECS:
+        raise ValueError(f"不支持的压缩算法: {codec}")
+    if level is None:
+        level = 1 if codec == 'lzma' else 6
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or workers * 2
+    root = os.path.abspath(root)
+    dest = os.path.abspath(dest or default_archive_path(root))
+    if os.path.exists(dest):
+        raise FileExistsError(dest)
+    result = ArchiveResult(dest)
+    entries = []
+    for path, st in files:
+        # 个别文件无法归档时只跳过该文件并记录原因，不中断整个归档
+        try:
+            name = os.path.relpath(os.path.abspath(path), root)
+        except ValueError:
+            # Windows 上位于其他盘符
+            name = os.pardir
+        if name == os.pardir or name.startswith(os.pardir + os.sep):
+            result.skipped.append((path, '不在归档根目录下'))
+            continue
+        try:
+            name = _check_name(name.replace(os.sep, '/'))
+        except ValueError as e:
+            result.skipped.append((path, str(e)))
+            continue
+        entries.append({'name': name, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                        'atime_ns': st.st_atime_ns, 'mode': st.st_mode & 0o7777, 'chunks': []})
+    total = sum(e['size'] for e in entries)
+
+    def tasks():
+        for entry in entries:
+            path = os.path.join(root, entry['name'])
+            for offset in range(0, entry['size'], chunk_size):
+                length = min(chunk_size, entry['size'] - offset)
+                yield (entry, length), (path, offset, length, codec, level)
+
+    started = time.perf_counter()
+    tmp = dest + '.tmp'
+    inflight = deque()
+    with tracer.span('cold.archive', 'job', files=len(entries), skipped=len(result.skipped), workers=workers) as span:
+        try:
+            with open(tmp, 'wb') as out, ProcessPoolExecutor(workers) as pool:
+                out.write(MAGIC)
+                position = len(MAGIC)
+
+                def on_result(key, value):
+                    nonlocal position
+                    entry, length = key
+                    data, crc, flag = value
+                    inflight.popleft()
+                    out.write(data)
+                    entry['chunks'].append([position, len(data), length, crc, flag])
+                    position += len(data)
+                    result.raw_bytes += length
+                    result.stored_bytes += len(data)
+                    if progress:
+                        progress(result.raw_bytes, total)
+
+                def submit_order():
+                    # 记录在途数据量：提交时加入，写出时移除
+                    for key, args in tasks():
+                        inflight.append(key[1])
+                        result.peak_inflight = max(result.peak_inflight, sum(inflight))
+                        yield key, args
+
+                _bounded_map(pool, _compress_chunk, submit_order(), max_inflight, on_result)
+                index = zlib.compress(json.dumps({
+                    'version': 1, 'codec': codec, 'chunk_size': chunk_size, 'created': time.time(),
+                    'files': entries,
+                }, ensure_ascii=False).encode('utf-8'))
+                out.write(index)
+                out.write(FOOTER.pack(position, len(index), MAGIC))
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, dest)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        result.files = len(entries)
+        result.seconds = time.perf_counter() - started
+
+        ok = verify(dest, root, workers, max_inflight)
+        result.verified = sum(1 for v in ok.values() if v)
+        if remove:
+            for entry in entries:
+                path = os.path.join(root, entry['name'])
+                reason = _removal_blocker(path, entry, ok.get(entry['name']))
+                if reason:
+                    result.kept.append((path, reason))
+                    continue
+                try:
+                    os.remove(path)
+                    result.removed.append(path)
+                    result.freed_bytes += entry['size']
+                except OSError as e:
+                    result.kept.append((path, str(e)))
+            result.freed_bytes -= os.path.getsize(dest)
+        span.output_size = result.stored_bytes
+        span.args.update(raw_bytes=result.raw_bytes, verified=result.verified, removed=len(result.removed))
+    return result
+
+
+def _removal_blocker(path, entry, verified):
+    if not verified:
+        return 'verify failed'
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        return str(e)
+    # 校验之后文件又被改动过，归档中的已不是最新内容
+    if st.st_size != entry['size'] or st.st_mtime_ns != entry['mtime_ns']:
+        return 'modified'
+    return None
+
+
+def verify(archive_path, root, workers=None, max_inflight=None):
+    # 并行解压每个块并与原文件比较，返回 {文件名: 是否一致}
+    archive_file = ColdArchive(archive_path)
+    workers = workers or os.cpu_count() or 1
+    ok = {}
+
+    def tasks():
+        for entry in archive_file.files.values():
+            original = os.path.join(root, *entry['name'].split('/'))
+            ok[entry['name']] = True
+            for i, chunk in enumerate(entry['chunks']):
+                yield entry['name'], (archive_path, archive_file.codec, chunk, original, i * archive_file.chunk_size)
+
+    def on_result(name, same):
+        if not same:
+            ok[name] = False
+
+    with ProcessPoolExecutor(workers) as pool:
+        _bounded_map(pool, _verify_chunk, tasks(), max_inflight or workers * 2, on_result)
+    return ok
+
+
+# ---------- 读取 ----------
+
+def _check_name(name):
+    # 索引里的文件名来自归档本身，不可信：只接受 root 下以 / 分隔的相对路径
+    parts = name.split('/')
+    if (not name or name.startswith('/') or '\\' in name or ':' in name
+            or any(part in ('', '.', '..') for part in parts)):
+        raise ValueError(f"归档中的文件名不合法: {name!r}")
+    return name
+
+
+class ColdArchive:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"不是冷数据归档: {path}")
+            f.seek(-FOOTER.size, os.SEEK_END)
+            index_offset, index_size, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"归档不完整: {path}")
+            f.seek(index_offset)
+            index = json.loads(zlib.decompress(f.read(index_size)).decode('utf-8'))
+        self.codec = index['codec']
+        self.chunk_size = index['chunk_size']
+        self.created = index['created']
+        self.files = {_check_name(entry['name']): entry for entry in index['files']}
+
+    def names(self):
+        return list(self.files)
+
+    def read(self, name, offset=0, length=None):
+        # 只解压 [offset, offset + length) 涉及的块
+        entry = self.files[name]
+        end = entry['size'] if length is None else min(entry['size'], offset + length)
+        parts = []
+        with open(self.path, 'rb') as f:
+            for i in range(offset // self.chunk_size, (end + self.chunk_size - 1) // self.chunk_size):
+                data = _read_chunk(f, self.codec, entry['chunks'][i])
+                start = i * self.chunk_size
+                parts.append(data[max(0, offset - start):end - start])
+        return b''.join(parts)
+
+    def extract(self, name, root, overwrite=False):
+        # 恢复单个文件及其时间戳与权限；目标已存在且未要求覆盖时返回 False
+        entry = self.files[name]
+        path = os.path.join(root, *name.split('/'))
+        # 解析符号链接后仍须落在 root 之下
+        real_root = os.path.realpath(root)
+        if os.path.commonpath([real_root, os.path.realpath(path)]) != real_root:
+            raise ValueError(f"解压路径越出目标目录: {name!r}")
+        if os.path.exists(path) and not overwrite:
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(self.path, 'rb') as f, open(tmp, 'wb') as out:
+            for chunk in entry['chunks']:
+                out.write(_read_chunk(f, self.codec, chunk))
+        os.chmod(tmp, entry['mode'])
+        os.utime(tmp, ns=(entry['atime_ns'], entry['mtime_ns']))
+        os.replace(tmp, path)
+        return True
+
+    def extract_all(self, root, overwrite=False):
+        # 返回 (已恢复, 已存在而跳过) 的文件数
+        extracted = skipped = 0
+        with tracer.span('cold.extract', 'job', files=len(self.files)):
+            for name in self.files:
+                if self.extract(name, root, overwrite):
+                    extracted += 1
+                else:
+                    skipped += 1
+        return extracted, skipped
+
+
+# ---------- 基准测试 ----------
+
+def make_dataset(directory, files=8, size=16 * MB, seed=1):
+    # 生成类似日志与源码的可压缩文本，压缩耗时接近真实数据
+    rng = random.Random(seed)
+    words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 10)))
+             for _ in range(4000)]
+    old = time.time() - 400 * 86400
+    for i in range(files):
+        path = os.path.join(directory, f"data{i:03d}.log")
+        with open(path, 'w') as f:
+            written = 0
+            while written < size:
+                line = f"{i} {rng.randint(0, 1 << 30)} " + ' '.join(rng.choices(words, k=12)) + '\n'
+                f.write(line)
+                written += len(line)
+        os.utime(path, (old, old))
+
+
+def bench(directory=None, files=8, size=16 * MB, codec='lzma', worker_counts=None):
+    own_dir = directory is None
+    directory = directory or tempfile.mkdtemp(prefix='winopt_cold_')
+    try:
+        make_dataset(directory, files, size)
+        cold = find_cold_files(directory, min_size=1)
+        cpus = os.cpu_count() or 1
+        counts = worker_counts or sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+        rows = []
+        for workers in counts:
+            dest = os.path.join(directory, f"bench{workers}{SUFFIX}")
+            result = archive(directory, cold, dest, codec, workers=workers)
+            rows.append({'workers': workers, 'seconds': result.seconds, 'raw_bytes': result.raw_bytes,
+                         'stored_bytes': result.stored_bytes, 'peak_inflight': result.peak_inflight})
+            os.remove(dest)
+        return {'cpus': cpus, 'codec': codec, 'rows': rows}
+    finally:
+        if own_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def format_bench(result):
+    rows = result['rows']
+    base = rows[0]['raw_bytes'] / rows[0]['seconds']
+    lines = [f"{result['cpus']} CPUs, codec {result['codec']}, {rows[0]['raw_bytes'] / MB:.0f} MB, "
+             f"ratio {rows[0]['stored_bytes'] / rows[0]['raw_bytes']:.2f}",
+             f"{'workers':<9}{'MB/s':>9}{'speedup':>9}{'peak MB':>9}"]
+    for row in rows:
+        rate = row['raw_bytes'] / row['seconds']
+        lines.append(f"{row['workers']:<9}{rate / MB:>9.1f}{rate / base:>9.2f}{row['peak_inflight'] / MB:>9.1f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WinOptimize 冷数据压缩')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    scan_p = sub.add_parser('scan', help='列出长期未使用的大文件')
+    pack_p = sub.add_parser('pack', help='把冷文件压缩进归档')
+    for p in (scan_p, pack_p):
+        p.add_argument('root')
+        p.add_argument('--days', type=int, default=COLD_DAYS)
+        p.add_argument('--min-size', type=int, default=MIN_SIZE // MB, help='MB')
+    pack_p.add_argument('--out', help='归档路径，缺省写在 root 下')
+    pack_p.add_argument('--codec', choices=CODECS, default='lzma')
+    pack_p.add_argument('--level', type=int)
+    pack_p.add_argument('--workers', type=int)
+    pack_p.add_argument('--remove', action='store_true', help='校验通过后删除原文件')
+    list_p = sub.add_parser('list', help='列出归档中的文件')
+    list_p.add_argument('archive')
+    extract_p = sub.add_parser('extract', help='从归档中恢复文件')
+    extract_p.add_argument('archive')
+    extract_p.add_argument('names', nargs='*', help='要恢复的文件，缺省为全部')
+    extract_p.add_argument('--to', help='恢复到的目录，缺省为归档所在目录')
+    extract_p.add_argument('--overwrite', action='store_true')
+    bench_p = sub.add_parser('bench', help='测量不同进程数下的压缩吞吐量')
+    bench_p.add_argument('--dir', help='数据目录，缺省为临时目录')
+    bench_p.add_argument('--files', type=int, default=8)
+    bench_p.add_argument('--size', type=int, default=16, help='每个文件的大小（MB）')
+    bench_p.add_argument('--codec', choices=CODECS, default='lzma')
+    bench_p.add_argument('--workers', type=int, nargs='+')
+    args = parser.parse_args(argv)
+
+    if args.cmd in ('scan', 'pack'):
+        cold = find_cold_files(args.root, args.days, args.min_size * MB)
+        if args.cmd == 'scan':
+            for path, st in cold:
+                print(f"{st.st_size:>14}  {path}")
+            print(f"{len(cold)} files, {sum(st.st_size for _, st in cold)} bytes")
+            return 0
+        if not cold:
+            print('没有符合条件的文件')
+            return 0
+        result = archive(args.root, cold, args.out, args.codec, args.level, args.workers, remove=args.remove)
+        print(json.dumps(result.to_dict(), ensure_ascii=False))
+        return 0 if result.verified == result.files else 1
+    if args.cmd == 'list':
+        cold_archive = ColdArchive(args.archive)
+        for name, entry in cold_archive.files.items():
+            stored = sum(c[1] for c in entry['chunks'])
+            print(f"{entry['size']:>14}{stored:>14}  {name}")
+    elif args.cmd == 'extract':
+        cold_archive = ColdArchive(args.archive)
+        root = args.to or os.path.dirname(os.path.abspath(args.archive))
+        if args.names:
+            for name in args.names:
+                if not cold_archive.extract(name, root, args.overwrite):
+                    print(f"已存在，跳过: {name}")
+        else:
+            print('%d extracted, %d skipped' % cold_archive.extract_all(root, args.overwrite))
+    else:
+        size = args.size * MB
+        print(format_bench(bench(args.dir, args.files, size, args.codec, args.workers)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
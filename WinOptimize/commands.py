@@ -0,0 +1,30 @@
+# 各项优化使用的系统命令，界面按钮与批量执行共用
+
+ULTIMATE_PERFORMANCE_GUID = "e9a42b02-d5df-448d-aa00-03f14749eb61"
+
+# powercfg /setactive 可用的电源计划；卓越性能计划需先用 duplicatescheme 以同一 GUID 复制出来
+POWER_SCHEMES = {
+    'saver': 'SCHEME_MAX',
+    'balanced': 'SCHEME_BALANCED',
+    'high': 'SCHEME_MIN',
+    'ultimate': ULTIMATE_PERFORMANCE_GUID,
+}
+
+POWER_SETACTIVE_CMD = "powercfg /setactive {scheme}"
+POWER_ULTIMATE_INSTALL_CMD = f"powercfg -duplicatescheme {ULTIMATE_PERFORMANCE_GUID} {ULTIMATE_PERFORMANCE_GUID}"
+# 计划已存在时复制会失败，用 & 保证仍会切换过去
+POWER_ULTIMATE_CMD = POWER_ULTIMATE_INSTALL_CMD + " & " + POWER_SETACTIVE_CMD.format(scheme=ULTIMATE_PERFORMANCE_GUID)
+GAME_MODE_ON_CMD = "powershell -Command \"Set-ItemProperty -Path 'HKCU:\\Software\\Microsoft\\GameBar' -Name 'AutoGameModeEnabled' -Value 1\""
+GAME_MODE_OFF_CMD = "powershell -Command \"Set-ItemProperty -Path 'HKCU:\\Software\\Microsoft\\GameBar' -Name 'AutoGameModeEnabled' -Value 0\""
+TCP_AUTOTUNING_OFF_CMD = "netsh int tcp set global autotuninglevel=disabled"
+TCP_AUTOTUNING_SET_CMD = "netsh int tcp set global autotuninglevel={level}"
+TCP_SHOW_GLOBAL_CMD = "netsh int tcp show global"
+DISK_CLEANUP_CMD = "cleanmgr"
+CLEAN_TEMP_PS = "Remove-Item -Path $env:TEMP\\* -Recurse -Force -ErrorAction SilentlyContinue"
+CLEAN_TEMP_CMD = f"powershell -NoProfile -ExecutionPolicy Bypass -Command \"{CLEAN_TEMP_PS}\""
+
+
+def elevated(ps_command):
+    # 通过 Start-Process -Verb RunAs 以管理员权限运行 PowerShell 命令
+    return ("powershell -Command \"Start-Process powershell -ArgumentList "
+            "'-NoProfile -ExecutionPolicy Bypass -Command \\\"" + ps_command + "\\\"' -Verb RunAs\"")
@@ -0,0 +1,379 @@
+# 批量执行：把一组优化项（配置方案）并发推送到主机列表
+import sys
+import os
+import json
+import time
+import random
+import signal
+import asyncio
+import argparse
+
+import commands
+import catalog
+from tracing import tracer
+
+# 内置优化项：id -> 在目标主机上执行的命令
+# 关闭 TCP 自动调优并非总能提速（见 tcp_tuning.py），不放进默认方案，需在方案中显式写出
+TWEAKS = {
+    'power_plan': commands.POWER_ULTIMATE_CMD,
+    'game_mode': commands.GAME_MODE_ON_CMD,
+    'tcp_autotuning_disabled': commands.TCP_AUTOTUNING_OFF_CMD,
+    'cleanup': commands.CLEAN_TEMP_CMD,
+}
+
+DEFAULT_PROFILE = {
+    'name': 'default',
+    'tweaks': ['power_plan', 'game_mode', 'cleanup'],
+}
+
+# 单项执行状态
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+STATUS_TIMEOUT = 'timeout'
+STATUS_UNREACHABLE = 'unreachable'
+STATUS_SKIPPED = 'skipped'
+
+
+class TransportError(Exception):
+    # 连接层面的错误（无法连接主机等），与命令本身执行失败区分
+    pass
+
+
+class CommandResult:
+    def __init__(self, exit_code, stdout=b'', stderr=b''):
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class Transport:
+    # 传输层接口：在指定主机上执行一条命令
+    async def run(self, host, command, timeout):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+async def _run_process(proc, timeout):
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        # 连同子进程一起结束，否则残留进程占用管道会拖住 wait()
+        if os.name == 'posix':
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        else:
+            proc.kill()
+        await proc.wait()
+        raise
+    return CommandResult(proc.returncode, stdout, stderr)
+
+
+class LocalTransport(Transport):
+    # 本地子进程替身，用于测试；通过环境变量 WINOPT_HOST 告知命令目标主机
+    async def run(self, host, command, timeout):
+        env = dict(os.environ, WINOPT_HOST=host)
+        try:
+            proc = await asyncio.create_subprocess_shell(
+                command, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE, env=env,
+                start_new_session=(os.name == 'posix'))
+        except OSError as e:
+            raise TransportError(str(e))
+        return await _run_process(proc, timeout)
+
+
+class SSHTransport(Transport):
+    # 通过 OpenSSH 客户端执行（Windows 自带 OpenSSH 服务端默认使用 cmd）
+    def __init__(self, user=None, port=22, connect_timeout=10, ssh_path='ssh'):
+        self.user = user
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.ssh_path = ssh_path
+
+    async def run(self, host, command, timeout):
+        target = f"{self.user}@{host}" if self.user else host
+        args = [self.ssh_path, '-o', 'BatchMode=yes',
+                '-o', f'ConnectTimeout={self.connect_timeout}',
+                '-p', str(self.port), target, command]
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *args, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=(os.name == 'posix'))
+        except OSError as e:
+            raise TransportError(str(e))
+        result = await _run_process(proc, timeout)
+        # ssh 自身出错（连接失败、认证失败）时返回 255
+        if result.exit_code == 255:
+            raise TransportError(result.stderr.decode(errors='replace').strip())
+        return result
+
+
+class TweakResult:
+    def __init__(self, tweak_id, status, exit_code=None, attempts=0, duration=0.0, error=''):
+        self.tweak_id = tweak_id
+        self.status = status
+        self.exit_code = exit_code
+        self.attempts = attempts
+        self.duration = duration
+        self.error = error
+
+    def to_dict(self):
+        return {
+            'tweak': self.tweak_id,
+            'status': self.status,
+            'exit_code': self.exit_code,
+            'attempts': self.attempts,
+            'duration': round(self.duration, 3),
+            'error': self.error,
+        }
+
+
+class HostResult:
+    def __init__(self, host, tweaks, duration):
+        self.host = host
+        self.tweaks = tweaks
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return all(t.status == STATUS_OK for t in self.tweaks)
+
+    def to_dict(self):
+        return {
+            'host': self.host,
+            'ok': self.ok,
+            'duration': round(self.duration, 3),
+            'tweaks': [t.to_dict() for t in self.tweaks],
+        }
+
+
+class FleetReport:
+    def __init__(self, profile_name, results, duration):
+        self.profile_name = profile_name
+        self.results = results
+        self.duration = duration
+
+    def summary(self):
+        # 每个优化项各状态的主机数
+        counts = {}
+        for host in self.results:
+            for t in host.tweaks:
+                per_tweak = counts.setdefault(t.tweak_id, {})
+                per_tweak[t.status] = per_tweak.get(t.status, 0) + 1
+        return counts
+
+    def to_dict(self):
+        return {
+            'profile': self.profile_name,
+            'hosts': len(self.results),
+            'hosts_ok': sum(1 for r in self.results if r.ok),
+            'duration': round(self.duration, 3),
+            'summary': self.summary(),
+            'results': [r.to_dict() for r in self.results],
+        }
+
+    def format_table(self):
+        statuses = [STATUS_OK, STATUS_FAILED, STATUS_TIMEOUT, STATUS_UNREACHABLE, STATUS_SKIPPED]
+        lines = [f"{'tweak':<16}" + ''.join(f"{s:>13}" for s in statuses)]
+        for tweak_id, counts in self.summary().items():
+            lines.append(f"{tweak_id:<16}" + ''.join(f"{counts.get(s, 0):>13}" for s in statuses))
+        hosts_ok = sum(1 for r in self.results if r.ok)
+        lines.append(f"{hosts_ok}/{len(self.results)} hosts ok in {self.duration:.1f}s")
+        return '\n'.join(lines)
+
+
+def catalog_command(tweak_id):
+    # 内置列表之外的优化项从 tweaks 目录中查找，只支持以命令字符串定义 apply 的项
+    for tweak in catalog.load_catalog():
+        if tweak.id == tweak_id and tweak.command('apply'):
+            return tweak.command('apply')
+    raise ValueError(f"未知的优化项: {tweak_id}")
+
+
+def load_profile(path=None):
+    # 配置方案文件格式：{"name": ..., "tweaks": ["power_plan", {"id": ..., "command": ...}]}
+    # 未给出 command 的项先查内置列表，再查 tweaks 目录；找不到时报出方案文件与 id
+    profile = DEFAULT_PROFILE
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+    tweaks = []
+    for item in profile['tweaks']:
+        if isinstance(item, str):
+            tweak_id, command = item, None
+        else:
+            tweak_id, command = item.get('id'), item.get('command')
+        command = command or TWEAKS.get(tweak_id)
+        if not command:
+            try:
+                command = catalog_command(tweak_id)
+            except ValueError:
+                raise ValueError(f"{path or '内置方案'}: 未知的优化项 {tweak_id!r}") from None
+        tweaks.append((tweak_id, command))
+    return profile.get('name', 'custom'), tweaks
+
+
+class FleetRunner:
+    def __init__(self, transport, tweaks, concurrency=64, host_timeout=120.0,
+                 retries=2, backoff=1.0, max_backoff=30.0):
+        self.transport = transport
+        self.tweaks = tweaks
+        self.concurrency = max(1, concurrency)
+        self.host_timeout = host_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _delay(self, attempt):
+        # 指数退避加随机抖动，避免大量主机同时重试
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    async def _run_tweak(self, host, tweak_id, command, deadline):
+        start = time.monotonic()
+        span = tracer.span('fleet.' + tweak_id, 'job', host=host)
+        status, exit_code, error = STATUS_FAILED, None, ''
+        attempt = 0
+        while attempt <= self.retries:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                status, error = STATUS_TIMEOUT, '主机超时'
+                break
+            attempt += 1
+            try:
+                result = await self.transport.run(host, command, remaining)
+            except asyncio.TimeoutError:
+                status, error = STATUS_TIMEOUT, '主机超时'
+                break
+            except TransportError as e:
+                status, error = STATUS_UNREACHABLE, str(e)
+            else:
+                exit_code = result.exit_code
+                if exit_code == 0:
+                    status, error = STATUS_OK, ''
+                    break
+                status = STATUS_FAILED
+                error = result.stderr.decode(errors='replace').strip()[-500:]
+            if attempt <= self.retries:
+                delay = self._delay(attempt - 1)
+                if time.monotonic() + delay >= deadline:
+                    break
+                await asyncio.sleep(delay)
+        span.args['status'] = status
+        span.exit_code = exit_code
+        span.retries = max(0, attempt - 1)
+        span.finish(error or None)
+        return TweakResult(tweak_id, status, exit_code, attempt, time.monotonic() - start, error)
+
+    async def run_host(self, host):
+        start = time.monotonic()
+        deadline = start + self.host_timeout
+        results = []
+        for tweak_id, command in self.tweaks:
+            if results and results[-1].status in (STATUS_TIMEOUT, STATUS_UNREACHABLE):
+                # 主机已不可用或超时，剩余优化项不再尝试
+                results.append(TweakResult(tweak_id, STATUS_SKIPPED))
+                continue
+            results.append(await self._run_tweak(host, tweak_id, command, deadline))
+        return HostResult(host, results, time.monotonic() - start)
+
+    async def stream(self, hosts):
+        # 固定数量的工作协程从队列取主机，完成一台即产出一台的结果
+        queue = asyncio.Queue()
+        for host in hosts:
+            queue.put_nowait(host)
+        results = asyncio.Queue()
+        workers_count = min(self.concurrency, queue.qsize())
+
+        async def worker():
+            while True:
+                try:
+                    host = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                await results.put(await self.run_host(host))
+            await results.put(None)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(workers_count)]
+        try:
+            finished = 0
+            while finished < workers_count:
+                item = await results.get()
+                if item is None:
+                    finished += 1
+                else:
+                    yield item
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def run(self, hosts, profile_name='custom', on_result=None):
+        start = time.monotonic()
+        collected = []
+        async for result in self.stream(hosts):
+            collected.append(result)
+            if on_result is not None:
+                on_result(result)
+        return FleetReport(profile_name, collected, time.monotonic() - start)
+
+
+def read_hosts(path):
+    hosts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                hosts.append(line)
+    return hosts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WinOptimize 批量执行')
+    parser.add_argument('hosts', help='主机列表文件，每行一个主机')
+    parser.add_argument('--profile', help='配置方案 JSON 文件，缺省为内置方案')
+    parser.add_argument('--transport', choices=['ssh', 'local'], default='ssh')
+    parser.add_argument('--user')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--timeout', type=float, default=120.0, help='单台主机超时（秒）')
+    parser.add_argument('--retries', type=int, default=2)
+    parser.add_argument('--json', help='把汇总报告写入 JSON 文件')
+    args = parser.parse_args(argv)
+
+    try:
+        profile_name, tweaks = load_profile(args.profile)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    hosts = read_hosts(args.hosts)
+    if args.transport == 'local':
+        transport = LocalTransport()
+    else:
+        transport = SSHTransport(user=args.user)
+    runner = FleetRunner(transport, tweaks, concurrency=args.concurrency,
+                         host_timeout=args.timeout, retries=args.retries)
+
+    def on_result(result):
+        failed = [f"{t.tweak_id}={t.status}" for t in result.tweaks if t.status != STATUS_OK]
+        print(f"{result.host:<30} {'OK' if result.ok else 'FAIL'} {' '.join(failed)}", flush=True)
+
+    async def go():
+        try:
+            return await runner.run(hosts, profile_name, on_result)
+        finally:
+            await transport.close()
+
+    report = asyncio.run(go())
+    print(report.format_table())
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+    return 0 if all(r.ok for r in report.results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,331 @@
+# 负载感知的自动方案切换：按规则匹配 CPU 负载与前台进程，带滞回与最短停留时间
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+import subprocess
+
+import commands
+from tracing import tracer
+
+DEFAULT_PROFILE = {'power_plan': 'balanced', 'game_mode': False}
+
+
+class Sample:
+    def __init__(self, t, cpu, process=None):
+        self.t = t
+        self.cpu = cpu
+        self.process = process
+
+    def to_dict(self):
+        return {'t': round(self.t, 3), 'cpu': round(self.cpu, 1), 'process': self.process}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(float(d['t']), float(d['cpu']), d.get('process'))
+
+
+class Rule:
+    # processes: 前台进程名列表（不区分大小写）；cpu_above / cpu_below: CPU 占用阈值（%）
+    def __init__(self, name, profile, processes=None, cpu_above=None, cpu_below=None):
+        self.name = name
+        self.profile = profile
+        self.processes = [p.lower() for p in (processes or [])]
+        self.cpu_above = cpu_above
+        self.cpu_below = cpu_below
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['name'], d['profile'], d.get('processes'), d.get('cpu_above'), d.get('cpu_below'))
+
+    def matches(self, sample, active, band):
+        # 当前已处于该规则时阈值放宽 band，避免负载在阈值附近抖动时来回切换
+        if self.processes and (sample.process or '').lower() not in self.processes:
+            return False
+        if self.cpu_above is not None:
+            threshold = self.cpu_above - band if active else self.cpu_above
+            if sample.cpu < threshold:
+                return False
+        if self.cpu_below is not None:
+            threshold = self.cpu_below + band if active else self.cpu_below
+            if sample.cpu > threshold:
+                return False
+        return True
+
+
+class Decision:
+    def __init__(self, t, previous, current, profile):
+        self.t = t
+        self.previous = previous
+        self.current = current
+        self.profile = profile
+
+    def to_dict(self):
+        return {'t': round(self.t, 3), 'from': self.previous, 'to': self.current, 'profile': self.profile}
+
+
+class SystemActuator:
+    # 通过 powercfg 与注册表实际切换电源计划和游戏模式；每条命令都记录退出码与输出大小，
+    # 任一命令失败时返回 False，由调用方决定不记录这次切换、稍后重试
+    def __init__(self):
+        self._ultimate_installed = False
+
+    def _run(self, command):
+        with tracer.span('governor.command', 'action', command=command) as span:
+            result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            span.exit_code = result.returncode
+            span.output_size = len(result.stdout or b'')
+            if result.returncode != 0:
+                span.error = (result.stdout or b'')[-200:].decode(errors='replace').strip() or None
+            return result.returncode == 0
+
+    def apply(self, changes):
+        ok = True
+        if 'power_plan' in changes:
+            plan = changes['power_plan']
+            if plan == 'ultimate' and not self._ultimate_installed:
+                # 计划已存在时复制会失败，以切换是否成功为准
+                self._run(commands.POWER_ULTIMATE_INSTALL_CMD)
+            scheme = commands.POWER_SCHEMES[plan]
+            if self._run(commands.POWER_SETACTIVE_CMD.format(scheme=scheme)):
+                if plan == 'ultimate':
+                    self._ultimate_installed = True
+            else:
+                ok = False
+        if 'game_mode' in changes:
+            command = commands.GAME_MODE_ON_CMD if changes['game_mode'] else commands.GAME_MODE_OFF_CMD
+            ok = self._run(command) and ok
+        return ok
+
+
+class RecordingActuator:
+    # 只记录切换动作，用于回放与测试
+    def __init__(self):
+        self.applied = []
+
+    def apply(self, changes):
+        self.applied.append(dict(changes))
+        return True
+
+
+class Governor:
+    def __init__(self, rules, actuator, default_profile=DEFAULT_PROFILE,
+                 enter_time=10.0, min_dwell=60.0, band=10.0):
+        self.rules = rules
+        self.actuator = actuator
+        self.default_profile = default_profile
+        self.enter_time = enter_time  # 新状态需持续满足的时间
+        self.min_dwell = min_dwell    # 两次切换之间的最短停留时间
+        self.band = band              # CPU 阈值滞回带宽（%）
+        self.current = None           # None 表示默认方案
+        self.applied_profile = {}
+        self.candidate = None
+        self.candidate_since = None
+        self.switched_at = None
+
+    def start(self):
+        # 启动时先下发默认方案，使系统实际状态与 current = None 一致；失败的项不计入已应用状态，之后切换时会重新下发
+        return self._apply(self.default_profile, None)
+
+    def profile_for(self, name):
+        # 规则方案只写出与默认不同的项，其余取默认值，每个状态都对应一组完整的设置
+        if name is None:
+            return self.default_profile
+        return {**self.default_profile, **next(r.profile for r in self.rules if r.name == name)}
+
+    def desired(self, sample):
+        # 规则按顺序匹配，第一条满足的生效
+        for rule in self.rules:
+            if rule.matches(sample, rule.name == self.current, self.band):
+                return rule.name
+        return None
+
+    def step(self, sample):
+        target = self.desired(sample)
+        if target == self.current:
+            self.candidate = None
+            self.candidate_since = None
+            return None
+        if target != self.candidate or self.candidate_since is None:
+            self.candidate = target
+            self.candidate_since = sample.t
+        if sample.t - self.candidate_since < self.enter_time:
+            return None
+        if self.switched_at is not None and sample.t - self.switched_at < self.min_dwell:
+            return None
+        return self._switch(sample.t, target)
+
+    def _apply(self, profile, target):
+        # 只下发与当前已应用状态不同的项；执行失败时不更新已应用状态，返回 False
+        changes = {k: v for k, v in profile.items() if self.applied_profile.get(k) != v}
+        if not changes:
+            return True
+        with tracer.span('governor.switch', 'job', previous=self.current, current=target, changes=changes) as span:
+            if self.actuator.apply(changes) is False:
+                span.error = 'actuation failed'
+                return False
+        self.applied_profile.update(changes)
+        return True
+
+    def _switch(self, t, target):
+        profile = self.profile_for(target)
+        # 切换失败时保持原状态与候选，下一个采样再试
+        if not self._apply(profile, target):
+            return None
+        decision = Decision(t, self.current, target, profile)
+        self.current = target
+        self.candidate = None
+        self.candidate_since = None
+        self.switched_at = t
+        return decision
+
+
+def load_rules(path):
+    # 规则文件：{"default": {...}, "rules": [{"name": ..., "processes": [...], "cpu_above": ..., "profile": {...}}]}
+    with open(path, 'r', encoding='utf-8') as f:
+        cfg = json.load(f)
+    return [Rule.from_dict(d) for d in cfg.get('rules', [])], cfg.get('default', DEFAULT_PROFILE)
+
+
+# ---------- 采样 ----------
+
+class SystemSampler:
+    def __init__(self):
+        self._last = self._cpu_times()
+
+    def _cpu_times(self):
+        # 返回 (空闲, 总计) 累计时间
+        if os.name == 'nt':
+            import ctypes
+            from ctypes import wintypes
+            idle, kernel, user = wintypes.FILETIME(), wintypes.FILETIME(), wintypes.FILETIME()
+            ctypes.windll.kernel32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user))
+            to_int = lambda ft: (ft.dwHighDateTime << 32) | ft.dwLowDateTime
+            # 内核时间已包含空闲时间
+            return to_int(idle), to_int(kernel) + to_int(user)
+        with open('/proc/stat', 'r') as f:
+            fields = [int(x) for x in f.readline().split()[1:]]
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+        return idle, sum(fields)
+
+    def _foreground_process(self):
+        if os.name != 'nt':
+            return None
+        import ctypes
+        from ctypes import wintypes
+        user32, kernel32 = ctypes.windll.user32, ctypes.windll.kernel32
+        pid = wintypes.DWORD()
+        user32.GetWindowThreadProcessId(user32.GetForegroundWindow(), ctypes.byref(pid))
+        handle = kernel32.OpenProcess(0x1000, False, pid.value)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return None
+        try:
+            buf = ctypes.create_unicode_buffer(260)
+            size = wintypes.DWORD(len(buf))
+            if kernel32.QueryFullProcessImageNameW(handle, 0, buf, ctypes.byref(size)):
+                return os.path.basename(buf.value)
+            return None
+        finally:
+            kernel32.CloseHandle(handle)
+
+    def sample(self):
+        idle, total = self._cpu_times()
+        last_idle, last_total = self._last
+        self._last = (idle, total)
+        busy = 0.0
+        if total > last_total:
+            busy = 100.0 * (1 - (idle - last_idle) / (total - last_total))
+        return Sample(time.monotonic(), busy, self._foreground_process())
+
+
+class GovernorThread(threading.Thread):
+    # 低频采样的后台线程；采样间隔默认 5 秒，开销远低于 0.5% CPU
+    def __init__(self, governor, sampler=None, interval=5.0, on_decision=None, trace_path=None):
+        super().__init__(daemon=True)
+        self.governor = governor
+        self.sampler = sampler or SystemSampler()
+        self.interval = interval
+        self.on_decision = on_decision
+        self.trace_path = trace_path
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        trace = open(self.trace_path, 'a', encoding='utf-8') if self.trace_path else None
+        try:
+            self.governor.start()
+            while not self._stop_event.wait(self.interval):
+                sample = self.sampler.sample()
+                if trace is not None:
+                    trace.write(json.dumps(sample.to_dict(), ensure_ascii=False) + '\n')
+                    trace.flush()
+                decision = self.governor.step(sample)
+                if decision is not None and self.on_decision is not None:
+                    self.on_decision(decision)
+        finally:
+            if trace is not None:
+                trace.close()
+
+
+def load_trace(path):
+    samples = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                samples.append(Sample.from_dict(json.loads(line)))
+    return samples
+
+
+def replay(governor, samples):
+    # 以采样自带的时间戳驱动，结果与运行环境无关
+    governor.start()
+    decisions = []
+    for sample in samples:
+        decision = governor.step(sample)
+        if decision is not None:
+            decisions.append(decision)
+    return decisions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WinOptimize 自动方案切换')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    run_p = sub.add_parser('run', help='在本机运行')
+    run_p.add_argument('--interval', type=float, default=5.0)
+    run_p.add_argument('--record', help='把采样写入轨迹文件')
+    run_p.add_argument('--dry-run', action='store_true', help='只输出决策，不实际切换')
+    replay_p = sub.add_parser('replay', help='回放轨迹文件并输出决策')
+    replay_p.add_argument('trace')
+    for p in (run_p, replay_p):
+        p.add_argument('--rules', required=True)
+        p.add_argument('--enter-time', type=float, default=10.0)
+        p.add_argument('--min-dwell', type=float, default=60.0)
+        p.add_argument('--band', type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    rules, default = load_rules(args.rules)
+    actuator = RecordingActuator() if args.cmd == 'replay' or args.dry_run else SystemActuator()
+    governor = Governor(rules, actuator, default, args.enter_time, args.min_dwell, args.band)
+
+    if args.cmd == 'replay':
+        for decision in replay(governor, load_trace(args.trace)):
+            print(json.dumps(decision.to_dict(), ensure_ascii=False))
+        return 0
+
+    thread = GovernorThread(governor, interval=args.interval, trace_path=args.record,
+                            on_decision=lambda d: print(json.dumps(d.to_dict(), ensure_ascii=False), flush=True))
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(1.0)
+    except KeyboardInterrupt:
+        thread.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
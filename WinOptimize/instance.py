@@ -0,0 +1,284 @@
+# 单实例：第一个进程在本地管道上监听，之后的启动把命令行参数转发给它后立即退出
+# 本模块只依赖标准库，在导入 Qt 之前使用，转发路径不承担 Qt 的启动开销
+import os
+import sys
+import stat
+import json
+import time
+import argparse
+import threading
+import subprocess
+from multiprocessing.connection import Listener, Client
+
+PAGES = ('settings', 'optimization', 'disk_cleanup', 'software', 'diagnostics')
+
+# parse_args 可能产生的键及其类型；收到的消息只接受这些
+FIELDS = {'page': str, 'apply': str, 'profile': str, 'tray': bool}
+
+MAX_MESSAGE = 64 * 1024
+
+
+def _runtime_dir():
+    # 套接字放在只有当前用户能进入的目录里：优先 XDG_RUNTIME_DIR，
+    # 没有时用临时目录下按用户建立的 0700 子目录
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime and os.path.isdir(runtime):
+        return runtime
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), f"winoptimize-{os.getuid()}")
+
+
+def default_address():
+    # Windows 上为命名管道，其他平台为私有目录下的 Unix 套接字，均按用户区分
+    if os.name == 'nt':
+        return r'\\.\pipe\WinOptimize-' + os.environ.get('USERNAME', 'user')
+    return os.path.join(_runtime_dir(), 'winoptimize.sock')
+
+
+def _private_dir(directory):
+    # 目录不存在时以 0700 创建；已存在时必须是当前用户所有、其他人无权访问的真实目录，
+    # 否则可能是别人抢先建好的，放进去的套接字会被替换或冒充
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"套接字目录不是当前用户私有的目录: {directory}")
+
+
+def _pipe_sddl(sid):
+    # 默认 DACL 在提权后只允许 SYSTEM 与管理员组访问，普通双击启动的进程无法连接；
+    # 这里额外授予当前用户读写，并把完整性级别标为中等，未提权的进程才能写入
+    return f"D:P(A;;GA;;;SY)(A;;GA;;;BA)(A;;GRGW;;;{sid})S:(ML;;NW;;;ME)"
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='Win_Optimize', description='WinOptimize')
+    parser.add_argument('--page', choices=PAGES, help='打开指定页面')
+    parser.add_argument('--apply', metavar='TWEAK', help='应用 tweaks 目录中的优化项')
+    parser.add_argument('--profile', metavar='PATH', help='在本机执行配置方案（与 fleet.py 相同的格式）')
+    parser.add_argument('--tray', action='store_true', default=None, help='只在托盘中启动，不打开窗口')
+    return parser
+
+
+def parse_args(argv):
+    args = _parser().parse_args(argv)
+    if args.profile:
+        # 运行中的实例工作目录可能不同
+        args.profile = os.path.abspath(args.profile)
+    return {k: v for k, v in vars(args).items() if v is not None}
+
+
+def validate(message):
+    # 实例以管理员身份运行，消息来自其他进程：只接受 JSON 对象，键与取值都必须是 parse_args 能产生的
+    if not isinstance(message, dict):
+        raise ValueError('消息必须是 JSON 对象')
+    for key, value in message.items():
+        if key not in FIELDS:
+            raise ValueError(f"未知的参数: {key}")
+        if not isinstance(value, FIELDS[key]):
+            raise ValueError(f"参数 {key} 的类型无效")
+    if 'page' in message and message['page'] not in PAGES:
+        raise ValueError(f"未知的页面: {message['page']}")
+    return message
+
+
+def forward(argv, address=None):
+    # 成功转发给已运行的实例时返回 True；没有实例在运行时返回 False
+    message = parse_args(argv)
+    try:
+        conn = Client(address or default_address())
+    except OSError:
+        # 不存在或残留的套接字文件
+        return False
+    try:
+        conn.send_bytes(json.dumps(message).encode('utf-8'))
+        return conn.recv_bytes(16) == b'ok'
+    except (OSError, EOFError):
+        return False
+    finally:
+        conn.close()
+
+
+if os.name == 'nt':
+    import ctypes
+    from ctypes import wintypes
+    from multiprocessing.connection import PipeListener, BUFSIZE
+
+    class SECURITY_ATTRIBUTES(ctypes.Structure):
+        _fields_ = [('nLength', wintypes.DWORD), ('lpSecurityDescriptor', ctypes.c_void_p),
+                    ('bInheritHandle', wintypes.BOOL)]
+
+    def _user_sid():
+        # 当前令牌的用户 SID；管理员身份运行的实例与同一用户未提权的进程 SID 相同
+        advapi32 = ctypes.windll.advapi32
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        token = wintypes.HANDLE()
+        if not advapi32.OpenProcessToken(kernel32.GetCurrentProcess(), 0x0008, ctypes.byref(token)):
+            raise ctypes.WinError()
+        try:
+            size = wintypes.DWORD()
+            advapi32.GetTokenInformation(token, 1, None, 0, ctypes.byref(size))
+            buf = ctypes.create_string_buffer(size.value)
+            if not advapi32.GetTokenInformation(token, 1, buf, size, ctypes.byref(size)):
+                raise ctypes.WinError()
+        finally:
+            kernel32.CloseHandle(token)
+        # TOKEN_USER 的第一个字段即 SID 指针
+        sid = ctypes.cast(buf, ctypes.POINTER(ctypes.c_void_p))[0]
+        text = wintypes.LPWSTR()
+        if not advapi32.ConvertSidToStringSidW(ctypes.c_void_p(sid), ctypes.byref(text)):
+            raise ctypes.WinError()
+        try:
+            return text.value
+        finally:
+            kernel32.LocalFree(text)
+
+    def _pipe_security():
+        sddl = _pipe_sddl(_user_sid())
+        descriptor = ctypes.c_void_p()
+        if not ctypes.windll.advapi32.ConvertStringSecurityDescriptorToSecurityDescriptorW(
+                sddl, 1, ctypes.byref(descriptor), None):
+            raise ctypes.WinError()
+        return SECURITY_ATTRIBUTES(ctypes.sizeof(SECURITY_ATTRIBUTES), descriptor, False)
+
+    class _PipeListener(PipeListener):
+        # 与标准库的 PipeListener 相同，只是创建管道时带上安全描述符并拒绝远程客户端
+        def __init__(self, address):
+            self._security = _pipe_security()
+            super().__init__(address)
+
+        def _new_handle(self, first=False):
+            create = ctypes.windll.kernel32.CreateNamedPipeW
+            create.restype = wintypes.HANDLE
+            create.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.DWORD,
+                               wintypes.DWORD, wintypes.DWORD, wintypes.DWORD, ctypes.c_void_p]
+            # PIPE_ACCESS_DUPLEX | FILE_FLAG_OVERLAPPED，首个实例再加 FILE_FLAG_FIRST_PIPE_INSTANCE，
+            # 已有实例在监听时创建失败
+            flags = 0x00000003 | 0x40000000
+            if first:
+                flags |= 0x00080000
+            # PIPE_TYPE_MESSAGE | PIPE_READMODE_MESSAGE | PIPE_WAIT | PIPE_REJECT_REMOTE_CLIENTS
+            mode = 0x4 | 0x2 | 0x0 | 0x8
+            handle = create(self._address, flags, mode, 255, BUFSIZE, BUFSIZE, 0xFFFFFFFF,
+                            ctypes.byref(self._security))
+            if handle is None or handle == wintypes.HANDLE(-1).value:
+                raise ctypes.WinError()
+            return handle
+
+
+class AlreadyRunning(Exception):
+    pass
+
+
+class InstanceServer:
+    # 在界面就绪前收到的命令先排队，set_handler 时再依次交给处理函数
+    def __init__(self, address=None):
+        self.address = address or default_address()
+        self.listener = None
+        self.handler = None
+        self.pending = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        if os.name != 'nt':
+            # 目录被他人占用不是“已有实例”，直接报错而不是转发过去
+            _private_dir(os.path.dirname(self.address))
+        try:
+            self.listener = self._listen()
+        except OSError:
+            raise AlreadyRunning(self.address)
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _listen(self):
+        if os.name == 'nt':
+            # 命名管道随进程退出自动消失；已被占用时创建失败
+            return _PipeListener(self.address)
+        # bind 时套接字文件就是 0600，不留先创建再改权限的窗口
+        mask = os.umask(0o077)
+        try:
+            try:
+                return Listener(self.address)
+            except OSError:
+                # 套接字文件可能是上次异常退出留下的，确认无人监听后删除重建
+                try:
+                    Client(self.address).close()
+                    raise
+                except ConnectionRefusedError:
+                    os.unlink(self.address)
+                    return Listener(self.address)
+        finally:
+            os.umask(mask)
+
+    def _serve(self):
+        listener = self.listener
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                return
+            if self.listener is None:
+                conn.close()
+                return
+            try:
+                # 连上却迟迟不发送的客户端不能卡住后续转发
+                if not conn.poll(1.0):
+                    continue
+                message = validate(json.loads(conn.recv_bytes(MAX_MESSAGE).decode('utf-8')))
+                conn.send_bytes(b'ok')
+            except (OSError, EOFError, ValueError):
+                # 超长、格式错误或参数不合法的消息直接丢弃
+                continue
+            finally:
+                conn.close()
+            self._dispatch(message)
+
+    def _dispatch(self, message):
+        with self._lock:
+            if self.handler is None:
+                self.pending.append(message)
+                return
+            handler = self.handler
+        handler(message)
+
+    def set_handler(self, handler):
+        with self._lock:
+            self.handler = handler
+            pending, self.pending = self.pending, []
+        for message in pending:
+            handler(message)
+
+    def close(self):
+        if self.listener is None:
+            return
+        listener, self.listener = self.listener, None
+        # 关闭监听并不能唤醒阻塞在 accept 上的线程，先自己连一次
+        try:
+            Client(self.address).close()
+        except OSError:
+            pass
+        listener.close()
+
+
+def measure_forward(args, repeats=10):
+    # 在已有实例运行时，测量再次启动主程序到转发完成退出的耗时（毫秒，中位数）
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Win_Optimize_1.0.0.py')
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        code = subprocess.call([sys.executable, script] + list(args))
+        times.append((time.perf_counter() - started) * 1000)
+        if code != 0:
+            raise RuntimeError(f"转发失败，退出码 {code}")
+    return sorted(times)[len(times) // 2]
+
+
+if __name__ == '__main__':
+    # python instance.py --page disk_cleanup：只转发，不启动界面
+    # python instance.py --measure --page settings：测量转发路径的端到端耗时
+    if sys.argv[1:2] == ['--measure']:
+        print(f"{measure_forward(sys.argv[2:]):.1f} ms")
+        sys.exit(0)
+    sys.exit(0 if forward(sys.argv[1:]) else 1)
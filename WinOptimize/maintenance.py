@@ -0,0 +1,356 @@
+# 空闲维护：在机器空闲时以低优先级、限速方式执行清理任务，用户回来时立即暂停，进度可续
+import sys
+import os
+import json
+import time
+import tempfile
+import argparse
+import threading
+
+import governor
+from tracing import tracer
+
+STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maintenance_state.json")
+
+
+# ---------- 系统状态 ----------
+
+def input_idle_seconds():
+    # 距离最后一次键盘鼠标输入的秒数；非 Windows 环境无法获取时返回 None
+    if os.name != 'nt':
+        return None
+    import ctypes
+    from ctypes import wintypes
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [('cbSize', wintypes.UINT), ('dwTime', wintypes.DWORD)]
+
+    info = LASTINPUTINFO()
+    info.cbSize = ctypes.sizeof(info)
+    if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+        return None
+    return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xffffffff) / 1000.0
+
+
+class DiskSampler:
+    # 磁盘繁忙度（%），取 /proc/diskstats 中 io_ticks 的增量；其他平台返回 None
+    def __init__(self):
+        self._last = self._read()
+
+    def _read(self):
+        if not os.path.exists('/proc/diskstats'):
+            return None
+        ticks = {}
+        with open('/proc/diskstats', 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 12 and not fields[2].startswith(('loop', 'ram')):
+                    ticks[fields[2]] = int(fields[12])
+        return time.monotonic(), ticks
+
+    def busy(self):
+        current = self._read()
+        last, self._last = self._last, current
+        if current is None or last is None:
+            return None
+        elapsed_ms = (current[0] - last[0]) * 1000
+        if elapsed_ms <= 0:
+            return 0.0
+        deltas = [current[1][d] - last[1].get(d, current[1][d]) for d in current[1]]
+        return min(100.0, max(deltas or [0]) / elapsed_ms * 100)
+
+
+class IdleMonitor:
+    def __init__(self, idle_seconds=300, cpu_max=20.0, disk_max=20.0, input_idle=input_idle_seconds):
+        self.idle_seconds = idle_seconds
+        self.cpu_max = cpu_max
+        self.disk_max = disk_max
+        self.input_idle = input_idle
+        self.cpu = governor.SystemSampler()
+        self.disk = DiskSampler()
+
+    def is_idle(self):
+        idle = self.input_idle()
+        if idle is not None and idle < self.idle_seconds:
+            return False
+        if self.cpu.sample().cpu > self.cpu_max:
+            return False
+        busy = self.disk.busy()
+        return busy is None or busy <= self.disk_max
+
+    def user_returned(self, running_for):
+        # 运行期间有过输入（空闲时长小于已运行时长）即视为用户回来了
+        idle = self.input_idle()
+        return idle is not None and idle < running_for
+
+
+def lower_thread_priority():
+    # 仅降低当前工作线程的 CPU 与 I/O 优先级，不影响界面线程
+    if os.name == 'nt':
+        import ctypes
+        THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+        return
+    tid = threading.get_native_id()
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, 19)
+    except (AttributeError, OSError):
+        pass
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        SYS_ioprio_set = {'x86_64': 251, 'aarch64': 30}.get(os.uname().machine)
+        if SYS_ioprio_set:
+            IOPRIO_WHO_PROCESS, IOPRIO_CLASS_IDLE = 1, 3
+            libc.syscall(SYS_ioprio_set, IOPRIO_WHO_PROCESS, tid, IOPRIO_CLASS_IDLE << 13)
+    except OSError:
+        pass
+
+
+class RateLimiter:
+    # 令牌桶：限制每秒文件操作（stat、删除）次数
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate / 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def acquire(self, n=1):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= n:
+                self.tokens -= n
+                return
+            time.sleep((n - self.tokens) / self.rate)
+
+
+# ---------- 任务 ----------
+
+class JobContext:
+    def __init__(self, state, limiter):
+        self.state = state
+        self.limiter = limiter
+
+    def op(self, n=1):
+        self.limiter.acquire(n)
+
+
+class Job:
+    # 任务以生成器形式执行，每完成一小步 yield 一次，调度器借此检查是否需要暂停；
+    # 进度保存在 ctx.state 中，暂停后从上次位置继续
+    name = 'job'
+    interval = 24 * 3600  # 完成后再次执行的间隔（秒）
+
+    def steps(self, ctx):
+        raise NotImplementedError
+
+
+class TempCleanupJob(Job):
+    name = 'temp_cleanup'
+
+    def __init__(self, roots=None, min_age_hours=24):
+        self.roots = roots or [tempfile.gettempdir()]
+        self.min_age = min_age_hours * 3600
+
+    def _walk(self, root, rel=()):
+        # 按名称排序的深度优先遍历，顺序与相对路径元组的大小顺序一致，便于断点续做
+        try:
+            names = sorted(os.listdir(os.path.join(root, *rel)))
+        except OSError:
+            return
+        for name in names:
+            path = rel + (name,)
+            full = os.path.join(root, *path)
+            if os.path.isdir(full) and not os.path.islink(full):
+                yield path, True
+                yield from self._walk(root, path)
+            else:
+                yield path, False
+
+    def steps(self, ctx):
+        cutoff = time.time() - self.min_age
+        ctx.state.setdefault('deleted', 0)
+        ctx.state.setdefault('freed', 0)
+        start_root = ctx.state.get('root', 0)
+        for index, root in enumerate(self.roots):
+            if index < start_root:
+                continue
+            cursor = tuple(ctx.state.get('cursor') or ()) if index == start_root else ()
+            ctx.state['root'] = index
+            # 本任务删过文件的目录，其修改时间已被刷新，需单独记录
+            touched = set(ctx.state.get('touched') or []) if index == start_root else set()
+            dirs = []
+            for path, is_dir in self._walk(root):
+                # 遍历本身（列目录、判断类型、lstat）也访问磁盘：续做时跳过的项和目录同样限速，
+                # 并且每项都 yield，让调度器能及时暂停
+                ctx.op()
+                full = os.path.join(root, *path)
+                if is_dir:
+                    # 目录不计入断点，续做时仍需在最后尝试删除；新建的空目录不删
+                    try:
+                        if os.lstat(full).st_mtime < cutoff or '/'.join(path) in touched:
+                            dirs.append(full)
+                    except OSError:
+                        pass
+                    yield
+                    continue
+                if path <= cursor:
+                    yield
+                    continue
+                try:
+                    st = os.lstat(full)
+                    if st.st_mtime < cutoff:
+                        ctx.op()
+                        os.remove(full)
+                        ctx.state['deleted'] += 1
+                        ctx.state['freed'] += st.st_size
+                        parent = '/'.join(path[:-1])
+                        if parent and parent not in touched:
+                            touched.add(parent)
+                            ctx.state['touched'] = sorted(touched)
+                except OSError:
+                    # 文件正被占用或无权限时跳过
+                    pass
+                ctx.state['cursor'] = list(path)
+                yield
+            # 子目录由深到浅尝试删除，非空目录会失败并被跳过
+            for d in reversed(dirs):
+                ctx.op()
+                try:
+                    os.rmdir(d)
+                except OSError:
+                    pass
+                yield
+            ctx.state['cursor'] = None
+            ctx.state['touched'] = []
+        ctx.state['root'] = 0
+
+
+# ---------- 调度 ----------
+
+class MaintenanceScheduler:
+    def __init__(self, monitor, state_path=STATE_PATH, ops_per_sec=200, poll=30.0, checkpoint=2.0):
+        self.monitor = monitor
+        self.state_path = state_path
+        self.limiter = RateLimiter(ops_per_sec)
+        self.poll = poll
+        self.checkpoint = checkpoint
+        self.jobs = []
+        self.states = self._load()
+        self._stop_event = threading.Event()
+
+    def register(self, job):
+        self.jobs.append(job)
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.states, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _due(self, job):
+        state = self.states.get(job.name, {})
+        finished = state.get('finished_at')
+        return finished is None or time.time() - finished >= job.interval
+
+    def run_job(self, job):
+        # 返回 True 表示任务完成，False 表示因用户回来或停止而暂停
+        state = self.states.get(job.name, {})
+        if state.get('finished_at') is not None:
+            state = {}
+        self.states[job.name] = state
+        ctx = JobContext(state.setdefault('progress', {}), self.limiter)
+        started = time.monotonic()
+        saved = started
+        steps = job.steps(ctx)
+        span = tracer.span('maintenance.' + job.name, 'job')
+        try:
+            for _ in steps:
+                now = time.monotonic()
+                if self._stop_event.is_set() or self.monitor.user_returned(now - started):
+                    span.args['paused'] = True
+                    return False
+                if now - saved >= self.checkpoint:
+                    self._save()
+                    saved = now
+            state['finished_at'] = time.time()
+            return True
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            steps.close()
+            self._save()
+            span.args.update((k, v) for k, v in ctx.state.items() if isinstance(v, (int, float)))
+            span.finish()
+
+    def run_pending(self):
+        # 空闲时依次执行到期任务；返回完成的任务数
+        completed = 0
+        for job in self.jobs:
+            if not self._due(job):
+                continue
+            if self._stop_event.is_set() or not self.monitor.is_idle():
+                break
+            if not self.run_job(job):
+                break
+            completed += 1
+        return completed
+
+    def run_forever(self):
+        lower_thread_priority()
+        while not self._stop_event.is_set():
+            self.run_pending()
+            self._stop_event.wait(self.poll)
+
+
+class MaintenanceThread(threading.Thread):
+    def __init__(self, scheduler):
+        super().__init__(daemon=True)
+        self.scheduler = scheduler
+
+    def stop(self):
+        self.scheduler.stop()
+
+    def run(self):
+        self.scheduler.run_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WinOptimize 空闲维护')
+    parser.add_argument('--once', action='store_true', help='只检查并执行一轮')
+    parser.add_argument('--idle', type=float, default=300, help='判定空闲所需的无输入时长（秒）')
+    parser.add_argument('--ops', type=float, default=200, help='每秒文件操作上限')
+    parser.add_argument('--min-age', type=float, default=24, help='只删除早于该时长（小时）的临时文件')
+    parser.add_argument('--root', action='append', help='清理的目录，缺省为系统临时目录')
+    args = parser.parse_args(argv)
+
+    scheduler = MaintenanceScheduler(IdleMonitor(idle_seconds=args.idle), ops_per_sec=args.ops)
+    scheduler.register(TempCleanupJob(args.root, args.min_age))
+    if args.once:
+        lower_thread_priority()
+        print(scheduler.run_pending())
+        print(json.dumps(scheduler.states, ensure_ascii=False, indent=2))
+        return 0
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# 常驻内存测量：比较始终保留窗口与托盘模式（关闭窗口后销毁界面）空闲时的常驻内存
+# 每种模式在独立子进程中测量，互不影响
+import sys
+import os
+import json
+import time
+import argparse
+
+from ui_measure import load_app, wait, add_arguments, run_child, report
+
+# window: 窗口打开后关闭，控件全部保留（原有行为）
+# tray: 托盘模式，窗口打开后关闭，界面被销毁
+# tray_start: 以 --tray 启动，从未构建界面
+MODES = ('window', 'tray', 'tray_start')
+
+# 空闲内存目标，按私有内存计（常驻内存中 Qt 等共享库的页面与界面是否存在无关）：
+# 托盘模式空闲时不超过 private_mb；销毁界面后比从未构建界面多出的部分不超过 teardown_overhead_mb
+TARGETS = {'private_mb': 32.0, 'teardown_overhead_mb': 4.0}
+
+MB = 1024 * 1024
+
+
+def resident_memory():
+    # 返回 (常驻内存, 私有内存) 字节数
+    if os.name == 'nt':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS_EX(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t),
+                        ('PrivateUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS_EX()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        ctypes.windll.psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD]
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.WorkingSetSize, counters.PrivateUsage
+    values = {}
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'RssAnon'):
+                values[key] = int(value.split()[0]) * 1024
+    return values.get('VmRSS', 0), values.get('RssAnon', 0)
+
+
+def measure(mode, settle):
+    app_module = load_app()
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv)
+    app.setStyle('Fusion')
+    app.setQuitOnLastWindowClosed(False)
+    result = {'mode': mode}
+    # 测量的是销毁界面的效果，与是否真的有托盘图标无关；无桌面环境下也保持托盘模式
+    core = app_module.AppCore(tray=(mode != 'window'), require_tray=False)
+    if mode != 'tray_start':
+        window = core.show_window()
+        # 每个页面都打开一次，与实际使用时一样完整构建界面
+        for index in range(window.content_widget.count()):
+            window.switch_page(index)
+            wait(0.2)
+        wait(settle)
+        result['shown'] = resident_memory()
+        window.close()
+        if mode == 'tray':
+            wait(core.teardown_timer.interval() / 1000.0)
+    wait(settle)
+    result['idle'] = resident_memory()
+    result['window_alive'] = core.window is not None
+    if mode == 'tray' and result['window_alive']:
+        raise RuntimeError('托盘模式下关闭窗口后界面未被销毁，测量结果无效')
+    if mode == 'tray':
+        started = time.perf_counter()
+        core.show_window()
+        app.processEvents()
+        result['rebuild_ms'] = (time.perf_counter() - started) * 1000
+    core.quit()
+    return result
+
+
+def check_targets(results):
+    failures = []
+    for mode in ('tray', 'tray_start'):
+        private = results[mode]['idle'][1]
+        if private > TARGETS['private_mb'] * MB:
+            failures.append(f"{mode}: private {private / MB:.1f} MB > {TARGETS['private_mb']} MB")
+    overhead = results['tray']['idle'][1] - results['tray_start']['idle'][1]
+    if overhead > TARGETS['teardown_overhead_mb'] * MB:
+        failures.append(f"tray: {overhead / MB:.1f} MB left after teardown > {TARGETS['teardown_overhead_mb']} MB")
+    return failures
+
+
+def format_results(results):
+    lines = [f"{'mode':<12}{'shown MB':>10}{'idle MB':>10}{'private MB':>12}{'rebuild ms':>12}"]
+    for mode in MODES:
+        r = results[mode]
+        shown = f"{r['shown'][0] / MB:.1f}" if 'shown' in r else '-'
+        rebuild = f"{r['rebuild_ms']:.0f}" if 'rebuild_ms' in r else '-'
+        lines.append(f"{mode:<12}{shown:>10}{r['idle'][0] / MB:>10.1f}{r['idle'][1] / MB:>12.1f}{rebuild:>12}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WinOptimize 常驻内存测量')
+    parser.add_argument('--settle', type=float, default=3.0, help='每次测量前的等待时间（秒）')
+    add_arguments(parser)
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.settle)))
+        return 0
+
+    results = {mode: run_child(__file__, ['--child', mode, '--settle', args.settle], args.offscreen)
+               for mode in MODES}
+    print(format_results(results))
+    return report('results', results, TARGETS, check_targets(results), args.json)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
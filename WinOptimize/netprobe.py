@@ -0,0 +1,431 @@
+# 网络诊断：用 asyncio 并发测量 TCP 建连时延与 DNS 解析时延，按目标统计抖动与丢包
+# 目标写法：host:port 测 TCP 建连；dns:name 测系统解析器；dns:name@server[:port] 直接向该服务器发 UDP 查询
+import sys
+import time
+import errno
+import random
+import socket
+import struct
+import asyncio
+import argparse
+from collections import deque
+
+from tracing import tracer, percentile
+
+DEFAULT_TARGETS = (
+    'www.microsoft.com:443',
+    'www.baidu.com:443',
+    'dns:www.microsoft.com',
+    'dns:www.microsoft.com@223.5.5.5',
+    'dns:www.microsoft.com@1.1.1.1',
+)
+
+WINDOW = 200          # 每个目标保留的最近样本数
+CONCURRENCY = 256     # 同时在途的探测数上限
+
+
+def _split_host_port(text, default=None):
+    # 支持 host:port、[IPv6]:port 与不带端口的写法
+    if text.startswith('['):
+        host, _, rest = text[1:].partition(']')
+        port = rest[1:] if rest.startswith(':') else ''
+    elif text.count(':') == 1:
+        host, _, port = text.partition(':')
+    else:
+        host, port = text, ''
+    return host, int(port) if port else default
+
+
+class Target:
+    def __init__(self, kind, label, host=None, port=None, name=None):
+        self.kind = kind      # tcp / dns / resolve
+        self.label = label
+        self.host = host
+        self.port = port
+        self.name = name
+
+    @classmethod
+    def parse(cls, text):
+        text = text.strip()
+        if text.startswith('dns:'):
+            name, _, server = text[4:].partition('@')
+            if not name:
+                raise ValueError(f"缺少要解析的域名: {text}")
+            if not server:
+                return cls('resolve', text, name=name)
+            host, port = _split_host_port(server, 53)
+            return cls('dns', text, host, port, name)
+        host, port = _split_host_port(text)
+        if not host or port is None:
+            raise ValueError(f"目标格式应为 host:port: {text}")
+        return cls('tcp', text, host, port)
+
+
+class TargetStats:
+    # samples 为环形缓冲，只保留最近 window 个样本：时延（秒）或 None（丢失）；sent/lost 为累计值
+    def __init__(self, label, window=WINDOW):
+        self.label = label
+        self.samples = deque(maxlen=window)
+        self.sent = 0
+        self.lost = 0
+        self.errors = {}
+
+    def add(self, rtt, error=None):
+        self.sent += 1
+        self.samples.append(rtt)
+        if rtt is None:
+            self.lost += 1
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def summary(self):
+        samples = list(self.samples)
+        ms = [s * 1000 for s in samples if s is not None]
+        # 抖动：相邻两次成功样本时延差的平均值，中间有丢失时不跨过去计算
+        diffs = [abs(b - a) * 1000 for a, b in zip(samples, samples[1:]) if a is not None and b is not None]
+        return {
+            'target': self.label,
+            'sent': self.sent,
+            'lost': self.lost,
+            'loss': (len(samples) - len(ms)) * 100 / len(samples) if samples else None,
+            'min': min(ms) if ms else None,
+            'p50': percentile(ms, 50),
+            'p95': percentile(ms, 95),
+            'max': max(ms) if ms else None,
+            'jitter': sum(diffs) / len(diffs) if diffs else None,
+            'last': samples[-1] * 1000 if samples and samples[-1] is not None else None,
+            'errors': dict(self.errors),
+        }
+
+
+# ---------- 单次探测 ----------
+
+class DnsError(Exception):
+    pass
+
+
+RCODES = {1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP', 5: 'REFUSED'}
+
+
+def build_query(name, qid, qtype=1):
+    # 标准递归查询，默认查 A 记录
+    header = struct.pack('>HHHHHH', qid, 0x0100, 1, 0, 0, 0)
+    qname = b''.join(bytes([len(p)]) + p for p in name.encode('idna').split(b'.') if p) + b'\0'
+    return header + qname + struct.pack('>HH', qtype, 1)
+
+
+class _DnsProtocol(asyncio.DatagramProtocol):
+    def __init__(self, qid, future):
+        self.qid = qid
+        self.future = future
+
+    def datagram_received(self, data, addr):
+        # 忽略 ID 不符的迟到或伪造应答
+        if len(data) >= 12 and struct.unpack('>H', data[:2])[0] == self.qid and not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+async def dns_query(server, port, name, timeout):
+    loop = asyncio.get_running_loop()
+    qid = random.getrandbits(16)
+    future = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(lambda: _DnsProtocol(qid, future), remote_addr=(server, port))
+    try:
+        start = time.perf_counter()
+        transport.sendto(build_query(name, qid))
+        data = await asyncio.wait_for(future, timeout)
+        rtt = time.perf_counter() - start
+    finally:
+        transport.close()
+    rcode = data[3] & 0x0F
+    if rcode:
+        raise DnsError(RCODES.get(rcode, f"RCODE{rcode}"))
+    return rtt
+
+
+async def system_resolve(name, timeout):
+    # 经系统解析器（含本机缓存），与应用实际看到的解析时延一致
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    await asyncio.wait_for(loop.getaddrinfo(name, None, type=socket.SOCK_STREAM), timeout)
+    return time.perf_counter() - start
+
+
+async def tcp_connect(host, port, timeout):
+    # 三次握手完成即返回；以 RST 关闭，每秒数百次建连也不会堆积 TIME_WAIT、耗尽本地端口
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    transport, _ = await asyncio.wait_for(loop.create_connection(asyncio.Protocol, host, port), timeout)
+    rtt = time.perf_counter() - start
+    sock = transport.get_extra_info('socket')
+    # 对端可能已先关闭连接，此时套接字已随传输一起关闭
+    if sock is not None and not transport.is_closing():
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        except OSError:
+            pass
+    transport.abort()
+    return rtt
+
+
+# ---------- 探测引擎 ----------
+
+def _error_name(e):
+    # ConnectionRefusedError 等子类直接用类名，笼统的 OSError 用 errno 名称区分
+    if type(e) is OSError and e.errno in errno.errorcode:
+        return errno.errorcode[e.errno]
+    return type(e).__name__
+
+
+class NetProbe:
+    def __init__(self, targets, interval=0.5, timeout=2.0, concurrency=CONCURRENCY, window=WINDOW):
+        self.targets = [t if isinstance(t, Target) else Target.parse(t) for t in targets]
+        self.interval = interval
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.stats = {t.label: TargetStats(t.label, window) for t in self.targets}
+        self._addresses = {}
+        self._semaphore = None
+
+    async def _address(self, host):
+        # 目标主机名每轮运行只解析一次，TCP 建连与 UDP 查询的时延不含解析时间
+        if host not in self._addresses:
+            loop = asyncio.get_running_loop()
+            infos = await asyncio.wait_for(loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), self.timeout)
+            self._addresses[host] = infos[0][4][0]
+        return self._addresses[host]
+
+    async def probe(self, target):
+        stats = self.stats[target.label]
+        async with self._semaphore:
+            try:
+                if target.kind == 'resolve':
+                    rtt = await system_resolve(target.name, self.timeout)
+                elif target.kind == 'dns':
+                    rtt = await dns_query(await self._address(target.host), target.port, target.name, self.timeout)
+                else:
+                    rtt = await tcp_connect(await self._address(target.host), target.port, self.timeout)
+            except asyncio.TimeoutError:
+                stats.add(None, 'timeout')
+                return
+            except DnsError as e:
+                stats.add(None, str(e))
+                return
+            except OSError as e:
+                stats.add(None, _error_name(e))
+                return
+        stats.add(rtt)
+
+    async def run(self, duration=None, rounds=None, should_stop=None):
+        # 按固定节拍发出每一轮探测，不等待上一轮结束，慢目标或超时不会拖慢其他目标；
+        # 由 should_stop 停止时直接放弃在途的探测；三个停止条件都未给出时一直运行到被取消
+        loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        pending = set()
+        start = loop.time()
+        count = 0
+        with tracer.span('netprobe.run', 'job', targets=len(self.targets), interval=self.interval) as span:
+            try:
+                while True:
+                    for target in self.targets:
+                        task = loop.create_task(self.probe(target))
+                        pending.add(task)
+                        task.add_done_callback(pending.discard)
+                    count += 1
+                    if rounds is not None and count >= rounds:
+                        break
+                    await asyncio.sleep(max(0.0, start + count * self.interval - loop.time()))
+                    if duration is not None and loop.time() - start >= duration:
+                        break
+                    if should_stop is not None and should_stop():
+                        return
+                if pending:
+                    await asyncio.wait(set(pending))
+            finally:
+                for task in list(pending):
+                    task.cancel()
+                span.args['probes'] = sum(s.sent for s in self.stats.values())
+                span.args['lost'] = sum(s.lost for s in self.stats.values())
+
+    def summary(self):
+        return [self.stats[t.label].summary() for t in self.targets]
+
+
+def measure(targets, duration=3.0, interval=0.1, timeout=1.0):
+    # 同步接口：测量 duration 秒，返回各目标的统计
+    probe = NetProbe(targets, interval, timeout)
+    asyncio.run(probe.run(duration))
+    return probe.summary()
+
+
+COMPARE_KEYS = ('p50', 'p95', 'jitter', 'loss')
+
+
+def compare(before, after):
+    after_by_target = {r['target']: r for r in after}
+    rows = []
+    for b in before:
+        a = after_by_target.get(b['target'])
+        if a is not None:
+            rows.append({'target': b['target'],
+                         'before': {k: b[k] for k in COMPARE_KEYS},
+                         'after': {k: a[k] for k in COMPARE_KEYS}})
+    return rows
+
+
+def _fmt(value):
+    return '-' if value is None else f"{value:.1f}"
+
+
+def format_summary(summary):
+    lines = [f"{'target':<36}{'sent':>6}{'loss%':>7}{'min':>8}{'p50':>8}{'p95':>8}{'jitter':>8}"]
+    for r in summary:
+        lines.append(f"{r['target']:<36}{r['sent']:>6}{_fmt(r['loss']):>7}{_fmt(r['min']):>8}"
+                     f"{_fmt(r['p50']):>8}{_fmt(r['p95']):>8}{_fmt(r['jitter']):>8}")
+        if r['errors']:
+            lines.append('    ' + ', '.join(f"{k} x{v}" for k, v in r['errors'].items()))
+    return '\n'.join(lines)
+
+
+def format_comparison(rows):
+    lines = [f"{'target':<36}{'p50 ms':>16}{'jitter ms':>16}{'loss %':>16}"]
+    for r in rows:
+        b, a = r['before'], r['after']
+        cells = [f"{_fmt(b[k])} > {_fmt(a[k])}" for k in ('p50', 'jitter', 'loss')]
+        lines.append(f"{r['target']:<36}" + ''.join(f"{c:>16}" for c in cells))
+    return '\n'.join(lines)
+
+
+# ---------- 回环替身服务 ----------
+
+class _StandInDns(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        server = self.server
+        if len(data) < 12 or server.rng.random() < server.drop:
+            return
+        # 原样带回问题部分，附一条指向 127.0.0.1 的 A 记录
+        question = data[12:]
+        response = (data[:2] + struct.pack('>HHHHH', 0x8180, 1, 1, 0, 0) + question
+                    + struct.pack('>HHHIH', 0xC00C, 1, 1, 60, 4) + socket.inet_aton('127.0.0.1'))
+        delay = max(0.0, server.delay + server.rng.uniform(-server.jitter, server.jitter))
+        if delay:
+            asyncio.get_running_loop().call_later(delay, self.transport.sendto, response, addr)
+        else:
+            self.transport.sendto(response, addr)
+
+
+class StandInServers:
+    # 回环上的替身服务：TCP 端口只接受连接后立即关闭；DNS 服务对任何查询都给出应答，
+    # 可设置附加时延、抖动（均匀分布的半宽，秒）与丢包率，用于验证统计是否正确
+    def __init__(self, delay=0.0, jitter=0.0, drop=0.0, seed=None):
+        self.delay = delay
+        self.jitter = jitter
+        self.drop = drop
+        self.rng = random.Random(seed)
+        self.tcp_server = None
+        self.dns_transport = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+
+        async def accept(reader, writer):
+            writer.close()
+
+        self.tcp_server = await asyncio.start_server(accept, '127.0.0.1', 0, backlog=1024)
+        self.dns_transport, _ = await loop.create_datagram_endpoint(lambda: _StandInDns(self),
+                                                                    local_addr=('127.0.0.1', 0))
+        tcp_port = self.tcp_server.sockets[0].getsockname()[1]
+        dns_port = self.dns_transport.get_extra_info('sockname')[1]
+        return [f"127.0.0.1:{tcp_port}", f"dns:stand-in.test@127.0.0.1:{dns_port}"]
+
+    def close(self):
+        if self.tcp_server is not None:
+            self.tcp_server.close()
+        if self.dns_transport is not None:
+            self.dns_transport.close()
+
+
+async def _bench(rate, duration, delay, jitter, drop):
+    servers = StandInServers(delay, jitter, drop, seed=1)
+    targets = await servers.start()
+    lag = []
+
+    async def watch_loop():
+        # 事件循环的调度延迟：一直很小说明探测没有阻塞循环
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag.append(time.perf_counter() - start - 0.01)
+
+    watcher = asyncio.get_running_loop().create_task(watch_loop())
+    try:
+        probe = NetProbe(targets, interval=len(targets) / rate, timeout=1.0, window=int(rate * duration))
+        started = time.perf_counter()
+        await probe.run(duration)
+        elapsed = time.perf_counter() - started
+    finally:
+        watcher.cancel()
+        servers.close()
+    return {
+        'probes': sum(s.sent for s in probe.stats.values()),
+        'duration': duration,
+        'seconds': elapsed,
+        'loop_lag_p99': percentile([x * 1000 for x in lag], 99),
+        'summary': probe.summary(),
+    }
+
+
+def bench(rate=500, duration=5.0, delay=0.02, jitter=0.005, drop=0.05):
+    return asyncio.run(_bench(rate, duration, delay, jitter, drop))
+
+
+def format_bench(result, delay, jitter, drop):
+    return '\n'.join([
+        f"{result['probes']} probes issued over {result['duration']:.1f} s = {result['probes'] / result['duration']:.0f}/s, "
+        f"all finished after {result['seconds']:.2f} s, loop lag p99 {_fmt(result['loop_lag_p99'])} ms",
+        f"stand-in DNS: delay {delay * 1000:.1f} ms, jitter +/-{jitter * 1000:.1f} ms, drop {drop * 100:.0f}%",
+        format_summary(result['summary']),
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WinOptimize 网络诊断')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    probe_p = sub.add_parser('probe', help='测量 TCP 建连与 DNS 解析时延')
+    probe_p.add_argument('targets', nargs='*', help='host:port、dns:name 或 dns:name@server，缺省为内置目标')
+    probe_p.add_argument('--duration', type=float, default=10.0)
+    probe_p.add_argument('--interval', type=float, default=0.5)
+    probe_p.add_argument('--timeout', type=float, default=2.0)
+    bench_p = sub.add_parser('bench', help='对回环上的替身服务高频探测，检查吞吐与统计')
+    bench_p.add_argument('--rate', type=float, default=500, help='每秒探测数')
+    bench_p.add_argument('--duration', type=float, default=5.0)
+    bench_p.add_argument('--delay', type=float, default=0.02, help='替身 DNS 的附加时延（秒）')
+    bench_p.add_argument('--jitter', type=float, default=0.005)
+    bench_p.add_argument('--drop', type=float, default=0.05, help='替身 DNS 的丢包率')
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'probe':
+        probe = NetProbe(args.targets or DEFAULT_TARGETS, args.interval, args.timeout)
+        try:
+            asyncio.run(probe.run(args.duration))
+        except KeyboardInterrupt:
+            pass
+        print(format_summary(probe.summary()))
+    else:
+        result = bench(args.rate, args.duration, args.delay, args.jitter, args.drop)
+        print(format_bench(result, args.delay, args.jitter, args.drop))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
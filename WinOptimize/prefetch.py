@@ -0,0 +1,529 @@
+# 启动加速：记录应用启动最初 N 秒读取的文件区间，下次启动时按磁盘顺序并行预读进系统缓存
+import sys
+import os
+import json
+import mmap
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import tracer
+
+PREFETCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prefetch")
+
+PAGE = mmap.PAGESIZE
+CHUNK = 2 * 1024 * 1024      # 单次预读提示的长度；WILLNEED 每次最多只预读 read_ahead_kb
+MERGE_GAP = 64 * 1024        # 间隔小于该值的相邻区间合并，文件更紧凑，读取也更连续
+WHOLE_FILE_MAX = 32 * 1024 * 1024  # 无法查询缓存时整文件记录，默认跳过大于该值的文件
+ATIME_SLACK = 3600           # NTFS 距上次访问不足约 1 小时不更新访问时间，此窗口内访问过的文件也算作已访问
+
+
+class FileSet:
+    # files: {路径: [[偏移, 长度], ...]}，区间按偏移排序且互不重叠；
+    # 文件按录制时的磁盘位置排列，预读时无需再逐个查询
+    def __init__(self, name, command=None, files=None, duration=None):
+        self.name = name
+        self.command = command
+        self.files = files or {}
+        self.duration = duration
+
+    def add(self, path, offset, length):
+        self.files.setdefault(path, []).append([offset, length])
+
+    def normalize(self, gap=MERGE_GAP):
+        for path, ranges in self.files.items():
+            merged = []
+            for offset, length in sorted(ranges):
+                if merged and offset <= merged[-1][0] + merged[-1][1] + gap:
+                    end = max(merged[-1][0] + merged[-1][1], offset + length)
+                    merged[-1][1] = end - merged[-1][0]
+                else:
+                    merged.append([offset, length])
+            self.files[path] = merged
+        return self
+
+    def total_bytes(self):
+        return sum(length for ranges in self.files.values() for _, length in ranges)
+
+    def to_dict(self):
+        return {'name': self.name, 'command': self.command, 'duration': self.duration,
+                'files': [[path, ranges] for path, ranges in self.files.items()]}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['name'], d.get('command'), {path: ranges for path, ranges in d['files']}, d.get('duration'))
+
+    def save(self, directory=PREFETCH_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.name + '.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+        return path
+
+
+def load_fileset(name, directory=PREFETCH_DIR):
+    path = name if name.endswith('.json') else os.path.join(directory, name + '.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        return FileSet.from_dict(json.load(f))
+
+
+def list_filesets(directory=PREFETCH_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(f[:-5] for f in os.listdir(directory) if f.endswith('.json'))
+
+
+# ---------- 页面缓存 ----------
+
+def _mincore():
+    # Linux 上通过 mincore 查询文件页面是否在缓存中；其他平台返回 None
+    if not sys.platform.startswith('linux'):
+        return None
+    import ctypes
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_char_p]
+    return libc.mincore
+
+
+_MINCORE = _mincore()
+
+
+def page_residency(path):
+    # 返回每页一个字节的列表（1 表示在缓存中）；不支持或无法映射时返回 None
+    if _MINCORE is None:
+        return None
+    import ctypes
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return b''
+        with open(path, 'rb') as f:
+            # ACCESS_COPY 为私有映射，可取得地址且不会写回文件
+            m = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError):
+        return None
+    try:
+        pages = (size + PAGE - 1) // PAGE
+        vec = ctypes.create_string_buffer(pages)
+        anchor = ctypes.c_char.from_buffer(m)
+        try:
+            if _MINCORE(ctypes.addressof(anchor), size, vec) != 0:
+                return None
+        finally:
+            del anchor
+        return bytes(b & 1 for b in vec.raw)
+    finally:
+        m.close()
+
+
+def evict(paths):
+    # 把文件从系统缓存中移出（只影响未修改的页面，无需管理员权限），用于冷启动测量与录制
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def _ranges(vec, gap_pages):
+    # 把页面位图转换为 [偏移, 长度] 区间
+    ranges = []
+    start = None
+    last = None
+    for i, bit in enumerate(vec):
+        if not bit:
+            continue
+        if start is not None and i - last - 1 <= gap_pages:
+            last = i
+            continue
+        if start is not None:
+            ranges.append([start * PAGE, (last - start + 1) * PAGE])
+        start = last = i
+    if start is not None:
+        ranges.append([start * PAGE, (last - start + 1) * PAGE])
+    return ranges
+
+
+# ---------- 录制 ----------
+
+def candidate_files(roots, max_size=None):
+    files = []
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.path.islink(path) or not os.path.isfile(path):
+                        continue
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                if size > 0 and (max_size is None or size <= max_size):
+                    files.append(path)
+    return files
+
+
+def default_roots(command):
+    # 未指定目录时取可执行文件所在目录
+    exe = shutil.which(command[0]) or command[0]
+    return [os.path.dirname(os.path.abspath(exe))]
+
+
+class Recorder:
+    # 先把候选文件移出缓存再启动应用，N 秒后缓存中新出现的页面即为应用读取的区间；
+    # 不支持查询缓存的平台（Windows）无法得知读取了哪些区间，只能整文件记录：
+    # 默认跳过大于 WHOLE_FILE_MAX 的文件，并只保留启动期间访问时间有更新的文件
+    def __init__(self, roots, duration=10.0, max_file_size=None):
+        self.roots = roots
+        self.duration = duration
+        self.max_file_size = max_file_size
+
+    def record(self, name, command, shell=False, stdout=None):
+        precise = _MINCORE is not None and hasattr(os, 'posix_fadvise')
+        max_size = self.max_file_size
+        if max_size is None and not precise:
+            max_size = WHOLE_FILE_MAX
+        files = candidate_files(self.roots, max_size)
+        fileset = FileSet(name, command, duration=self.duration)
+        if precise:
+            evict(files)
+        before = {path: page_residency(path) for path in files} if precise else {}
+        atimes = {} if precise else _atimes(files)
+        started = time.time_ns()
+        with tracer.span('prefetch.record', 'job', fileset=name, candidates=len(files)) as span:
+            proc = subprocess.Popen(command, shell=shell, stdout=stdout)
+            try:
+                proc.wait(timeout=self.duration)
+            except subprocess.TimeoutExpired:
+                pass
+            if not precise:
+                accessed = _accessed(atimes, started - ATIME_SLACK * 10 ** 9)
+                span.args['atime'] = bool(accessed)
+                # 卷上关闭了访问时间更新时没有任何文件的访问时间会变化，只能退回记录全部候选文件
+                for path in accessed or files:
+                    entry = atimes.get(path)
+                    # 启动前无法 stat 的文件（已删除、无权限）不记录
+                    if entry is not None:
+                        fileset.add(path, 0, entry[1])
+            for path in files if precise else ():
+                after = page_residency(path)
+                if after is None:
+                    continue
+                # 移出缓存前就被其他进程占用的页面不算作本应用读取
+                old = before.get(path) or bytes(len(after))
+                vec = [a and not b for a, b in zip(after, old)]
+                for offset, length in _ranges(vec, MERGE_GAP // PAGE):
+                    fileset.add(path, offset, length)
+            fileset.normalize()
+            fileset.files = {path: fileset.files[path] for path in disk_order(fileset.files)}
+            span.output_size = fileset.total_bytes()
+        return fileset, proc
+
+
+def _atimes(files):
+    # 返回 {路径: (访问时间, 大小)}
+    result = {}
+    for path in files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        result[path] = (st.st_atime_ns, st.st_size)
+    return result
+
+
+def _accessed(atimes, since):
+    # 访问时间比启动前新的文件；NTFS 距上次访问不足约 1 小时不会更新访问时间，
+    # 所以访问时间不早于 since（录制开始前 ATIME_SLACK 秒）的文件也算作已访问
+    accessed = []
+    for path, (atime, size) in atimes.items():
+        try:
+            now = os.stat(path).st_atime_ns
+        except OSError:
+            continue
+        if now > atime or now >= since:
+            accessed.append(path)
+    return accessed
+
+
+# ---------- 预读 ----------
+
+FS_IOC_FIEMAP = 0xC020660B
+
+
+def _physical_offset(path):
+    # 文件第一个数据块在磁盘上的位置（Linux FIEMAP），不支持时返回 None
+    if not sys.platform.startswith('linux'):
+        return None
+    import fcntl
+    import struct
+    buf = bytearray(32 + 56)
+    struct.pack_into('QQIIII', buf, 0, 0, 0xffffffffffffffff, 0, 0, 1, 0)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        fcntl.ioctl(fd, FS_IOC_FIEMAP, buf)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    if struct.unpack_from('I', buf, 20)[0] == 0:
+        return None
+    return struct.unpack_from('Q', buf, 40)[0]
+
+
+def disk_order(paths):
+    # 按磁盘上的物理位置排序，无法获取时退回 inode 编号（同一目录下新建文件大致连续）
+    def key(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return (1, 0, 0, path)
+        physical = _physical_offset(path)
+        return (0, st.st_dev, physical if physical is not None else st.st_ino, path)
+    return sorted(paths, key=key)
+
+
+def warm_file(path, ranges, wait=False):
+    # 返回预读的字节数；文件不存在时返回 None
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    except OSError:
+        return None
+    try:
+        size = os.fstat(fd).st_size
+        total = 0
+        for offset, length in ranges:
+            length = min(length, size - offset)
+            if length <= 0:
+                continue
+            total += length
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, offset, length, os.POSIX_FADV_SEQUENTIAL)
+                for pos in range(offset, offset + length, CHUNK):
+                    os.posix_fadvise(fd, pos, min(CHUNK, offset + length - pos), os.POSIX_FADV_WILLNEED)
+            if wait or not hasattr(os, 'posix_fadvise'):
+                # 没有预读提示的平台直接顺序读一遍；wait 时等数据真正进入缓存
+                os.lseek(fd, offset, os.SEEK_SET)
+                remaining = length
+                while remaining > 0:
+                    data = os.read(fd, min(CHUNK, remaining))
+                    if not data:
+                        break
+                    remaining -= len(data)
+        return total
+    finally:
+        os.close(fd)
+
+
+class WarmStats:
+    def __init__(self, files, missing, bytes, seconds):
+        self.files = files
+        self.missing = missing
+        self.bytes = bytes
+        self.seconds = seconds
+
+    def to_dict(self):
+        return {'files': self.files, 'missing': self.missing, 'bytes': self.bytes,
+                'seconds': round(self.seconds, 4)}
+
+
+def warm(fileset, workers=4, wait=False, reorder=False):
+    started = time.perf_counter()
+    with tracer.span('prefetch.warm', 'job', fileset=fileset.name) as span:
+        # 文件移动（如磁盘整理）后可用 reorder 重新按磁盘位置排序
+        paths = disk_order(fileset.files) if reorder else list(fileset.files)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            # 按磁盘顺序提交，并行的请求在磁盘上也大致相邻
+            results = list(pool.map(lambda p: warm_file(p, fileset.files[p], wait), paths))
+        done = [r for r in results if r is not None]
+        stats = WarmStats(len(done), len(results) - len(done), sum(done), time.perf_counter() - started)
+        span.output_size = stats.bytes
+    return stats
+
+
+def launch(fileset, command=None, workers=4):
+    # 预读与应用启动同时进行：预读提示是异步的，不必等它完成
+    thread = threading.Thread(target=warm, args=(fileset, workers), daemon=True)
+    thread.start()
+    command = command or fileset.command
+    proc = subprocess.Popen(command) if command else None
+    thread.join()
+    return proc
+
+
+# ---------- 基准测试 ----------
+
+# 合成负载：按给定顺序读取每个文件的前若干字节并计算校验，模拟应用加载资源
+READER = """
+import sys, json, time, zlib
+items = json.load(sys.stdin)
+crc = 0
+for path, length in items:
+    with open(path, 'rb') as f:
+        while length > 0:
+            data = f.read(min(65536, length))
+            if not data:
+                break
+            crc = zlib.crc32(data, crc)
+            length -= len(data)
+"""
+
+
+def make_workload(directory, files=300, size=512 * 1024, seed=1):
+    # 生成数据文件与读取计划：只读取部分文件的开头部分，预读应只覆盖这些区间
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    plan = []
+    for i in range(files):
+        path = os.path.join(directory, f"asset{i:04d}.bin")
+        file_size = rng.randint(size // 4, size * 2)
+        with open(path, 'wb') as f:
+            f.write(os.urandom(file_size))
+            f.flush()
+            os.fsync(f.fileno())
+        if rng.random() < 0.7:
+            plan.append([path, rng.randint(file_size // 4, file_size)])
+    rng.shuffle(plan)
+    return plan
+
+
+def run_workload(plan):
+    # 从启动进程到退出的总时间，与用户感受到的加载时间一致
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', READER], input=json.dumps(plan).encode(),
+                   stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - started
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def bench(directory=None, files=300, size=512 * 1024, repeats=5, workers=4):
+    own_dir = directory is None
+    directory = directory or tempfile.mkdtemp(prefix='winopt_prefetch_')
+    try:
+        plan = make_workload(directory, files, size)
+        all_files = candidate_files([directory])
+        planned_bytes = sum(length for _, length in plan)
+        total_bytes = sum(os.path.getsize(p) for p in all_files)
+        if not evict(all_files) or page_residency(all_files[0]) is None:
+            raise RuntimeError("当前平台无法移出或查询文件缓存，不能测量冷启动")
+
+        # 录制：冷启动一次负载，得到读取过的文件区间
+        plan_path = os.path.join(directory, 'plan.json')
+        with open(plan_path, 'w', encoding='utf-8') as f:
+            json.dump(plan, f)
+        command = [sys.executable, '-c', READER.replace('json.load(sys.stdin)', f"json.load(open({plan_path!r}))")]
+        fileset, proc = Recorder([directory], duration=60).record('bench', command, stdout=subprocess.DEVNULL)
+        proc.wait()
+        fileset.files.pop(plan_path, None)
+
+        results = {'cold': [], 'warm': [], 'prefetched': [], 'launch': []}
+        for _ in range(repeats):
+            evict(all_files)
+            results['cold'].append(run_workload(plan))
+            results['warm'].append(run_workload(plan))
+            evict(all_files)
+            warm(fileset, workers, wait=True)
+            results['prefetched'].append(run_workload(plan))
+            # 预读与负载同时启动，计入预读本身的时间
+            evict(all_files)
+            thread = threading.Thread(target=warm, args=(fileset, workers))
+            thread.start()
+            results['launch'].append(run_workload(plan))
+            thread.join()
+        return {
+            'files': len(all_files),
+            'dataset_bytes': total_bytes,
+            'read_bytes': planned_bytes,
+            'recorded_files': len(fileset.files),
+            'recorded_bytes': fileset.total_bytes(),
+            'times': {k: _median(v) for k, v in results.items()},
+        }
+    finally:
+        if own_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def format_bench(result):
+    mb = 1024 * 1024
+    times = result['times']
+    lines = [
+        f"dataset  {result['files']} files, {result['dataset_bytes'] / mb:.1f} MB; workload reads {result['read_bytes'] / mb:.1f} MB",
+        f"recorded {result['recorded_files']} files, {result['recorded_bytes'] / mb:.1f} MB",
+    ]
+    for key in ('cold', 'warm', 'prefetched', 'launch'):
+        lines.append(f"{key:<11}{times[key] * 1000:>9.1f} ms{times['cold'] / times[key]:>8.2f}x")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    # 应用命令写在 -- 之后，先拆出来，避免与本工具的参数混在一起
+    argv = sys.argv[1:] if argv is None else list(argv)
+    command = []
+    if '--' in argv:
+        index = argv.index('--')
+        argv, command = argv[:index], argv[index + 1:]
+    parser = argparse.ArgumentParser(description='WinOptimize 启动加速',
+                                     epilog='record / launch 的应用命令写在 -- 之后')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    record_p = sub.add_parser('record', help='启动应用并记录最初 N 秒读取的文件区间')
+    record_p.add_argument('name')
+    record_p.add_argument('--root', action='append', help='候选文件目录，缺省为可执行文件所在目录')
+    record_p.add_argument('--duration', type=float, default=10.0)
+    record_p.add_argument('--max-file-size', type=int, help='忽略大于该字节数的文件')
+    warm_p = sub.add_parser('warm', help='把记录的文件区间预读进系统缓存')
+    warm_p.add_argument('name')
+    warm_p.add_argument('--wait', action='store_true', help='等待数据真正读入缓存')
+    launch_p = sub.add_parser('launch', help='预读的同时启动应用')
+    launch_p.add_argument('name')
+    sub.add_parser('list', help='列出已记录的应用')
+    bench_p = sub.add_parser('bench', help='用合成负载测量冷启动、热启动与预读后的加载时间')
+    bench_p.add_argument('--dir', help='数据文件目录（需位于真实磁盘上），缺省为临时目录')
+    bench_p.add_argument('--files', type=int, default=300)
+    bench_p.add_argument('--size', type=int, default=512 * 1024)
+    bench_p.add_argument('--repeats', type=int, default=5)
+    for p in (warm_p, launch_p, bench_p):
+        p.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'record':
+        if not command:
+            parser.error('缺少要启动的命令')
+        recorder = Recorder(args.root or default_roots(command), args.duration, args.max_file_size)
+        fileset, _ = recorder.record(args.name, command)
+        path = fileset.save()
+        print(f"{len(fileset.files)} files, {fileset.total_bytes()} bytes -> {path}")
+    elif args.cmd == 'warm':
+        print(json.dumps(warm(load_fileset(args.name), args.workers, args.wait).to_dict()))
+    elif args.cmd == 'launch':
+        launch(load_fileset(args.name), command or None, args.workers)
+    elif args.cmd == 'list':
+        for name in list_filesets():
+            fileset = load_fileset(name)
+            print(f"{name:<24}{len(fileset.files):>8} files{fileset.total_bytes():>14} bytes")
+    else:
+        print(format_bench(bench(args.dir, args.files, args.size, args.repeats, args.workers)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
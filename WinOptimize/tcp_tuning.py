@@ -0,0 +1,383 @@
+# TCP 调优：实测不同接收窗口与自动调优级别下的吞吐量，按测量结果推荐/应用设置
+import sys
+import os
+import json
+import time
+import heapq
+import select
+import socket
+import argparse
+import threading
+import statistics
+import subprocess
+from datetime import datetime
+
+import commands
+from tracing import tracer
+
+EVIDENCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tcp_tuning.json")
+
+# Windows 接收窗口自动调优级别及其窗口上限（近似值，用于模拟与推荐）
+AUTOTUNING_LEVELS = {
+    'disabled': 64 * 1024,
+    'highlyrestricted': 256 * 1024,
+    'restricted': 1024 * 1024,
+    'normal': 16 * 1024 * 1024,
+    'experimental': 64 * 1024 * 1024,
+}
+DEFAULT_LEVEL = 'normal'
+
+BUFFER_SIZES = [64 * 1024, 128 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024]
+
+CHUNK = 64 * 1024
+
+
+class ThroughputServer:
+    # 测速服务端：客户端连上后持续发送数据，直到客户端断开
+    def __init__(self, host='127.0.0.1', port=0):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(16)
+        self.address = self.listener.getsockname()
+        self._running = False
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self.address
+
+    def stop(self):
+        self._running = False
+        self.listener.close()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._send_loop, args=(conn,), daemon=True).start()
+
+    def _send_loop(self, conn):
+        data = b'\0' * CHUNK
+        with conn:
+            try:
+                while True:
+                    conn.sendall(data)
+            except OSError:
+                pass
+
+
+class DelayEmulator:
+    # 回环上的 netem 式时延模拟：服务端到客户端方向按 RTT 延迟，
+    # 且在途字节不超过接收窗口，从而再现高时延链路上 吞吐 ≈ 窗口 / RTT 的限制
+    def __init__(self, upstream, rtt=0.05, window=64 * 1024):
+        self.upstream = upstream
+        self.rtt = rtt
+        self.window = window
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(16)
+        self.address = self.listener.getsockname()
+        self._running = False
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self.address
+
+    def stop(self):
+        self._running = False
+        self.listener.close()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._pump, args=(client, self.window), daemon=True).start()
+
+    def _pump(self, client, window):
+        upstream = socket.create_connection(self.upstream)
+        deliveries = []  # (送达时间, 序号, 数据)
+        acks = []        # (确认时间, 字节数)
+        inflight = 0
+        seq = 0
+        try:
+            while True:
+                now = time.monotonic()
+                while acks and acks[0][0] <= now:
+                    inflight -= heapq.heappop(acks)[1]
+                while deliveries and deliveries[0][0] <= now:
+                    client.sendall(heapq.heappop(deliveries)[2])
+                readable = [client]
+                if inflight < window:
+                    readable.append(upstream)
+                pending = [t[0] for t in (deliveries[:1] + acks[:1])]
+                timeout = max(0.0, min(pending) - now) if pending else 1.0
+                ready, _, _ = select.select(readable, [], [], timeout)
+                if client in ready:
+                    data = client.recv(CHUNK)
+                    if not data:
+                        break
+                    upstream.sendall(data)
+                if upstream in ready:
+                    data = upstream.recv(min(CHUNK, window - inflight))
+                    if not data:
+                        break
+                    now = time.monotonic()
+                    seq += 1
+                    heapq.heappush(deliveries, (now + self.rtt / 2, seq, data))
+                    heapq.heappush(acks, (now + self.rtt, len(data)))
+                    inflight += len(data)
+        except OSError:
+            pass
+        finally:
+            client.close()
+            upstream.close()
+
+
+def measure_throughput(address, duration=1.0, rcvbuf=None, warmup=0.1):
+    # 接收指定时长，返回 MB/s；rcvbuf 为 None 时使用系统自动调优
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.settimeout(max(5.0, duration * 5))
+    sock.connect(tuple(address))
+    buf = bytearray(CHUNK)
+    try:
+        end_warmup = time.monotonic() + warmup
+        while time.monotonic() < end_warmup:
+            if not sock.recv_into(buf):
+                raise ConnectionError('服务端提前关闭连接')
+        received = 0
+        start = time.monotonic()
+        end = start + duration
+        while True:
+            now = time.monotonic()
+            if now >= end:
+                break
+            n = sock.recv_into(buf)
+            if not n:
+                raise ConnectionError('服务端提前关闭连接')
+            received += n
+        return received / (now - start) / 1e6
+    finally:
+        sock.close()
+
+
+def _run(command):
+    return subprocess.run(command, shell=True, capture_output=True, text=True)
+
+
+def get_autotuning_level():
+    # 解析 netsh 输出中的“接收窗口自动调节级别”，兼容中英文系统
+    result = _run(commands.TCP_SHOW_GLOBAL_CMD)
+    for line in result.stdout.splitlines():
+        if 'Auto-Tuning' in line or '自动调' in line:
+            value = line.split(':', 1)[-1].split('：', 1)[-1].strip().lower().replace(' ', '')
+            for level in AUTOTUNING_LEVELS:
+                if value == level:
+                    return level
+    return DEFAULT_LEVEL
+
+
+def set_autotuning_level(level):
+    if level not in AUTOTUNING_LEVELS:
+        raise ValueError(f"未知的自动调优级别: {level}")
+    with tracer.span('tcp_tuning.set_level', 'job', level=level) as span:
+        result = _run(commands.TCP_AUTOTUNING_SET_CMD.format(level=level))
+        span.exit_code = result.returncode
+        span.output_size = len(result.stdout) + len(result.stderr)
+        if result.returncode != 0:
+            raise RuntimeError((result.stdout + result.stderr).strip())
+
+
+class TcpTuner:
+    # system_levels 为 True 时（仅 Windows）逐级通过 netsh 真实切换后测量，
+    # 否则用对应的窗口上限模拟各级别
+    def __init__(self, target, emulator=None, duration=1.0, repeats=3,
+                 tolerance=0.05, system_levels=False, evidence_path=EVIDENCE_PATH):
+        self.target = target
+        self.emulator = emulator
+        self.duration = duration
+        self.repeats = repeats
+        self.tolerance = tolerance
+        self.system_levels = system_levels
+        self.evidence_path = evidence_path
+
+    def _sample(self, window):
+        address = self.target
+        if self.emulator is not None:
+            self.emulator.window = window or AUTOTUNING_LEVELS[DEFAULT_LEVEL]
+            address = self.emulator.address
+        samples = [measure_throughput(address, self.duration, window) for _ in range(self.repeats)]
+        return {'samples': samples, 'median': statistics.median(samples)}
+
+    def measure(self, buffer_sizes=BUFFER_SIZES, levels=tuple(AUTOTUNING_LEVELS)):
+        buffers = []
+        for size in buffer_sizes:
+            buffers.append(dict(window=size, **self._sample(size)))
+        level_results = []
+        if self.system_levels:
+            previous = get_autotuning_level()
+            try:
+                for level in levels:
+                    set_autotuning_level(level)
+                    level_results.append(dict(level=level, **self._sample(None)))
+            finally:
+                set_autotuning_level(previous)
+        else:
+            for level in levels:
+                level_results.append(dict(level=level, window=AUTOTUNING_LEVELS[level],
+                                          **self._sample(AUTOTUNING_LEVELS[level])))
+        return buffers, level_results
+
+    def recommend(self, buffers, levels):
+        # 吞吐最高的级别；若默认级别与之相差不超过容差，则保持默认，不做无依据的改动
+        best = max(levels, key=lambda r: r['median'])
+        chosen = best
+        default = next((r for r in levels if r['level'] == DEFAULT_LEVEL), None)
+        if default is not None and default['median'] >= best['median'] * (1 - self.tolerance):
+            chosen = default
+        required = None
+        if buffers:
+            top = max(r['median'] for r in buffers)
+            required = min(r['window'] for r in buffers if r['median'] >= top * (1 - self.tolerance))
+        return chosen['level'], required
+
+    @tracer.traced('tcp_tuning.tune', 'job')
+    def tune(self, apply=False, buffer_sizes=BUFFER_SIZES):
+        previous = get_autotuning_level() if os.name == 'nt' else None
+        # 之前应用过且尚未恢复时，当前级别已是调优后的值，保留最初记录的级别供 revert 使用
+        saved = load_evidence(self.evidence_path)
+        pending = bool(saved and (saved.get('pending_revert') or saved.get('applied')))
+        if pending:
+            previous = saved.get('previous_level')
+        buffers, levels = self.measure(buffer_sizes)
+        level, required = self.recommend(buffers, levels)
+        evidence = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'target': list(self.target),
+            'emulated_rtt': self.emulator.rtt if self.emulator is not None else None,
+            'duration': self.duration,
+            'repeats': self.repeats,
+            'buffers': buffers,
+            'levels': levels,
+            'required_window': required,
+            'recommended_level': level,
+            'previous_level': previous,
+            'applied': False,
+            'pending_revert': pending,
+        }
+        if apply:
+            set_autotuning_level(level)
+            evidence['applied'] = True
+            evidence['pending_revert'] = True
+        with open(self.evidence_path, 'w', encoding='utf-8') as f:
+            json.dump(evidence, f, ensure_ascii=False, indent=2)
+        return evidence
+
+
+def load_evidence(evidence_path=EVIDENCE_PATH):
+    if not os.path.exists(evidence_path):
+        return None
+    try:
+        with open(evidence_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def revert(evidence_path=EVIDENCE_PATH):
+    # 恢复到调优前记录的级别，没有记录时恢复为系统默认；
+    # 恢复成功后才清除待恢复标记，下次调优重新记录当时的级别
+    evidence = load_evidence(evidence_path)
+    previous = (evidence or {}).get('previous_level') or DEFAULT_LEVEL
+    set_autotuning_level(previous)
+    if evidence is not None:
+        evidence['applied'] = False
+        evidence['pending_revert'] = False
+        with open(evidence_path, 'w', encoding='utf-8') as f:
+            json.dump(evidence, f, ensure_ascii=False, indent=2)
+    return previous
+
+
+def format_evidence(evidence):
+    lines = [f"{'window':>12}{'MB/s':>12}"]
+    for r in evidence['buffers']:
+        lines.append(f"{r['window'] // 1024:>10}KB{r['median']:>12.2f}")
+    lines.append(f"{'level':>18}{'MB/s':>12}")
+    for r in evidence['levels']:
+        lines.append(f"{r['level']:>18}{r['median']:>12.2f}")
+    if evidence['required_window']:
+        lines.append(f"required window: {evidence['required_window'] // 1024}KB")
+    lines.append(f"recommended autotuninglevel: {evidence['recommended_level']}"
+                 + (" (applied)" if evidence['applied'] else ""))
+    return '\n'.join(lines)
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(':')
+    return host, int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WinOptimize TCP 调优')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    server_p = sub.add_parser('server', help='运行测速服务端')
+    server_p.add_argument('--bind', default='0.0.0.0:5201')
+
+    tune_p = sub.add_parser('tune', help='测量并推荐自动调优级别')
+    tune_p.add_argument('--target', help='测速服务端地址 host:port，缺省在本机回环上启动')
+    tune_p.add_argument('--emulate-rtt', type=float, help='在回环上模拟的 RTT（秒）')
+    tune_p.add_argument('--duration', type=float, default=1.0)
+    tune_p.add_argument('--repeats', type=int, default=3)
+    tune_p.add_argument('--system-levels', action='store_true', help='逐级真实切换 netsh 设置后测量（仅 Windows）')
+    tune_p.add_argument('--apply', action='store_true')
+
+    sub.add_parser('revert', help='恢复调优前的设置')
+    args = parser.parse_args(argv)
+    if args.cmd == 'tune' and args.apply and not args.target:
+        # 回环上 RTT 接近 0，各级别的差别只是噪声，不能据此修改系统设置
+        parser.error('--apply 需要用 --target 指定远端测速服务端')
+
+    if args.cmd == 'server':
+        server = ThroughputServer(*parse_address(args.bind))
+        print('listening on %s:%d' % server.start())
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
+        return 0
+    if args.cmd == 'revert':
+        print(revert())
+        return 0
+
+    server = emulator = None
+    if args.target:
+        target = parse_address(args.target)
+    else:
+        server = ThroughputServer()
+        target = server.start()
+    if args.emulate_rtt:
+        emulator = DelayEmulator(target, rtt=args.emulate_rtt)
+        emulator.start()
+    try:
+        tuner = TcpTuner(target, emulator, args.duration, args.repeats,
+                         system_levels=args.system_levels)
+        print(format_evidence(tuner.tune(apply=args.apply)))
+    finally:
+        if emulator is not None:
+            emulator.stop()
+        if server is not None:
+            server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+# 各模块以同级模块的方式互相导入（import tracing 等），测试时把 WinOptimize 目录加入搜索路径
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
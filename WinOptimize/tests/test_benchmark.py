@@ -0,0 +1,33 @@
+# 统计比较与命令行参数检查
+import pytest
+
+import benchmark
+
+
+@pytest.mark.parametrize('df, expected', [(1, 12.7062), (2, 4.3027), (5, 2.5706), (10, 2.2281), (30, 2.0423)])
+def test_t_quantile_matches_table(df, expected):
+    assert benchmark._t_quantile(0.975, df) == pytest.approx(expected, abs=1e-4)
+
+
+def metric(samples):
+    return benchmark.Metric('latency', 'ms', False, samples)
+
+
+def test_too_few_samples_is_not_significant():
+    for before, after in (([1.0], [2.0]), ([1.0, 1.0], [2.0, 2.0])):
+        delta = benchmark.compare_metric(metric(before), metric(after))
+        assert not delta.significant
+        assert delta.verdict == 'insufficient samples'
+
+
+def test_clear_difference_is_significant():
+    delta = benchmark.compare_metric(metric([1.0, 1.1, 0.9]), metric([2.0, 2.1, 1.9]))
+    assert delta.verdict == 'worse'
+    assert 0 < delta.ci_low < 1 < delta.ci_high
+
+
+def test_unknown_tweak_is_a_usage_error(capsys):
+    with pytest.raises(SystemExit) as exc:
+        benchmark.main(['tweak', 'no_such_tweak'])
+    assert exc.value.code == 2
+    assert 'no_such_tweak' in capsys.readouterr().err
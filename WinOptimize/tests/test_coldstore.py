@@ -0,0 +1,118 @@
+# 冷数据归档：归档 → 校验 → 删除原文件 → 恢复的往返，以及解压路径越界的防护
+import os
+import json
+import zlib
+
+import pytest
+
+import coldstore
+
+DAY = 86400
+
+
+def make_files(root, names, size=20000):
+    files = {}
+    for i, name in enumerate(names):
+        path = os.path.join(root, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = bytes((i * 7 + j) % 251 for j in range(size))
+        with open(path, 'wb') as f:
+            f.write(data)
+        old = 1_000_000_000 + i
+        os.utime(path, (old, old))
+        files[name] = data
+    return files
+
+
+def stat_list(root, names):
+    return [(os.path.join(root, *name.split('/')), os.stat(os.path.join(root, *name.split('/'))))
+            for name in names]
+
+
+def test_round_trip_removes_and_restores(tmp_path):
+    root = str(tmp_path / 'data')
+    names = ['a.bin', 'sub/b.bin', '..foo.bin']
+    files = make_files(root, names)
+    cold = coldstore.find_cold_files(root, days=1, min_size=1)
+    assert len(cold) == 3
+    dest = str(tmp_path / 'cold.woarc')
+    result = coldstore.archive(root, cold, dest, codec='zlib', workers=1, chunk_size=4096, remove=True)
+    assert result.files == 3 and result.verified == 3
+    assert result.skipped == []
+    assert sorted(os.path.basename(p) for p in result.removed) == ['..foo.bin', 'a.bin', 'b.bin']
+    for name in names:
+        assert not os.path.exists(os.path.join(root, *name.split('/')))
+
+    cold_archive = coldstore.ColdArchive(dest)
+    assert sorted(cold_archive.names()) == sorted(names)
+    # 任意区间读取只解压涉及的块
+    assert cold_archive.read('sub/b.bin', 5000, 3000) == files['sub/b.bin'][5000:8000]
+    assert cold_archive.extract_all(root) == (3, 0)
+    assert cold_archive.extract_all(root) == (0, 3)
+    for name, data in files.items():
+        path = os.path.join(root, *name.split('/'))
+        with open(path, 'rb') as f:
+            assert f.read() == data
+        assert os.stat(path).st_mtime == 1_000_000_000 + names.index(name)
+
+
+def test_changed_file_is_kept(tmp_path):
+    root = str(tmp_path)
+    make_files(root, ['a.bin'])
+    cold = stat_list(root, ['a.bin'])
+    with open(os.path.join(root, 'a.bin'), 'ab') as f:
+        f.write(b'changed')
+    result = coldstore.archive(root, cold, str(tmp_path / 'x.woarc'), codec='zlib', workers=1, remove=True)
+    assert result.removed == []
+    assert len(result.kept) == 1
+
+
+def test_files_outside_root_are_skipped_not_fatal(tmp_path):
+    root = str(tmp_path / 'root')
+    make_files(root, ['in.bin'])
+    make_files(str(tmp_path / 'other'), ['out.bin'])
+    cold = stat_list(root, ['in.bin']) + stat_list(str(tmp_path / 'other'), ['out.bin'])
+    result = coldstore.archive(root, cold, str(tmp_path / 'x.woarc'), codec='zlib', workers=1)
+    assert result.files == 1 and result.verified == 1
+    assert [os.path.basename(p) for p, _ in result.skipped] == ['out.bin']
+
+
+def forge(tmp_path, name):
+    # 在正常归档的基础上改写索引中的文件名
+    root = str(tmp_path / 'src')
+    make_files(root, ['a.bin'])
+    good = str(tmp_path / 'good.woarc')
+    if not os.path.exists(good):
+        coldstore.archive(root, stat_list(root, ['a.bin']), good, codec='zlib', workers=1)
+    with open(good, 'rb') as f:
+        raw = f.read()
+    offset, size, _ = coldstore.FOOTER.unpack(raw[-coldstore.FOOTER.size:])
+    index = json.loads(zlib.decompress(raw[offset:offset + size]))
+    index['files'][0]['name'] = name
+    data = zlib.compress(json.dumps(index).encode('utf-8'))
+    path = str(tmp_path / 'forged.woarc')
+    with open(path, 'wb') as f:
+        f.write(raw[:offset] + data + coldstore.FOOTER.pack(offset, len(data), coldstore.MAGIC))
+    return path
+
+
+@pytest.mark.parametrize('name', ['../evil', '/etc/evil', 'C:/evil', 'a/../../evil', 'a\\..\\evil', 'a//b', '.', ''])
+def test_forged_names_are_rejected(tmp_path, name):
+    with pytest.raises(ValueError):
+        coldstore.ColdArchive(forge(tmp_path, name))
+
+
+def test_name_starting_with_dots_is_accepted(tmp_path):
+    assert coldstore.ColdArchive(forge(tmp_path, '..foo.bin')).names() == ['..foo.bin']
+
+
+def test_extract_refuses_symlink_escape(tmp_path):
+    cold_archive = coldstore.ColdArchive(forge(tmp_path, 'link/a.bin'))
+    out = tmp_path / 'out'
+    outside = tmp_path / 'outside'
+    out.mkdir()
+    outside.mkdir()
+    os.symlink(str(outside), str(out / 'link'))
+    with pytest.raises(ValueError):
+        cold_archive.extract('link/a.bin', str(out))
+    assert os.listdir(str(outside)) == []
@@ -0,0 +1,108 @@
+# 用本地子进程替身驱动批量执行：重试与退避、主机超时、单台失败互不影响、结果按完成顺序产出
+import os
+import json
+import time
+import asyncio
+
+import pytest
+
+import fleet
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason='测试命令使用 POSIX shell')
+
+
+def run(runner, hosts, on_result=None):
+    return asyncio.run(runner.run(hosts, 'test', on_result))
+
+
+def by_host(report):
+    return {r.host: r for r in report.results}
+
+
+def test_failure_on_one_host_does_not_affect_others():
+    tweaks = [('check', 'test "$WINOPT_HOST" != bad'), ('after', 'true')]
+    runner = fleet.FleetRunner(fleet.LocalTransport(), tweaks, retries=0)
+    results = by_host(run(runner, ['h1', 'bad', 'h2']))
+    assert results['h1'].ok and results['h2'].ok
+    assert not results['bad'].ok
+    # 命令失败不跳过后续优化项
+    assert [t.status for t in results['bad'].tweaks] == [fleet.STATUS_FAILED, fleet.STATUS_OK]
+
+
+def test_retries_until_success(tmp_path):
+    # 每台主机第一次失败，第二次成功
+    counter = str(tmp_path) + '/$WINOPT_HOST'
+    command = f'n=$(cat {counter} 2>/dev/null || echo 0); echo $((n + 1)) > {counter}; [ "$n" -ge 1 ]'
+    runner = fleet.FleetRunner(fleet.LocalTransport(), [('flaky', command)], retries=2, backoff=0.01)
+    for result in run(runner, ['h1', 'h2']).results:
+        tweak = result.tweaks[0]
+        assert (tweak.status, tweak.attempts) == (fleet.STATUS_OK, 2)
+
+
+def test_gives_up_after_retries_with_exit_code_and_stderr():
+    runner = fleet.FleetRunner(fleet.LocalTransport(), [('broken', 'echo boom >&2; exit 3')],
+                               retries=2, backoff=0.01)
+    tweak = run(runner, ['h1']).results[0].tweaks[0]
+    assert (tweak.status, tweak.exit_code, tweak.attempts) == (fleet.STATUS_FAILED, 3, 3)
+    assert tweak.error == 'boom'
+
+
+def test_backoff_grows_and_is_capped():
+    runner = fleet.FleetRunner(fleet.LocalTransport(), [], backoff=1.0, max_backoff=4.0)
+    for attempt, limit in [(0, 1.0), (1, 2.0), (2, 4.0), (5, 4.0)]:
+        for _ in range(20):
+            assert limit / 2 <= runner._delay(attempt) <= limit
+
+
+def test_host_timeout_kills_command_and_skips_the_rest():
+    runner = fleet.FleetRunner(fleet.LocalTransport(), [('slow', 'sleep 10'), ('next', 'true')],
+                               host_timeout=0.5, retries=2)
+    started = time.monotonic()
+    result = run(runner, ['h1']).results[0]
+    assert time.monotonic() - started < 5
+    assert [t.status for t in result.tweaks] == [fleet.STATUS_TIMEOUT, fleet.STATUS_SKIPPED]
+
+
+class FlakyNetwork(fleet.LocalTransport):
+    # 主机 down 无法连接，其余主机照常执行
+    async def run(self, host, command, timeout):
+        if host == 'down':
+            raise fleet.TransportError('connection refused')
+        return await super().run(host, command, timeout)
+
+
+def test_unreachable_host_is_skipped_after_retries():
+    runner = fleet.FleetRunner(FlakyNetwork(), [('a', 'true'), ('b', 'true')], retries=1, backoff=0.01)
+    results = by_host(run(runner, ['down', 'up']))
+    assert [t.status for t in results['down'].tweaks] == [fleet.STATUS_UNREACHABLE, fleet.STATUS_SKIPPED]
+    assert results['down'].tweaks[0].attempts == 2
+    assert results['up'].ok
+
+
+def test_results_stream_in_completion_order():
+    command = 'case "$WINOPT_HOST" in slow) sleep 1 ;; esac'
+    runner = fleet.FleetRunner(fleet.LocalTransport(), [('t', command)], concurrency=2)
+    seen = []
+    report = run(runner, ['slow', 'fast'], lambda r: seen.append((r.host, time.monotonic())))
+    assert [host for host, _ in seen] == ['fast', 'slow']
+    # 快的主机不必等慢的主机结束
+    assert seen[1][1] - seen[0][1] > 0.5
+    assert report.summary() == {'t': {fleet.STATUS_OK: 2}}
+
+
+def test_unknown_tweak_in_profile_names_id_and_file(tmp_path):
+    path = tmp_path / 'profile.json'
+    path.write_text(json.dumps({'name': 'p', 'tweaks': ['game_mode', {'id': 'no_such_tweak'}]}))
+    with pytest.raises(ValueError) as exc:
+        fleet.load_profile(str(path))
+    assert 'no_such_tweak' in str(exc.value) and str(path) in str(exc.value)
+
+
+def test_profile_dict_items_resolve_builtin_and_catalog_ids(tmp_path):
+    path = tmp_path / 'profile.json'
+    path.write_text(json.dumps({'tweaks': [{'id': 'power_plan'}, {'id': 'game_mode'}, {'id': 'x', 'command': 'true'}]}))
+    name, tweaks = fleet.load_profile(str(path))
+    assert name == 'custom'
+    assert [t for t, _ in tweaks] == ['power_plan', 'game_mode', 'x']
+    assert tweaks[0][1] == fleet.TWEAKS['power_plan']
+    assert tweaks[2][1] == 'true'
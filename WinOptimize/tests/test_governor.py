@@ -0,0 +1,116 @@
+# 回放录制的采样轨迹，检查进入延迟、最短停留时间与滞回带
+# 轨迹（每 5 秒一个采样）：5–10 秒短暂尖峰；20 秒起持续高负载；35–95 秒在 70% 阈值下方的滞回带内波动；
+# 100 秒起空闲；170–185 秒前台为 Game.exe；190 秒起空闲
+import os
+
+import governor
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def replay_fixture(trace='governor_trace.jsonl', **options):
+    rules, default = governor.load_rules(os.path.join(FIXTURES, 'governor_rules.json'))
+    actuator = governor.RecordingActuator()
+    gov = governor.Governor(rules, actuator, default, **options)
+    decisions = governor.replay(gov, governor.load_trace(os.path.join(FIXTURES, trace)))
+    return [(d.t, d.previous, d.current) for d in decisions], actuator.applied
+
+
+def test_default_profile_applied_at_start():
+    _, applied = replay_fixture()
+    assert applied[0] == {'power_plan': 'balanced', 'game_mode': False}
+
+
+def test_recorded_trace_decisions():
+    decisions, applied = replay_fixture()
+    assert decisions == [
+        (30.0, None, 'busy'),
+        (110.0, 'busy', None),
+        (180.0, None, 'game'),
+        (240.0, 'game', None),
+    ]
+    # 只下发与已应用状态不同的项
+    assert applied[1:] == [
+        {'power_plan': 'high'},
+        {'power_plan': 'balanced'},
+        {'power_plan': 'ultimate', 'game_mode': True},
+        {'power_plan': 'balanced', 'game_mode': False},
+    ]
+
+
+def test_rule_profiles_fall_back_to_default_settings():
+    # 游戏结束时负载仍高，直接从游戏方案切到高负载方案；高负载方案没写 game_mode，应恢复默认的关闭
+    decisions, applied = replay_fixture('governor_game_to_busy.jsonl')
+    assert decisions == [(10.0, None, 'game'), (70.0, 'game', 'busy')]
+    assert applied[-1] == {'power_plan': 'high', 'game_mode': False}
+
+
+def test_enter_time_ignores_short_spike():
+    decisions, _ = replay_fixture()
+    assert decisions[0][0] == 30.0
+    # 不要求持续时间时，5 秒的尖峰就会触发切换
+    decisions, _ = replay_fixture(enter_time=0.0)
+    assert decisions[0] == (5.0, None, 'busy')
+
+
+def test_min_dwell_delays_switching_back():
+    # 游戏在 190 秒结束，200 秒已满足进入延迟，但距上次切换（180 秒）不足 60 秒，240 秒才切回
+    decisions, _ = replay_fixture()
+    assert decisions[-1] == (240.0, 'game', None)
+    decisions, _ = replay_fixture(min_dwell=0.0)
+    assert decisions[-1] == (200.0, 'game', None)
+
+
+def test_band_keeps_rule_while_load_hovers_below_threshold():
+    # 35–95 秒负载在 62–68% 之间，处于 70% 阈值减 10% 的滞回带内，保持高负载方案直到 100 秒后真正空闲
+    decisions, _ = replay_fixture()
+    assert decisions[1] == (110.0, 'busy', None)
+    # 没有滞回带时，35 秒起即不再匹配，受最短停留时间限制在 90 秒切回
+    decisions, _ = replay_fixture(band=0.0)
+    assert decisions[1] == (90.0, 'busy', None)
+
+
+class FailingActuator(governor.RecordingActuator):
+    # 前 failures 次下发失败
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def apply(self, changes):
+        super().apply(changes)
+        if self.failures:
+            self.failures -= 1
+            return False
+        return True
+
+
+def test_failed_switch_is_not_recorded_and_retried():
+    rules, default = governor.load_rules(os.path.join(FIXTURES, 'governor_rules.json'))
+    gov = governor.Governor(rules, FailingActuator(0), default)
+    assert gov.start()
+    gov.actuator.failures = 1
+    samples = [governor.Sample(t, 85.0) for t in range(0, 30, 5)]
+    decisions = [d for d in (gov.step(s) for s in samples) if d is not None]
+    # 10 秒时满足进入延迟但下发失败，不记录切换，下一个采样（15 秒）重试成功
+    assert [(d.t, d.current) for d in decisions] == [(15, 'busy')]
+    assert gov.actuator.applied[1] == gov.actuator.applied[2] == {'power_plan': 'high'}
+    assert gov.applied_profile['power_plan'] == 'high'
+
+
+def test_system_actuator_checks_exit_codes(monkeypatch):
+    monkeypatch.setattr(governor.commands, 'POWER_ULTIMATE_INSTALL_CMD', 'false')
+    monkeypatch.setattr(governor.commands, 'POWER_SETACTIVE_CMD', 'true {scheme}')
+    monkeypatch.setattr(governor.commands, 'GAME_MODE_ON_CMD', 'echo on')
+    actuator = governor.SystemActuator()
+    # 复制计划失败（计划已存在）但切换成功
+    assert actuator.apply({'power_plan': 'ultimate', 'game_mode': True})
+    assert actuator._ultimate_installed
+    spans = [s for s in governor.tracer.recent(3) if s.name == 'governor.command']
+    assert [s.exit_code for s in spans] == [1, 0, 0]
+    assert spans[2].output_size == 3
+
+    monkeypatch.setattr(governor.commands, 'POWER_SETACTIVE_CMD', 'false {scheme}')
+    actuator = governor.SystemActuator()
+    assert actuator.apply({'power_plan': 'ultimate'}) is False
+    assert not actuator._ultimate_installed
+    assert not governor.tracer.recent(1)[0].ok
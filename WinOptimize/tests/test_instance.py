@@ -0,0 +1,160 @@
+# 单实例转发：消息校验、套接字位置与权限、命名管道的安全描述符
+import os
+import json
+import uuid
+import queue
+import stat
+
+import pytest
+
+import instance
+
+posix_only = pytest.mark.skipif(os.name == 'nt', reason='Unix 套接字')
+windows_only = pytest.mark.skipif(os.name != 'nt', reason='命名管道')
+
+
+@pytest.fixture
+def address(tmp_path):
+    if os.name == 'nt':
+        return r'\\.\pipe\WinOptimize-test-' + uuid.uuid4().hex
+    return str(tmp_path / 'run' / 'winoptimize.sock')
+
+
+@pytest.fixture
+def server(address):
+    server = instance.InstanceServer(address)
+    received = queue.Queue()
+    server.start()
+    server.set_handler(received.put)
+    yield server, received
+    server.close()
+
+
+def test_validate_accepts_parsed_arguments():
+    message = instance.parse_args(['--page', 'settings', '--apply', 'x', '--profile', 'p.json', '--tray'])
+    assert instance.validate(json.loads(json.dumps(message))) == message
+
+
+@pytest.mark.parametrize('message', [
+    ['--page', 'settings'],
+    {'command': 'whoami'},
+    {'tray': 'yes'},
+    {'page': 'nowhere'},
+])
+def test_validate_rejects_anything_else(message):
+    with pytest.raises(ValueError):
+        instance.validate(message)
+
+
+def test_forward_reaches_running_instance(server, address):
+    server, received = server
+    assert instance.forward(['--page', 'disk_cleanup'], address)
+    assert received.get(timeout=5) == {'page': 'disk_cleanup'}
+
+
+def test_invalid_message_is_dropped(server, address):
+    from multiprocessing.connection import Client
+    server, received = server
+    conn = Client(address)
+    try:
+        conn.send_bytes(json.dumps({'command': 'whoami'}).encode('utf-8'))
+        with pytest.raises(EOFError):
+            conn.recv_bytes(16)
+    finally:
+        conn.close()
+    assert instance.forward(['--page', 'settings'], address)
+    assert received.get(timeout=5) == {'page': 'settings'}
+    assert received.empty()
+
+
+def test_second_instance_is_refused(server, address):
+    with pytest.raises(instance.AlreadyRunning):
+        instance.InstanceServer(address).start()
+
+
+def test_forward_without_instance(address):
+    assert not instance.forward(['--page', 'settings'], address)
+
+
+@posix_only
+def test_socket_under_xdg_runtime_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    assert instance.default_address() == str(tmp_path / 'winoptimize.sock')
+
+
+@posix_only
+def test_socket_falls_back_to_per_user_dir(tmp_path, monkeypatch):
+    import tempfile
+    monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+    monkeypatch.setattr(tempfile, 'gettempdir', lambda: str(tmp_path))
+    assert instance.default_address() == str(tmp_path / f"winoptimize-{os.getuid()}" / 'winoptimize.sock')
+
+
+@posix_only
+def test_socket_is_private_from_bind(address):
+    # 宽松的 umask 下套接字与目录也只有当前用户可访问
+    mask = os.umask(0o002)
+    try:
+        server = instance.InstanceServer(address)
+        server.start()
+    finally:
+        restored = os.umask(mask)
+    try:
+        assert restored == 0o002
+        assert stat.S_IMODE(os.stat(os.path.dirname(address)).st_mode) == 0o700
+        assert stat.S_IMODE(os.stat(address).st_mode) & 0o077 == 0
+    finally:
+        server.close()
+
+
+@posix_only
+def test_stale_socket_is_replaced(address):
+    # 模拟异常退出：套接字文件还在，但已无人监听
+    import socket
+    os.mkdir(os.path.dirname(address), 0o700)
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(address)
+    stale.close()
+    assert not instance.forward(['--tray'], address)
+    server = instance.InstanceServer(address)
+    server.start()
+    try:
+        assert instance.forward(['--tray'], address)
+    finally:
+        server.close()
+
+
+@posix_only
+@pytest.mark.parametrize('squat', ['open', 'symlink'])
+def test_squatted_directory_is_refused(tmp_path, squat):
+    directory = tmp_path / 'run'
+    if squat == 'open':
+        directory.mkdir()
+        directory.chmod(0o777)
+    else:
+        (tmp_path / 'elsewhere').mkdir(mode=0o700)
+        directory.symlink_to(tmp_path / 'elsewhere')
+    with pytest.raises(PermissionError):
+        instance.InstanceServer(str(directory / 'winoptimize.sock')).start()
+    assert not os.path.exists(directory / 'winoptimize.sock')
+
+
+def test_pipe_sddl_grants_only_system_admins_and_user():
+    sid = 'S-1-5-21-1004336348-1177238915-682003330-1001'
+    sddl = instance._pipe_sddl(sid)
+    dacl, sacl = sddl.split('S:')
+    # 受保护的 DACL，不继承父对象的访问项，也没有 Everyone、已验证用户或匿名登录
+    assert dacl.startswith('D:P')
+    aces = dacl[len('D:P'):].strip('()').split(')(')
+    assert aces == ['A;;GA;;;SY', 'A;;GA;;;BA', f"A;;GRGW;;;{sid}"]
+    # 中等完整性标签，且禁止更低完整性的进程写入
+    assert sacl == '(ML;;NW;;;ME)'
+
+
+@windows_only
+def test_pipe_security_descriptor():
+    sid = instance._user_sid()
+    assert sid.startswith('S-1-5-')
+    attributes = instance._pipe_security()
+    assert attributes.lpSecurityDescriptor
+    assert not attributes.bInheritHandle
@@ -0,0 +1,70 @@
+# 用回环替身服务验证探测统计：丢包率、附加时延与连接被拒绝
+import random
+import socket
+import asyncio
+
+import netprobe
+
+
+def probe_stand_in(rounds, interval=0.005, timeout=0.5, **options):
+    # 返回 (TCP 目标统计, DNS 目标统计)
+    async def run():
+        servers = netprobe.StandInServers(**options)
+        targets = await servers.start()
+        try:
+            probe = netprobe.NetProbe(targets, interval, timeout, window=rounds)
+            await probe.run(rounds=rounds)
+            return probe.summary()
+        finally:
+            servers.close()
+
+    return asyncio.run(run())
+
+
+def expected_drops(rounds, drop, seed):
+    # 替身 DNS 对每个查询先抽一次是否丢弃，未丢弃时再抽一次抖动，与到达顺序无关
+    rng = random.Random(seed)
+    dropped = 0
+    for _ in range(rounds):
+        if rng.random() < drop:
+            dropped += 1
+        else:
+            rng.uniform(0.0, 0.0)
+    return dropped
+
+
+def test_fixed_drop_rate_gives_expected_loss():
+    rounds = 200
+    tcp, dns = probe_stand_in(rounds, drop=0.3, seed=7)
+    dropped = expected_drops(rounds, 0.3, 7)
+    assert dns['sent'] == rounds
+    assert dns['lost'] == dropped
+    assert dns['errors'] == {'timeout': dropped}
+    assert dns['loss'] == dropped * 100 / rounds
+    assert 20 <= dns['loss'] <= 40
+    # TCP 替身不丢包
+    assert tcp['lost'] == 0
+
+
+def test_added_delay_shows_in_p50():
+    _, base = probe_stand_in(50, seed=1)
+    _, delayed = probe_stand_in(50, delay=0.05, seed=1)
+    assert delayed['lost'] == 0
+    assert delayed['min'] >= 50
+    assert 40 <= delayed['p50'] - base['p50'] <= 65
+
+
+def test_closed_port_counts_as_connection_refused():
+    # 绑定后立即关闭，得到一个没有监听的端口
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    probe = netprobe.NetProbe([f"127.0.0.1:{port}"], interval=0.01, timeout=0.5)
+    asyncio.run(probe.run(rounds=5))
+    summary = probe.summary()[0]
+    assert summary['sent'] == 5
+    assert summary['lost'] == 5
+    assert summary['loss'] == 100
+    assert summary['errors'] == {'ConnectionRefusedError': 5}
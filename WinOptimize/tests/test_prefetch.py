@@ -0,0 +1,55 @@
+# 无法查询缓存的平台（Windows）上按访问时间整文件录制
+import os
+import sys
+import time
+
+import prefetch
+
+DAY = 86400
+
+
+def make_file(directory, name, atime, size=1000):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    os.utime(path, (atime, time.time() - 5 * DAY))
+    return path
+
+
+def record(monkeypatch, directory, code='pass'):
+    monkeypatch.setattr(prefetch, '_MINCORE', None)
+    recorder = prefetch.Recorder([str(directory)], duration=5)
+    fileset, proc = recorder.record('t', [sys.executable, '-c', code])
+    proc.wait()
+    return sorted(os.path.basename(path) for path in fileset.files)
+
+
+def test_keeps_files_read_during_launch_and_within_atime_window(monkeypatch, tmp_path):
+    old = time.time() - 5 * DAY
+    read = make_file(tmp_path, 'read', old)
+    make_file(tmp_path, 'unused', old)
+    # 半小时前访问过：NTFS 不会再次更新访问时间，也要记录
+    make_file(tmp_path, 'recent', time.time() - 1800)
+    assert record(monkeypatch, tmp_path, f"open({read!r}, 'rb').read()") == ['read', 'recent']
+
+
+def test_skips_large_files_by_default(monkeypatch, tmp_path):
+    big = os.path.join(tmp_path, 'big')
+    with open(big, 'wb') as f:
+        f.truncate(prefetch.WHOLE_FILE_MAX + 1)
+    make_file(tmp_path, 'small', time.time())
+    assert record(monkeypatch, tmp_path, f"open({big!r}, 'rb').read(1)") == ['small']
+
+
+def test_falls_back_to_all_candidates_and_skips_unstattable(monkeypatch, tmp_path):
+    old = time.time() - 5 * DAY
+    make_file(tmp_path, 'a', old)
+    make_file(tmp_path, 'b', old)
+    atimes = prefetch._atimes
+
+    # 模拟录制开始前 b 已无法 stat
+    def without_b(files):
+        return atimes([path for path in files if os.path.basename(path) != 'b'])
+
+    monkeypatch.setattr(prefetch, '_atimes', without_b)
+    assert record(monkeypatch, tmp_path) == ['a']
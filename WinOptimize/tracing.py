@@ -0,0 +1,173 @@
+# 动作追踪：记录各操作、后台任务与启动阶段的耗时、退出码等信息，保存在内存环形缓冲区中
+import os
+import json
+import time
+import threading
+import functools
+import subprocess
+from collections import deque
+
+
+class Span:
+    def __init__(self, tracer, name, cat, args=None):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args or {}
+        self.start = time.perf_counter()
+        self.end = None
+        self.tid = threading.get_ident()
+        self.exit_code = None
+        self.output_size = None
+        self.retries = 0
+        self.error = None
+
+    @property
+    def duration(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    @property
+    def ok(self):
+        return self.error is None and self.exit_code in (None, 0)
+
+    def finish(self, error=None):
+        if self.end is not None:
+            return
+        if error is not None:
+            self.error = error
+        self.end = time.perf_counter()
+        self.tracer._record(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish(f"{exc_type.__name__}: {exc}" if exc_type is not None else None)
+        return False
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'cat': self.cat,
+            'time': self.tracer.wall_time(self.start),
+            'duration_ms': round(self.duration * 1000, 3),
+            'exit_code': self.exit_code,
+            'output_size': self.output_size,
+            'retries': self.retries,
+            'error': self.error,
+            'tid': self.tid,
+            'args': self.args,
+        }
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+class Tracer:
+    def __init__(self, capacity=2000):
+        self.spans = deque(maxlen=capacity)
+        # perf_counter 与墙上时间的对应关系，用于导出绝对时间
+        self._epoch_wall = time.time()
+        self._epoch_perf = time.perf_counter()
+
+    def wall_time(self, perf):
+        return self._epoch_wall + (perf - self._epoch_perf)
+
+    def span(self, name, cat='action', **args):
+        return Span(self, name, cat, args)
+
+    def _record(self, span):
+        self.spans.append(span)
+
+    def traced(self, name=None, cat='action'):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name or func.__name__, cat):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def popen(self, name, command, cat='action', **kwargs):
+        # 启动命令后立即返回，由后台线程等待结束并记录退出码与输出大小，不阻塞界面
+        span = self.span(name, cat, command=command)
+        try:
+            proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, **kwargs)
+        except Exception as e:
+            span.finish(f"{type(e).__name__}: {e}")
+            raise
+
+        def wait():
+            try:
+                output, _ = proc.communicate()
+                span.exit_code = proc.returncode
+                span.output_size = len(output or b'')
+                span.finish(None if proc.returncode == 0 else (output or b'')[-200:].decode(errors='replace').strip() or None)
+            except Exception as e:
+                span.finish(f"{type(e).__name__}: {e}")
+
+        threading.Thread(target=wait, daemon=True).start()
+        return proc
+
+    def recent(self, n=None):
+        spans = list(self.spans)
+        return spans[-n:] if n else spans
+
+    def stats(self, cat=None):
+        # 按名称汇总：次数、失败数、p50/p95 耗时（毫秒）
+        groups = {}
+        for span in list(self.spans):
+            if cat is None or span.cat == cat:
+                groups.setdefault(span.name, []).append(span)
+        result = {}
+        for name, spans in groups.items():
+            durations = [s.duration * 1000 for s in spans]
+            result[name] = {
+                'count': len(spans),
+                'errors': sum(1 for s in spans if not s.ok),
+                'p50': percentile(durations, 50),
+                'p95': percentile(durations, 95),
+            }
+        return result
+
+    def export_jsonl(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for span in list(self.spans):
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False) + '\n')
+
+    def export_chrome(self, path):
+        # Chrome trace_event 格式，可直接在 Perfetto / chrome://tracing 中打开
+        pid = os.getpid()
+        events = []
+        for span in list(self.spans):
+            d = span.to_dict()
+            args = dict(span.args, exit_code=d['exit_code'], output_size=d['output_size'],
+                        retries=d['retries'], error=d['error'])
+            events.append({
+                'name': span.name,
+                'cat': span.cat,
+                'ph': 'X',
+                'ts': round((span.start - self._epoch_perf) * 1e6, 3),
+                'dur': round(span.duration * 1e6, 3),
+                'pid': pid,
+                'tid': span.tid,
+                'args': args,
+            })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+    def clear(self):
+        self.spans.clear()
+
+
+# 全局追踪器，各模块共用
+tracer = Tracer()
@@ -0,0 +1,50 @@
+# 界面测量脚本（memory_usage.py、catalog_latency.py）共用的部分：
+# 加载主程序、运行真正的事件循环、在独立子进程中测量，以及输出与检查目标
+import sys
+import os
+import json
+import subprocess
+import importlib.util
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Win_Optimize_1.0.0.py")
+
+
+def load_app():
+    # 主程序文件名含点号，不能直接 import
+    spec = importlib.util.spec_from_file_location('winoptimize_app', APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def wait(seconds):
+    # 运行真正的事件循环，使 deleteLater、定时器等延迟操作得以执行
+    from PyQt5.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+
+
+def add_arguments(parser):
+    parser.add_argument('--offscreen', action='store_true', help='不显示窗口（无桌面环境时使用）')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+
+
+def run_child(script, args, offscreen):
+    # 子进程最后一行输出为 JSON 结果
+    env = dict(os.environ)
+    if offscreen:
+        env['QT_QPA_PLATFORM'] = 'offscreen'
+    output = subprocess.run([sys.executable, os.path.abspath(script)] + [str(a) for a in args],
+                            stdout=subprocess.PIPE, env=env, check=True).stdout
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def report(key, results, targets, failures, json_path=None):
+    # 打印未达成的目标并按需写出 JSON，返回退出码
+    for failure in failures:
+        print('target missed:', failure)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({key: results, 'targets': targets, 'failures': failures}, f, indent=2)
+    return 1 if failures else 0